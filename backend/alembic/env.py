@@ -8,7 +8,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from app.db import Base
-from app.models import School, Student, Invoice, Payment, PaymentImputation
+from app.models import School, Student, Invoice, Payment, PaymentImputation, StudentBalance, BalanceSnapshot, OutboxEvent
 from app.settings import get_settings
 
 config = context.config
@@ -0,0 +1,33 @@
+"""add outbox events
+
+Revision ID: 0b9e4d72c6f1
+Revises: d7c3f0a8b215
+Create Date: 2026-10-17 21:14:36.902517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = '0b9e4d72c6f1'
+down_revision = 'd7c3f0a8b215'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Rows only live until the relay publishes them, so the table stays small
+    op.create_table('outbox_events',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('event_type', sa.String(), nullable=False),
+    sa.Column('student_id', sa.UUID(), nullable=False),
+    sa.Column('school_id', sa.UUID(), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('outbox_events')
@@ -0,0 +1,33 @@
+"""add foreign key indexes
+
+Revision ID: 3c7a91d2e4b6
+Revises: d089f6f2a5e0
+Create Date: 2026-10-17 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '3c7a91d2e4b6'
+down_revision = 'd089f6f2a5e0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # PostgreSQL does not index foreign keys on its own; the statement
+    # aggregates join through all of these columns.
+    op.create_index(op.f('ix_students_school_id'), 'students', ['school_id'], unique=False)
+    op.create_index(op.f('ix_invoices_student_id'), 'invoices', ['student_id'], unique=False)
+    op.create_index(op.f('ix_payments_student_id'), 'payments', ['student_id'], unique=False)
+    op.create_index(op.f('ix_payment_imputations_payment_id'), 'payment_imputations', ['payment_id'], unique=False)
+    op.create_index(op.f('ix_payment_imputations_invoice_id'), 'payment_imputations', ['invoice_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_payment_imputations_invoice_id'), table_name='payment_imputations')
+    op.drop_index(op.f('ix_payment_imputations_payment_id'), table_name='payment_imputations')
+    op.drop_index(op.f('ix_payments_student_id'), table_name='payments')
+    op.drop_index(op.f('ix_invoices_student_id'), table_name='invoices')
+    op.drop_index(op.f('ix_students_school_id'), table_name='students')
@@ -0,0 +1,53 @@
+"""add student_balances projection
+
+Revision ID: 9e41c0b7a2d3
+Revises: 3c7a91d2e4b6
+Create Date: 2026-10-17 10:04:55.902117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '9e41c0b7a2d3'
+down_revision = '3c7a91d2e4b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('student_balances',
+    sa.Column('student_id', sa.UUID(), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('school_id', sa.UUID(), nullable=False),
+    sa.Column('invoice_count', sa.Integer(), nullable=False),
+    sa.Column('invoiced_cents', sa.BigInteger(), nullable=False),
+    sa.Column('paid_cents', sa.BigInteger(), nullable=False),
+    sa.Column('outstanding_cents', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['school_id'], ['schools.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('student_id', 'currency')
+    )
+    op.create_index(op.f('ix_student_balances_school_id'), 'student_balances', ['school_id'], unique=False)
+
+    # Backfill from the ledger (same aggregate as StudentBalanceService.rebuild)
+    op.execute("""
+        INSERT INTO student_balances
+            (student_id, school_id, currency, invoice_count, invoiced_cents, paid_cents, outstanding_cents)
+        SELECT s.id, s.school_id, i.currency, count(*),
+               sum(i.amount_cents), sum(i.paid_cents), sum(i.amount_cents) - sum(i.paid_cents)
+        FROM students s
+        JOIN (
+            SELECT invoices.id, invoices.student_id, invoices.currency, invoices.amount_cents,
+                   coalesce(sum(payment_imputations.amount_cents), 0) AS paid_cents
+            FROM invoices
+            LEFT JOIN payment_imputations ON payment_imputations.invoice_id = invoices.id
+            GROUP BY invoices.id
+        ) i ON i.student_id = s.id
+        GROUP BY s.id, s.school_id, i.currency
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_student_balances_school_id'), table_name='student_balances')
+    op.drop_table('student_balances')
@@ -0,0 +1,32 @@
+"""add invoice keyset index
+
+Revision ID: a6d2e9f41c83
+Revises: f3a8c5e2b917
+Create Date: 2026-10-17 18:21:09.730145
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'a6d2e9f41c83'
+down_revision = 'f3a8c5e2b917'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The composite index starts with student_id, so the single-column one is redundant
+    op.create_index(
+        'ix_invoices_student_id_issued_at', 'invoices', ['student_id', 'issued_at', 'id'],
+        unique=False, postgresql_where=sa.text('revoked_at IS NULL')
+    )
+    op.drop_index('ix_invoices_student_id', table_name='invoices')
+
+
+def downgrade() -> None:
+    op.create_index(
+        'ix_invoices_student_id', 'invoices', ['student_id'],
+        unique=False, postgresql_where=sa.text('revoked_at IS NULL')
+    )
+    op.drop_index('ix_invoices_student_id_issued_at', table_name='invoices')
@@ -0,0 +1,33 @@
+"""add statement keyset indexes
+
+Revision ID: b52f8d6e1a90
+Revises: 9e41c0b7a2d3
+Create Date: 2026-10-17 11:20:07.448512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'b52f8d6e1a90'
+down_revision = '9e41c0b7a2d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The composite indexes start with school_id, so the single-column ones are redundant
+    op.create_index('ix_students_school_id_name', 'students', ['school_id', 'name', 'id'], unique=False)
+    op.drop_index('ix_students_school_id', table_name='students')
+    op.create_index(
+        'ix_student_balances_school_outstanding', 'student_balances',
+        ['school_id', sa.text('outstanding_cents DESC'), 'student_id'], unique=False
+    )
+    op.drop_index('ix_student_balances_school_id', table_name='student_balances')
+
+
+def downgrade() -> None:
+    op.create_index('ix_student_balances_school_id', 'student_balances', ['school_id'], unique=False)
+    op.drop_index('ix_student_balances_school_outstanding', table_name='student_balances')
+    op.create_index('ix_students_school_id', 'students', ['school_id'], unique=False)
+    op.drop_index('ix_students_school_id_name', table_name='students')
@@ -0,0 +1,39 @@
+"""add balance snapshots
+
+Revision ID: c18e5a3f7d24
+Revises: b52f8d6e1a90
+Create Date: 2026-10-17 12:41:19.020374
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'c18e5a3f7d24'
+down_revision = 'b52f8d6e1a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('balance_snapshots',
+    sa.Column('period_end', sa.DateTime(), nullable=False),
+    sa.Column('student_id', sa.UUID(), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('invoice_count', sa.Integer(), nullable=False),
+    sa.Column('invoiced_cents', sa.BigInteger(), nullable=False),
+    sa.Column('paid_cents', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('period_end', 'student_id', 'currency')
+    )
+    op.create_index(op.f('ix_balance_snapshots_student_id'), 'balance_snapshots', ['student_id'], unique=False)
+    # Activity since the latest snapshot is selected by date
+    op.create_index(op.f('ix_invoices_issued_at'), 'invoices', ['issued_at'], unique=False)
+    op.create_index(op.f('ix_payments_payment_date'), 'payments', ['payment_date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_payments_payment_date'), table_name='payments')
+    op.drop_index(op.f('ix_invoices_issued_at'), table_name='invoices')
+    op.drop_index(op.f('ix_balance_snapshots_student_id'), table_name='balance_snapshots')
+    op.drop_table('balance_snapshots')
@@ -0,0 +1,27 @@
+"""add payment reference index
+
+Revision ID: d7c3f0a8b215
+Revises: a6d2e9f41c83
+Create Date: 2026-10-17 20:02:47.318264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'd7c3f0a8b215'
+down_revision = 'a6d2e9f41c83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Bank reconciliation looks payments up by trimmed reference within a date window
+    op.create_index(
+        'ix_payments_reference', 'payments', [sa.text('btrim(reference)'), 'payment_date'],
+        unique=False, postgresql_where=sa.text('revoked_at IS NULL AND reference IS NOT NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_payments_reference', table_name='payments')
@@ -0,0 +1,26 @@
+"""add student balance version
+
+Revision ID: e4b7d1c9a352
+Revises: c18e5a3f7d24
+Create Date: 2026-10-17 15:42:18.206114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'e4b7d1c9a352'
+down_revision = 'c18e5a3f7d24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'student_balances',
+        sa.Column('version', sa.BigInteger(), server_default='0', nullable=False)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('student_balances', 'version')
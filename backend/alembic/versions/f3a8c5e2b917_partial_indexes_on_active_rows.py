@@ -0,0 +1,38 @@
+"""partial indexes on active rows
+
+Revision ID: f3a8c5e2b917
+Revises: e4b7d1c9a352
+Create Date: 2026-10-17 17:05:33.514920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'f3a8c5e2b917'
+down_revision = 'e4b7d1c9a352'
+branch_labels = None
+depends_on = None
+
+
+# (index, table, columns) rebuilt to cover only rows that are not soft deleted
+INDEXES = [
+    ('ix_students_school_id_name', 'students', ['school_id', 'name', 'id']),
+    ('ix_invoices_student_id', 'invoices', ['student_id']),
+    ('ix_payments_student_id', 'payments', ['student_id']),
+    ('ix_payment_imputations_payment_id', 'payment_imputations', ['payment_id']),
+    ('ix_payment_imputations_invoice_id', 'payment_imputations', ['invoice_id']),
+]
+
+
+def upgrade() -> None:
+    # Every query filters revoked_at IS NULL, so revoked history only bloats these
+    for name, table, columns in INDEXES:
+        op.drop_index(name, table_name=table)
+        op.create_index(name, table, columns, unique=False, postgresql_where=sa.text('revoked_at IS NULL'))
+
+
+def downgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.drop_index(name, table_name=table)
+        op.create_index(name, table, columns, unique=False)
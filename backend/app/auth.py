@@ -61,7 +61,8 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    result = await db.execute(select(User).where(User.id == user_id))
+    # Revoked users are loaded so they get a specific error rather than a 401
+    result = await db.execute(select(User).where(User.id == user_id).execution_options(include_revoked=True))
     user = result.scalar_one_or_none()
     
     if user is None:
@@ -1,12 +1,109 @@
+import asyncio
+import hashlib
 import json
+import time
+import uuid
+from collections import OrderedDict
+from fnmatch import fnmatchcase
 import redis.asyncio as redis
-from typing import Optional, Any
+from typing import TYPE_CHECKING, Optional, Any, Dict, Iterable, List, Sequence, Tuple
 from uuid import UUID
 from datetime import datetime, date
 import logging
 
+if TYPE_CHECKING:
+    from app.services.student_balance_service import BalanceChange
+
 logger = logging.getLogger(__name__)
 
+# Deletes the lock only if it still holds the caller's token, so a worker whose
+# lock expired cannot release a lock since taken by another worker
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Marks a cached value stale. ``since`` keeps the time of the first invalidation,
+# so the max staleness bound is measured from the first change the value misses;
+# the token changes on every invalidation
+_MARK_STALE_SCRIPT = """
+local since = tonumber(ARGV[1])
+local current = redis.call("get", KEYS[1])
+if current then
+    since = cjson.decode(current)["since"]
+end
+redis.call("set", KEYS[1], cjson.encode({since = since, token = ARGV[2]}), "EX", ARGV[3])
+"""
+
+# Clears the stale marker only if no invalidation happened since it was read
+_CLEAR_STALE_SCRIPT = """
+local current = redis.call("get", KEYS[1])
+if current and cjson.decode(current)["token"] == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Applies one balance change to a cached school statement in place.
+# KEYS: statement, versions hash. ARGV: version field, new version, student id,
+# invoiced delta, paid delta, currency. The delta is only applied when the cached value
+# was computed from the version right before this one; returns 1 when the
+# cached value reflects the change, 0 when it has to be invalidated instead.
+# Amounts round-trip through Lua numbers, exact up to 14 significant digits.
+_PATCH_SCHOOL_STATEMENT_SCRIPT = """
+local current = redis.call("get", KEYS[1])
+if not current then
+    return 0
+end
+local cached = tonumber(redis.call("hget", KEYS[2], ARGV[1]))
+local version = tonumber(ARGV[2])
+if cached == version then
+    return 1
+end
+if cached ~= version - 1 then
+    return 0
+end
+local statement = cjson.decode(current)
+local invoiced, paid, currency = tonumber(ARGV[4]), tonumber(ARGV[5]), ARGV[6]
+local function add(totals, cents)
+    for _, amount in ipairs(totals) do
+        if amount["currency"] == currency then
+            amount["amount_cents"] = amount["amount_cents"] + cents
+            return true
+        end
+    end
+    return false
+end
+for _, student in ipairs(statement["students"]) do
+    local outstanding = student["total_outstanding"]
+    if student["student_id"] == ARGV[3] and outstanding["currency"] == currency then
+        outstanding["amount_cents"] = outstanding["amount_cents"] + invoiced - paid
+        if not (add(statement["total_invoiced"], invoiced) and add(statement["total_paid"], paid)
+                and add(statement["total_outstanding"], invoiced - paid)) then
+            return 0
+        end
+        redis.call("set", KEYS[1], cjson.encode(statement), "KEEPTTL")
+        redis.call("hset", KEYS[2], ARGV[1], version)
+        return 1
+    end
+end
+return 0
+"""
+
+# Starts (ARGV[3] = 0) or bumps a statement version counter. A missing counter
+# starts from the current time in milliseconds, so a counter that expired or
+# was flushed never comes back with a value it already had
+_VERSION_SCRIPT = """
+redis.call("set", KEYS[1], ARGV[1], "NX", "EX", ARGV[2])
+local increment = tonumber(ARGV[3])
+if increment > 0 then
+    redis.call("expire", KEYS[1], ARGV[2])
+end
+return redis.call("incrby", KEYS[1], increment)
+"""
+
 
 class UUIDEncoder(json.JSONEncoder):
     """JSON encoder that handles UUID and datetime objects."""
@@ -18,10 +115,21 @@ class UUIDEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
+# Channel on which every mutated key (or deleted pattern) is announced to the other workers
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+def tier_stats(hits: int, misses: int) -> dict:
+    lookups = hits + misses
+    return {"hits": hits, "misses": misses, "hit_ratio": hits / lookups if lookups else None}
+
+
 class RedisCache:
     def __init__(self, redis_url: str = "redis://redis:6379"):
         self.redis_url = redis_url
         self._client: Optional[redis.Redis] = None
+        self.hits = 0
+        self.misses = 0
     
     async def get_client(self) -> redis.Redis:
         if self._client is None:
@@ -36,29 +144,74 @@ class RedisCache:
         if self._client:
             await self._client.close()
     
+    def stats(self) -> Dict[str, dict]:
+        """Hit and miss counts of this process, per cache tier."""
+        return {"redis": tier_stats(self.hits, self.misses)}
+    
     async def get(self, key: str) -> Optional[dict]:
         """Get cached value by key."""
+        value = await self.get_raw(key)
+        return json.loads(value) if value else None
+    
+    async def set(self, key: str, value: dict, ttl: int = 3600):
+        """Set cached value with TTL in seconds (default 1 hour)."""
+        await self.set_raw(key, json.dumps(value, cls=UUIDEncoder), ttl)
+    
+    async def get_raw(self, key: str) -> Optional[str]:
+        """Get the serialized JSON stored under ``key``, without decoding it."""
         try:
             client = await self.get_client()
             value = await client.get(key)
             if value:
+                self.hits += 1
                 logger.debug(f"Cache HIT: {key}")
-                return json.loads(value)
+                return value
+            self.misses += 1
             logger.debug(f"Cache MISS: {key}")
             return None
         except Exception as e:
             logger.error(f"Cache get error for key {key}: {e}")
             return None
     
-    async def set(self, key: str, value: dict, ttl: int = 3600):
-        """Set cached value with TTL in seconds (default 1 hour)."""
+    async def set_raw(self, key: str, value: str, ttl: int = 3600):
+        """Store already serialized JSON with TTL in seconds."""
         try:
             client = await self.get_client()
-            await client.setex(key, ttl, json.dumps(value, cls=UUIDEncoder))
+            await client.setex(key, ttl, value)
             logger.debug(f"Cache SET: {key} (TTL: {ttl}s)")
         except Exception as e:
             logger.error(f"Cache set error for key {key}: {e}")
     
+    async def get_many_raw(self, keys: List[str]) -> List[Optional[str]]:
+        """Serialized values of several keys with a single MGET, in the order of ``keys``."""
+        if not keys:
+            return []
+        try:
+            client = await self.get_client()
+            values = await client.mget(keys)
+            found = sum(value is not None for value in values)
+            self.hits += found
+            self.misses += len(keys) - found
+            logger.debug(f"Cache MGET: {len(keys)} keys, {found} hits")
+            return values
+        except Exception as e:
+            logger.error(f"Cache mget error for {len(keys)} keys: {e}")
+            return [None] * len(keys)
+    
+    async def set_many_raw(self, values: Dict[str, str], ttl: int = 3600):
+        """Store several serialized values with TTL in one pipelined round trip."""
+        if not values:
+            return
+        try:
+            client = await self.get_client()
+            async with client.pipeline(transaction=False) as pipe:
+                for key, value in values.items():
+                    pipe.setex(key, ttl, value)
+                await pipe.execute()
+            logger.debug(f"Cache SET many: {len(values)} keys (TTL: {ttl}s)")
+        except Exception as e:
+            logger.error(f"Cache set many error for {len(values)} keys: {e}")
+    
     async def delete(self, key: str):
         """Delete cached value by key."""
         try:
@@ -68,6 +221,147 @@ class RedisCache:
         except Exception as e:
             logger.error(f"Cache delete error for key {key}: {e}")
     
+    async def acquire_lock(self, name: str, token: str, ttl_ms: int) -> bool:
+        """Take a short-lived lock (SET NX PX). Fails open: returns True if Redis is unavailable."""
+        try:
+            client = await self.get_client()
+            acquired = await client.set(name, token, nx=True, px=ttl_ms)
+            logger.debug(f"Cache LOCK: {name} ({'acquired' if acquired else 'busy'})")
+            return bool(acquired)
+        except Exception as e:
+            logger.error(f"Cache lock error for {name}: {e}")
+            return True
+    
+    async def release_lock(self, name: str, token: str):
+        """Release a lock taken with ``acquire_lock``, if it is still ours."""
+        try:
+            client = await self.get_client()
+            await client.eval(_RELEASE_LOCK_SCRIPT, 1, name, token)
+            logger.debug(f"Cache UNLOCK: {name}")
+        except Exception as e:
+            logger.error(f"Cache unlock error for {name}: {e}")
+    
+    async def mark_stale(self, key: str, ttl: int = 3600):
+        """Flag a cached value as stale instead of deleting it (stale-while-revalidate)."""
+        try:
+            client = await self.get_client()
+            await client.eval(_MARK_STALE_SCRIPT, 1, stale_key(key), time.time(), uuid.uuid4().hex, ttl)
+            logger.debug(f"Cache MARK STALE: {key}")
+        except Exception as e:
+            logger.error(f"Cache mark stale error for key {key}: {e}")
+    
+    async def clear_stale(self, key: str, token: str):
+        """Drop the stale marker of ``key`` if it still carries ``token``."""
+        try:
+            client = await self.get_client()
+            await client.eval(_CLEAR_STALE_SCRIPT, 1, stale_key(key), token)
+            logger.debug(f"Cache CLEAR STALE: {key}")
+        except Exception as e:
+            logger.error(f"Cache clear stale error for key {key}: {e}")
+    
+    async def set_school_statement(self, school_id: UUID, statement: str, versions: Dict[str, int], ttl: int = 3600):
+        """Store a school statement with the balance row versions it was computed from, atomically."""
+        key = school_statement_key(school_id)
+        try:
+            client = await self.get_client()
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.setex(key, ttl, statement)
+                pipe.delete(school_statement_versions_key(school_id))
+                if versions:
+                    pipe.hset(school_statement_versions_key(school_id), mapping=versions)
+                    pipe.expire(school_statement_versions_key(school_id), ttl)
+                await pipe.execute()
+            logger.debug(f"Cache SET: {key} with {len(versions)} versions (TTL: {ttl}s)")
+        except Exception as e:
+            logger.error(f"Cache set error for key {key}: {e}")
+    
+    async def patch_school_statement(
+        self, school_id: UUID, student_id: UUID, currency: str, version: int, invoiced_cents: int, paid_cents: int
+    ) -> bool:
+        """Apply a balance change to the cached school statement; False if it must be invalidated instead."""
+        key = school_statement_key(school_id)
+        try:
+            client = await self.get_client()
+            patched = await client.eval(
+                _PATCH_SCHOOL_STATEMENT_SCRIPT, 2, key, school_statement_versions_key(school_id),
+                balance_version_field(student_id, currency), version, str(student_id), invoiced_cents, paid_cents,
+                currency,
+            )
+            logger.debug(f"Cache PATCH: {key} ({'patched' if patched else 'not patched'})")
+            return bool(patched)
+        except Exception as e:
+            logger.error(f"Cache patch error for key {key}: {e}")
+            return False
+    
+    async def get_version(self, key: str) -> Optional[int]:
+        """Current value of a version counter. None if it was never started or Redis is unavailable.
+
+        Reading never starts a counter, so an ID nothing was computed or
+        written for has no version, and no ETag.
+        """
+        return (await self.get_versions([key]))[0]
+    
+    async def get_versions(self, keys: List[str]) -> List[Optional[int]]:
+        """Current values of several version counters in one MGET, None for those not started."""
+        if not keys:
+            return []
+        try:
+            client = await self.get_client()
+            versions = await client.mget(keys)
+            logger.debug(f"Cache VERSIONS: {len(keys)} keys")
+            return [int(version) if version is not None else None for version in versions]
+        except Exception as e:
+            logger.error(f"Cache versions error for {len(keys)} keys: {e}")
+            return [None] * len(keys)
+    
+    async def start_versions(self, keys: List[str], ttl: int = 3600):
+        """Start the version counters that are missing, in one pipelined round trip.
+
+        Called once the statements they tag have been computed, i.e. for IDs that exist.
+        """
+        if not keys:
+            return
+        try:
+            client = await self.get_client()
+            now_ms = int(time.time() * 1000)
+            async with client.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.eval(_VERSION_SCRIPT, 1, key, now_ms, ttl, 0)
+                await pipe.execute()
+            logger.debug(f"Cache START VERSIONS: {len(keys)} keys")
+        except Exception as e:
+            logger.error(f"Cache versions error for {len(keys)} keys: {e}")
+    
+    async def bump_version(self, key: str, ttl: int = 3600) -> Optional[int]:
+        """Increment a version counter, starting it if needed, and restart its TTL."""
+        try:
+            client = await self.get_client()
+            version = await client.eval(_VERSION_SCRIPT, 1, key, int(time.time() * 1000), ttl, 1)
+            logger.debug(f"Cache VERSION: {key} = {version}")
+            return int(version)
+        except Exception as e:
+            logger.error(f"Cache version error for key {key}: {e}")
+            return None
+    
+    async def add_stream_entries(self, stream: str, entries: List[Dict[str, str]], maxlen: int = 100000) -> bool:
+        """Append entries to a Redis Stream in one pipelined round trip, trimming it to about ``maxlen``.
+
+        Unlike the cache methods this reports failure, so callers can retry: returns False if Redis is unavailable.
+        """
+        if not entries:
+            return True
+        try:
+            client = await self.get_client()
+            async with client.pipeline(transaction=False) as pipe:
+                for fields in entries:
+                    pipe.xadd(stream, fields, maxlen=maxlen, approximate=True)
+                await pipe.execute()
+            logger.debug(f"Cache XADD: {stream} ({len(entries)} entries)")
+            return True
+        except Exception as e:
+            logger.error(f"Cache stream error for {stream}: {e}")
+            return False
+    
     async def delete_pattern(self, pattern: str):
         """Delete all keys matching pattern."""
         try:
@@ -82,6 +376,183 @@ class RedisCache:
             logger.error(f"Cache delete pattern error for {pattern}: {e}")
 
 
+class LocalCache:
+    """Bounded in-process LRU of serialized values, each kept for at most ``ttl`` seconds."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 5.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        # Bumped on every invalidation, so a value fetched from Redis while an
+        # invalidation came in is not stored
+        self.generation = 0
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, pattern: str):
+        """Drop ``pattern``, which may be a key or a glob-style pattern."""
+        self.generation += 1
+        if any(char in pattern for char in "*?["):
+            for key in [key for key in self._entries if fnmatchcase(key, pattern)]:
+                del self._entries[key]
+        else:
+            self._entries.pop(pattern, None)
+
+    def clear(self):
+        self.generation += 1
+        self._entries.clear()
+
+
+class TieredCache(RedisCache):
+    """RedisCache with an in-process L1 tier in front of it.
+
+    Every write through this class drops the key from the local tier and
+    publishes it on ``INVALIDATION_CHANNEL``, so every other worker drops
+    its copy too. The local tier is only read while the subscription is up:
+    after a disconnect it is cleared and bypassed until the worker is
+    subscribed again, and the TTL bounds staleness from lost messages.
+    """
+
+    def __init__(self, redis_url: str = "redis://redis:6379", max_entries: int = 1024, ttl: float = 5.0):
+        super().__init__(redis_url)
+        self.local = LocalCache(max_entries, ttl)
+        self.local_hits = 0
+        self.local_misses = 0
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribed = False
+
+    def stats(self) -> Dict[str, dict]:
+        return {"l1": tier_stats(self.local_hits, self.local_misses), **super().stats()}
+
+    async def close(self):
+        if self._listener:
+            self._listener.cancel()
+        await super().close()
+
+    async def get_raw(self, key: str) -> Optional[str]:
+        if self._local_enabled():
+            value = self.local.get(key)
+            if value is not None:
+                self.local_hits += 1
+                return value
+            self.local_misses += 1
+        generation = self.local.generation
+        value = await super().get_raw(key)
+        if value is not None and self._subscribed and generation == self.local.generation:
+            self.local.set(key, value)
+        return value
+
+    async def get_many_raw(self, keys: List[str]) -> List[Optional[str]]:
+        if not self._local_enabled():
+            return await super().get_many_raw(keys)
+        values = [self.local.get(key) for key in keys]
+        missing = [key for key, value in zip(keys, values) if value is None]
+        self.local_hits += len(keys) - len(missing)
+        self.local_misses += len(missing)
+        if missing:
+            generation = self.local.generation
+            fetched = dict(zip(missing, await super().get_many_raw(missing)))
+            values = [fetched[key] if value is None else value for key, value in zip(keys, values)]
+            if self._subscribed and generation == self.local.generation:
+                for key in missing:
+                    if fetched[key] is not None:
+                        self.local.set(key, fetched[key])
+        return values
+
+    async def set_raw(self, key: str, value: str, ttl: int = 3600):
+        await super().set_raw(key, value, ttl)
+        await self._invalidate_everywhere(key)
+
+    async def set_many_raw(self, values: Dict[str, str], ttl: int = 3600):
+        await super().set_many_raw(values, ttl)
+        await self._invalidate_everywhere(*values)
+
+    async def delete(self, key: str):
+        await super().delete(key)
+        await self._invalidate_everywhere(key)
+
+    async def delete_pattern(self, pattern: str):
+        await super().delete_pattern(pattern)
+        await self._invalidate_everywhere(pattern)
+
+    async def set_school_statement(self, school_id: UUID, statement: str, versions: Dict[str, int], ttl: int = 3600):
+        await super().set_school_statement(school_id, statement, versions, ttl)
+        await self._invalidate_everywhere(school_statement_key(school_id))
+
+    async def patch_school_statement(
+        self, school_id: UUID, student_id: UUID, currency: str, version: int, invoiced_cents: int, paid_cents: int
+    ) -> bool:
+        patched = await super().patch_school_statement(
+            school_id, student_id, currency, version, invoiced_cents, paid_cents
+        )
+        if patched:
+            await self._invalidate_everywhere(school_statement_key(school_id))
+        return patched
+
+    async def mark_stale(self, key: str, ttl: int = 3600):
+        await super().mark_stale(key, ttl)
+        await self._invalidate_everywhere(stale_key(key))
+
+    async def clear_stale(self, key: str, token: str):
+        await super().clear_stale(key, token)
+        await self._invalidate_everywhere(stale_key(key))
+
+    def _local_enabled(self) -> bool:
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        return self._subscribed
+
+    async def _invalidate_everywhere(self, *patterns: str):
+        for pattern in patterns:
+            self.local.discard(pattern)
+        try:
+            client = await self.get_client()
+            async with client.pipeline(transaction=False) as pipe:
+                for pattern in patterns:
+                    pipe.publish(INVALIDATION_CHANNEL, pattern)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Cache invalidation publish error for {len(patterns)} keys: {e}")
+
+    async def _listen(self):
+        """Drop keys announced on the invalidation channel, reconnecting on errors."""
+        while True:
+            try:
+                client = await self.get_client()
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "subscribe":
+                            # Anything published while unsubscribed was missed
+                            self.local.clear()
+                            self._subscribed = True
+                        elif message["type"] == "message":
+                            self.local.discard(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cache invalidation subscription error: {e}")
+            finally:
+                self._subscribed = False
+                self.local.clear()
+            await asyncio.sleep(1)
+
+
 # Cache key generators
 def student_statement_key(student_id: UUID) -> str:
     return f"statement:student:{student_id}"
@@ -89,10 +560,114 @@ def student_statement_key(student_id: UUID) -> str:
 def school_statement_key(school_id: UUID) -> str:
     return f"statement:school:{school_id}"
 
-def student_pattern(student_id: UUID) -> str:
-    """Pattern to match all cache keys related to a student."""
-    return f"statement:student:{student_id}*"
+def school_statement_versions_key(school_id: UUID) -> str:
+    """Hash of the balance row versions the cached school statement was computed from."""
+    return f"statement:school:{school_id}:versions"
+
+def balance_version_field(student_id: UUID, currency: str) -> str:
+    return f"{student_id}:{currency}"
+
+def school_aging_key(school_id: UUID) -> str:
+    return f"statement:school:{school_id}:aging"
+
+def school_rollup_key(school_versions: Dict[UUID, int]) -> str:
+    """Key of a roll-up over the given schools at the given versions.
+
+    Any write to a member school bumps its version, so the roll-up moves to
+    a new key; the old one is never read again and expires.
+    """
+    members = ",".join(f"{school_id}:{version}" for school_id, version in sorted(school_versions.items(), key=lambda item: str(item[0])))
+    return f"statement:rollup:{hashlib.sha1(members.encode()).hexdigest()}"
+
+def student_version_key(student_id: UUID) -> str:
+    """Counter bumped on every change to a student's statement; the statement's ETag."""
+    return f"version:student:{student_id}"
+
+def school_version_key(school_id: UUID) -> str:
+    """Counter bumped on every change to a school's statement and aging report."""
+    return f"version:school:{school_id}"
+
+def idempotency_key(scope: str, key: str) -> str:
+    """Stored response of a request sent with an ``Idempotency-Key`` header."""
+    return f"idempotency:{scope}:{key}"
+
+def lock_key(key: str) -> str:
+    return f"lock:{key}"
+
+def stale_key(key: str) -> str:
+    """Marker holding ``{"since": <epoch seconds>, "token": ...}`` while ``key`` is stale."""
+    return f"stale:{key}"
+
+
+async def patch_school_statement(cache: RedisCache, school_id: UUID, changes: Sequence["BalanceChange"]) -> bool:
+    """Apply committed balance changes to the cached school statement in place.
+
+    Returns False when the statement has to be invalidated instead: nothing
+    is cached, a student leaves the statement (no invoices left) or enters
+    it, or the cached value is not exactly one version behind a change.
+    """
+    if not changes:
+        return False
+    for change in changes:
+        if change.invoice_count <= 0:
+            return False
+        patched = await cache.patch_school_statement(
+            school_id, change.student_id, change.currency, change.version,
+            change.invoiced_cents, change.paid_cents,
+        )
+        if not patched:
+            return False
+    return True
+
+
+async def invalidate_student_statements(
+    cache: RedisCache,
+    student_id: UUID,
+    school_id: UUID,
+    mark_stale: bool = False,
+    changes: Sequence["BalanceChange"] = (),
+) -> List[str]:
+    """Drop (or, with ``mark_stale``, flag as stale) every cached statement that includes the given student.
+
+    The school statement is patched with ``changes`` instead when possible.
+    The student and school version counters are bumped afterwards, so an
+    ETag never names a value that is still cached. Returns the keys invalidated.
+    """
+    keys = [student_statement_key(student_id), school_aging_key(school_id)]
+    if not await patch_school_statement(cache, school_id, changes):
+        keys.insert(1, school_statement_key(school_id))
+    for key in keys:
+        if mark_stale:
+            await cache.mark_stale(key)
+        else:
+            await cache.delete(key)
+    await cache.bump_version(student_version_key(student_id))
+    await cache.bump_version(school_version_key(school_id))
+    return keys
+
+
+async def invalidate_statements(
+    cache: RedisCache,
+    student_ids: Iterable[UUID],
+    school_ids: Iterable[UUID],
+    mark_stale: bool = False,
+) -> List[str]:
+    """Like ``invalidate_student_statements`` for many students at once, without patching.
 
-def school_pattern(school_id: UUID) -> str:
-    """Pattern to match all cache keys related to a school."""
-    return f"statement:school:{school_id}*"
+    Every key is invalidated and every version counter bumped once, however
+    many of the given students share a school. Returns the keys invalidated.
+    """
+    student_ids, school_ids = set(student_ids), set(school_ids)
+    keys = [student_statement_key(student_id) for student_id in student_ids]
+    for school_id in school_ids:
+        keys += [school_statement_key(school_id), school_aging_key(school_id)]
+    for key in keys:
+        if mark_stale:
+            await cache.mark_stale(key)
+        else:
+            await cache.delete(key)
+    for student_id in student_ids:
+        await cache.bump_version(student_version_key(student_id))
+    for school_id in school_ids:
+        await cache.bump_version(school_version_key(school_id))
+    return keys
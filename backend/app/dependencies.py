@@ -1,51 +1,107 @@
+from typing import Optional
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import get_db
-from app.cache import RedisCache
+from app.cache import RedisCache, TieredCache
+from app.settings import get_settings
 from app.services import (
     AccountStatementService,
     InvoiceService,
     PaymentService,
+    PaymentImportService,
     SchoolService,
     StudentService,
+    StatementCacheWarmer,
 )
 
 # Cache instance - created once per application lifecycle
 _cache_instance = None
+_warmer_instance = None
 
 
 async def get_cache() -> RedisCache:
     """Get or create Redis cache instance."""
     global _cache_instance
     if _cache_instance is None:
-        _cache_instance = RedisCache()
+        settings = get_settings()
+        if settings.cache_l1_enabled:
+            _cache_instance = TieredCache(max_entries=settings.cache_l1_max_entries, ttl=settings.cache_l1_ttl)
+        else:
+            _cache_instance = RedisCache()
     return _cache_instance
 
 
-async def get_school_service(db: AsyncSession = Depends(get_db)) -> SchoolService:
-    return SchoolService(db)
+def get_warmer_instance(cache: RedisCache) -> StatementCacheWarmer:
+    """Get or create the statement cache warmer shared by the lifespan task and the write services."""
+    global _warmer_instance
+    if _warmer_instance is None:
+        settings = get_settings()
+        _warmer_instance = StatementCacheWarmer(
+            cache,
+            concurrency=settings.statement_cache_warm_concurrency,
+            rewarm_on_invalidate=settings.statement_cache_rewarm,
+            max_staleness=(
+                settings.statement_cache_max_staleness
+                if settings.statement_cache_stale_while_revalidate else None
+            ),
+        )
+    return _warmer_instance
 
 
-async def get_student_service(db: AsyncSession = Depends(get_db)) -> StudentService:
-    return StudentService(db)
+async def get_statement_cache_warmer(
+    cache: RedisCache = Depends(get_cache)
+) -> Optional[StatementCacheWarmer]:
+    """The warmer services invalidate and refresh statements through, or None when
+    neither re-warming nor stale-while-revalidate is enabled."""
+    settings = get_settings()
+    if not (settings.statement_cache_rewarm or settings.statement_cache_stale_while_revalidate):
+        return None
+    return get_warmer_instance(cache)
+
+
+async def get_school_service(
+    db: AsyncSession = Depends(get_db),
+    cache: RedisCache = Depends(get_cache),
+    warmer: Optional[StatementCacheWarmer] = Depends(get_statement_cache_warmer)
+) -> SchoolService:
+    return SchoolService(db, cache, warmer, publish_events_inline=get_settings().outbox_publish_inline)
+
+
+async def get_student_service(
+    db: AsyncSession = Depends(get_db),
+    cache: RedisCache = Depends(get_cache),
+    warmer: Optional[StatementCacheWarmer] = Depends(get_statement_cache_warmer)
+) -> StudentService:
+    return StudentService(db, cache, warmer, publish_events_inline=get_settings().outbox_publish_inline)
 
 
 async def get_invoice_service(
     db: AsyncSession = Depends(get_db),
-    cache: RedisCache = Depends(get_cache)
+    cache: RedisCache = Depends(get_cache),
+    warmer: Optional[StatementCacheWarmer] = Depends(get_statement_cache_warmer)
 ) -> InvoiceService:
-    return InvoiceService(db, cache)
+    return InvoiceService(db, cache, warmer, publish_events_inline=get_settings().outbox_publish_inline)
 
 
 async def get_payment_service(
     db: AsyncSession = Depends(get_db),
-    cache: RedisCache = Depends(get_cache)
+    cache: RedisCache = Depends(get_cache),
+    warmer: Optional[StatementCacheWarmer] = Depends(get_statement_cache_warmer)
 ) -> PaymentService:
-    return PaymentService(db, cache)
+    return PaymentService(db, cache, warmer, publish_events_inline=get_settings().outbox_publish_inline)
 
 
 async def get_account_statement_service(
     db: AsyncSession = Depends(get_db),
-    cache: RedisCache = Depends(get_cache)
+    cache: RedisCache = Depends(get_cache),
+    warmer: Optional[StatementCacheWarmer] = Depends(get_statement_cache_warmer)
 ) -> AccountStatementService:
-    return AccountStatementService(db, cache)
+    return AccountStatementService(db, cache, warmer)
+
+
+async def get_payment_import_service(
+    db: AsyncSession = Depends(get_db),
+    cache: RedisCache = Depends(get_cache),
+    warmer: Optional[StatementCacheWarmer] = Depends(get_statement_cache_warmer)
+) -> PaymentImportService:
+    return PaymentImportService(db, cache, warmer, publish_events_inline=get_settings().outbox_publish_inline)
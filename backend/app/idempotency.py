@@ -0,0 +1,80 @@
+from typing import Any, Awaitable, Callable, NamedTuple, Tuple
+from app.cache import RedisCache, idempotency_key
+from app.single_flight import SingleFlight, SingleFlightTimeout
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyKeyReused(ValueError):
+    """The key was already used for a request with a different body."""
+
+
+class IdempotencyInProgress(TimeoutError):
+    """A request with the same key is still running in another worker."""
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    body: Any
+
+
+class Idempotency:
+    """Replays the stored response of requests retried with the same ``Idempotency-Key``.
+
+    The first request runs and its response is stored in Redis for ``ttl``
+    seconds; later requests with the key get the stored response without
+    running again. Duplicates that arrive while the first one is running wait
+    for it, through ``SingleFlight``, and never run themselves: if the first
+    request takes longer than ``wait_timeout`` they fail with
+    IdempotencyInProgress. A key reused with a different request body is
+    rejected with IdempotencyKeyReused.
+
+    If Redis is unavailable requests run without the guarantee, like the
+    rest of the cache fails open.
+    """
+
+    def __init__(self, cache: RedisCache, ttl: int = 86400, wait_timeout: float = 10.0):
+        self.cache = cache
+        self.ttl = ttl
+        # The lock outlives any request that could still be running when waiters give up
+        self.single_flight = SingleFlight(
+            cache, lock_ttl_ms=int(wait_timeout * 3000), wait_timeout=wait_timeout, compute_on_timeout=False
+        )
+
+    async def run(
+        self,
+        scope: str,
+        key: str,
+        fingerprint: str,
+        compute: Callable[[], Awaitable[Tuple[int, Any]]],
+    ) -> StoredResponse:
+        """The response to the request identified by ``key`` within ``scope``.
+
+        ``fingerprint`` identifies the request body. ``compute`` runs the
+        request and returns its status code and JSON-serializable body.
+        """
+        cache_key = idempotency_key(scope, key)
+
+        async def load():
+            return await self.cache.get(cache_key)
+
+        async def compute_and_store():
+            # A request that finished just before this one took the lock
+            stored = await load()
+            if stored is not None:
+                return stored
+            status_code, body = await compute()
+            stored = {"fingerprint": fingerprint, "status_code": status_code, "body": body}
+            await self.cache.set(cache_key, stored, ttl=self.ttl)
+            return stored
+
+        stored = await load()
+        if stored is None:
+            try:
+                stored = await self.single_flight.run(cache_key, compute_and_store, load)
+            except SingleFlightTimeout:
+                raise IdempotencyInProgress(f"A request with idempotency key {key} is still in progress")
+        if stored["fingerprint"] != fingerprint:
+            raise IdempotencyKeyReused(f"Idempotency key {key} was already used for a different request")
+        return StoredResponse(stored["status_code"], stored["body"])
@@ -1,12 +1,59 @@
 import os
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import schools, students, invoices, payments, account_statements, auth
+from app.cache import RedisCache
+from app.dependencies import get_cache, get_warmer_instance, get_statement_cache_warmer
+from app.services import OutboxRelay
+from app.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_statement_cache():
+    warmer = get_warmer_instance(await get_cache())
+    try:
+        schools_warmed = await warmer.warm_all()
+        logger.info(f"Statement cache warmed for {schools_warmed} school(s)")
+    except Exception as e:
+        logger.warning(f"Statement cache warming failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    cache = await get_cache()
+    warming = None
+    if settings.statement_cache_warm_on_startup:
+        # Serve requests right away; cold statements are computed on demand meanwhile
+        warming = asyncio.create_task(warm_statement_cache())
+    relay = None
+    if settings.outbox_relay_enabled:
+        # Publishes the outbox events writes did not publish themselves
+        relay = asyncio.create_task(OutboxRelay(
+            cache,
+            await get_statement_cache_warmer(cache),
+            batch_size=settings.outbox_relay_batch_size,
+            poll_interval=settings.outbox_relay_poll_interval,
+        ).run())
+    yield
+    if warming:
+        warming.cancel()
+    if relay:
+        relay.cancel()
+    if settings.statement_cache_rewarm or settings.statement_cache_stale_while_revalidate:
+        await get_warmer_instance(cache).wait_for_rewarms()
+    await cache.close()
+
 
 app = FastAPI(
     title="Mattilda API",
     description="School billing management system",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS for development and production
@@ -40,3 +87,9 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/health/cache")
+async def cache_stats(cache: RedisCache = Depends(get_cache)):
+    """Hit ratios of this worker, per cache tier."""
+    return cache.stats()
@@ -4,6 +4,9 @@ from .invoice import Invoice
 from .payment import Payment
 from .payment_imputation import PaymentImputation
 from .user import User
+from .student_balance import StudentBalance
+from .balance_snapshot import BalanceSnapshot
+from .outbox_event import OutboxEvent
 from .enums import payment_method_type
 
-__all__ = ["School", "Student", "Invoice", "Payment", "PaymentImputation", "User", "payment_method_type"]
+__all__ = ["School", "Student", "Invoice", "Payment", "PaymentImputation", "User", "StudentBalance", "BalanceSnapshot", "OutboxEvent", "payment_method_type"]
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, ForeignKey, Integer, BigInteger, DateTime
+from sqlalchemy.dialects.postgresql import UUID
+from app.db import Base
+
+
+class BalanceSnapshot(Base):
+    """Closing balance of a student in one currency at the end of a period.
+
+    Written by ``BalanceSnapshotService.close_period``; point-in-time statements
+    start from the latest snapshot and only add the activity after it.
+    """
+    __tablename__ = "balance_snapshots"
+
+    period_end = Column(DateTime, primary_key=True)
+    student_id = Column(UUID(as_uuid=True), ForeignKey("students.id", ondelete="CASCADE"), primary_key=True, index=True)
+    currency = Column(String(3), primary_key=True)
+    invoice_count = Column(Integer, nullable=False, default=0)
+    invoiced_cents = Column(BigInteger, nullable=False, default=0)
+    paid_cents = Column(BigInteger, nullable=False, default=0)
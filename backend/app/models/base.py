@@ -1,6 +1,7 @@
 from datetime import datetime
-from sqlalchemy import Column, DateTime
+from sqlalchemy import Column, DateTime, event
 from sqlalchemy.ext.declarative import declared_attr
+from sqlalchemy.orm import ORMExecuteState, Session, with_loader_criteria
 
 
 class TimestampMixin:
@@ -31,3 +32,26 @@ class SoftDeleteMixin:
     
     def restore(self):
         self.revoked_at = None
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _exclude_revoked_rows(execute_state: ORMExecuteState):
+    """Leave revoked rows out of every ORM statement, subqueries and joins included.
+
+    Applies to selects as well as to the selects nested in INSERT ... SELECT
+    and UPDATE statements. Pass ``execution_options(include_revoked=True)``
+    to see revoked rows. Lazy and column loads inherit the criteria from the
+    statement that loaded the parent, so they are skipped here.
+
+    Since revoked rows are never read, the indexes of soft-deletable tables
+    are partial (``WHERE revoked_at IS NULL``) and leave them out.
+    """
+    if (
+        execute_state.is_column_load
+        or execute_state.is_relationship_load
+        or execute_state.execution_options.get("include_revoked", False)
+    ):
+        return
+    execute_state.statement = execute_state.statement.options(
+        with_loader_criteria(SoftDeleteMixin, lambda cls: cls.revoked_at.is_(None), include_aliases=True)
+    )
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, ForeignKey, DateTime, Integer
+from sqlalchemy import Column, String, ForeignKey, DateTime, Integer, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.db import Base
@@ -15,8 +15,16 @@ class Invoice(Base, TimestampMixin, SoftDeleteMixin):
     amount_cents = Column(Integer, nullable=False)
     currency = Column(String(3), nullable=False, default="USD")
     description = Column(String, nullable=True)
-    issued_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    issued_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
     due_date = Column(DateTime, nullable=True)
     
     student = relationship("Student", back_populates="invoices")
     payment_imputations = relationship("PaymentImputation", back_populates="invoice", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Keyset pagination of a student's invoices by issue date
+        Index(
+            "ix_invoices_student_id_issued_at", "student_id", "issued_at", "id",
+            postgresql_where=text("revoked_at IS NULL"),
+        ),
+    )
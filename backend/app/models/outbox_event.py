@@ -0,0 +1,23 @@
+from datetime import datetime
+from sqlalchemy import Column, String, BigInteger, DateTime
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from app.db import Base
+
+
+class OutboxEvent(Base):
+    """A ledger change waiting to be published (transactional outbox).
+
+    Written by the invoice and payment services in the same transaction as
+    the change itself, and deleted by ``OutboxService.publish`` once the
+    affected statements are invalidated and the event is on the Redis Stream.
+    A row left behind by a crash is picked up by the background relay.
+    """
+    __tablename__ = "outbox_events"
+
+    # Ascending, so events are published in the order they were written
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    event_type = Column(String, nullable=False)
+    student_id = Column(UUID(as_uuid=True), nullable=False)
+    school_id = Column(UUID(as_uuid=True), nullable=False)
+    payload = Column(JSONB, nullable=False, default=dict)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Enum as SQLAlchemyEnum
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Index, func, text, Enum as SQLAlchemyEnum
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.db import Base
@@ -15,9 +15,18 @@ class Payment(Base, TimestampMixin, SoftDeleteMixin):
     student_id = Column(UUID(as_uuid=True), ForeignKey("students.id"), nullable=False)
     amount_cents = Column(Integer, nullable=False)
     currency = Column(String(3), nullable=False, default="USD")
-    payment_date = Column(DateTime, nullable=False, default=datetime.utcnow)
+    payment_date = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
     payment_method = Column(SQLAlchemyEnum(PaymentMethod), nullable=False)
     reference = Column(String, nullable=True)
     
     student = relationship("Student")
     payment_imputations = relationship("PaymentImputation", back_populates="payment", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_payments_student_id", "student_id", postgresql_where=text("revoked_at IS NULL")),
+        # Bank reconciliation looks payments up by trimmed reference
+        Index(
+            "ix_payments_reference", func.btrim(reference), "payment_date",
+            postgresql_where=text("revoked_at IS NULL AND reference IS NOT NULL"),
+        ),
+    )
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import Column, ForeignKey, Integer, String, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.db import Base
@@ -17,3 +17,8 @@ class PaymentImputation(Base, TimestampMixin, SoftDeleteMixin):
     
     payment = relationship("Payment", back_populates="payment_imputations")
     invoice = relationship("Invoice", back_populates="payment_imputations")
+
+    __table_args__ = (
+        Index("ix_payment_imputations_payment_id", "payment_id", postgresql_where=text("revoked_at IS NULL")),
+        Index("ix_payment_imputations_invoice_id", "invoice_id", postgresql_where=text("revoked_at IS NULL")),
+    )
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, String, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.db import Base
@@ -16,3 +16,8 @@ class Student(Base, TimestampMixin, SoftDeleteMixin):
     
     school = relationship("School", back_populates="students")
     invoices = relationship("Invoice", back_populates="student", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Keyset pagination of a school's students by name
+        Index("ix_students_school_id_name", "school_id", "name", "id", postgresql_where=text("revoked_at IS NULL")),
+    )
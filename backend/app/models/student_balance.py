@@ -0,0 +1,28 @@
+from sqlalchemy import Column, String, ForeignKey, Integer, BigInteger, Index
+from sqlalchemy.dialects.postgresql import UUID
+from app.db import Base
+
+
+class StudentBalance(Base):
+    """Per student and currency running totals, maintained by the write services.
+
+    This is a projection of ``invoices`` and ``payment_imputations``; it can be
+    recomputed at any time with ``StudentBalanceService.rebuild``.
+    """
+    __tablename__ = "student_balances"
+
+    student_id = Column(UUID(as_uuid=True), ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+    currency = Column(String(3), primary_key=True)
+    school_id = Column(UUID(as_uuid=True), ForeignKey("schools.id", ondelete="CASCADE"), nullable=False)
+    invoice_count = Column(Integer, nullable=False, default=0)
+    invoiced_cents = Column(BigInteger, nullable=False, default=0)
+    paid_cents = Column(BigInteger, nullable=False, default=0)
+    outstanding_cents = Column(BigInteger, nullable=False, default=0)
+    # Bumped on every change to the row; cached school statements record the
+    # versions they were computed from (see ``patch_school_statement``)
+    version = Column(BigInteger, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        # Keyset pagination of a school's students by outstanding amount
+        Index("ix_student_balances_school_outstanding", "school_id", outstanding_cents.desc(), "student_id"),
+    )
@@ -1,4 +1,7 @@
-from typing import Generic, TypeVar, List, Optional
+import base64
+import binascii
+import json
+from typing import Any, Generic, TypeVar, List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 from sqlalchemy import select, and_
@@ -71,3 +74,19 @@ class CursorPagination:
             next_cursor = items[-1].created_at.isoformat()
         
         return items, next_cursor, has_more
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encode the sort key of the last row of a page into an opaque cursor."""
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[List[Any]]:
+    """Decode a cursor produced by ``encode_cursor``; invalid cursors are ignored."""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        return None
+    return values if isinstance(values, list) else None
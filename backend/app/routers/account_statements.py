@@ -1,35 +1,166 @@
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from app.dependencies import get_account_statement_service
 from app.services import AccountStatementService
-from app.schemas import StudentAccountStatement, SchoolAccountStatement
+from app.schemas import (
+    StudentAccountStatement, SchoolAccountStatement, StudentSummaryOrder, InvoiceStatus,
+    StudentStatementBatchRequest, StudentStatementBatch, SchoolAgingReport, SchoolRollupStatement
+)
+from app.schemas.account_statement import MAX_ROLLUP_SCHOOLS
 from app.auth import get_current_active_user
 from app.models.user import User
 
 router = APIRouter(prefix="/account-statements", tags=["account-statements"])
 
 
+def _cached_json_response(
+    content: str, service: AccountStatementService, etag: Optional[str] = None
+) -> Response:
+    """Return cached JSON as is, skipping response model validation and serialization."""
+    response = Response(content=content, media_type="application/json")
+    # Tell clients the body came from a cached value that is being refreshed
+    if service.served_stale:
+        response.headers["Stale"] = "true"
+    elif etag:
+        # A stale body predates the current version, so it must not carry its ETag
+        response.headers["ETag"] = etag
+    return response
+
+
+def _not_modified(request: Request, etag: Optional[str]) -> Optional[Response]:
+    """A 304 response if the client's If-None-Match matches ``etag``, else None."""
+    if_none_match = request.headers.get("if-none-match")
+    if not etag or not if_none_match:
+        return None
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    if "*" in tags or etag in tags:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
+
+
 @router.get("/students/{student_id}", response_model=StudentAccountStatement)
 async def get_student_statement(
+    request: Request,
     student_id: UUID,
+    as_of: Optional[datetime] = Query(None, description="Statement as of this moment (not cached)"),
+    invoice_status: Optional[InvoiceStatus] = Query(
+        None, alias="status", description="Only list invoices with this payment status (not cached)"
+    ),
+    issued_after: Optional[datetime] = Query(None, description="Only list invoices issued after this moment"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Paginate the invoice listing"),
+    cursor: Optional[str] = Query(None),
     service: AccountStatementService = Depends(get_account_statement_service),
     current_user: User = Depends(get_current_active_user),
 ):
+    """Totals always cover every invoice; ``status``, ``issued_after`` and ``limit`` only narrow the listing."""
     try:
-        statement = await service.get_student_statement(student_id)
-        return statement
+        if as_of is not None or invoice_status is not None or issued_after is not None or limit is not None:
+            return await service.get_student_statement(
+                student_id, as_of=as_of, status=invoice_status, issued_after=issued_after, limit=limit, cursor=cursor
+            )
+        # The version is read before the statement, so the ETag never names a newer body
+        etag = await service.student_statement_etag(student_id)
+        not_modified = _not_modified(request, etag)
+        if not_modified:
+            return not_modified
+        return _cached_json_response(await service.get_student_statement_json(student_id), service, etag)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
+@router.post("/students:batch", response_model=StudentStatementBatch)
+async def get_student_statements(
+    batch: StudentStatementBatchRequest,
+    service: AccountStatementService = Depends(get_account_statement_service),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Statements for many students in one call; unknown students are reported in ``errors``."""
+    return _cached_json_response(await service.get_student_statements_json(batch.student_ids), service)
+
+
 @router.get("/schools/{school_id}", response_model=SchoolAccountStatement)
 async def get_school_statement(
+    request: Request,
+    school_id: UUID,
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Paginate the student breakdown"),
+    cursor: Optional[str] = Query(None),
+    order_by: StudentSummaryOrder = Query("name", description="Order of the paginated breakdown"),
+    as_of: Optional[datetime] = Query(None, description="Statement as of this moment (not cached)"),
+    service: AccountStatementService = Depends(get_account_statement_service),
+    current_user: User = Depends(get_current_active_user),
+):
+    if as_of is not None and limit is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Point-in-time statements cannot be paginated"
+        )
+    try:
+        if as_of is not None or limit is not None:
+            return await service.get_school_statement(
+                school_id, limit=limit, cursor=cursor, order_by=order_by, as_of=as_of
+            )
+        etag = await service.school_statement_etag(school_id)
+        not_modified = _not_modified(request, etag)
+        if not_modified:
+            return not_modified
+        return _cached_json_response(await service.get_school_statement_json(school_id), service, etag)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+@router.get("/schools/{school_id}/aging", response_model=SchoolAgingReport)
+async def get_school_aging(
+    request: Request,
+    school_id: UUID,
+    service: AccountStatementService = Depends(get_account_statement_service),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Outstanding amounts per student in current, 1-30, 31-60, 61-90 and 90+ days past due buckets."""
+    try:
+        etag = await service.school_aging_etag(school_id)
+        not_modified = _not_modified(request, etag)
+        if not_modified:
+            return not_modified
+        return _cached_json_response(await service.get_school_aging_json(school_id), service, etag)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+@router.get("/rollup", response_model=SchoolRollupStatement)
+async def get_school_rollup(
+    request: Request,
+    school_ids: List[UUID] = Query(..., alias="school_id", description="Schools to consolidate (repeatable)"),
+    service: AccountStatementService = Depends(get_account_statement_service),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Consolidated totals over several schools, with one subtotal per school."""
+    if len(set(school_ids)) > MAX_ROLLUP_SCHOOLS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {MAX_ROLLUP_SCHOOLS} schools can be rolled up at once"
+        )
+    try:
+        etag = await service.school_rollup_etag(school_ids)
+        not_modified = _not_modified(request, etag)
+        if not_modified:
+            return not_modified
+        return _cached_json_response(await service.get_school_rollup_json(school_ids), service, etag)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
+@router.get("/schools/{school_id}/stream", response_class=StreamingResponse)
+async def stream_school_statement(
     school_id: UUID,
     service: AccountStatementService = Depends(get_account_statement_service),
     current_user: User = Depends(get_current_active_user),
 ):
+    """School statement as NDJSON: a school header, one line per student, then the totals."""
     try:
-        statement = await service.get_school_statement(school_id)
-        return statement
+        records = await service.stream_school_statement(school_id)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    return StreamingResponse(records, media_type="application/x-ndjson")
@@ -20,16 +20,16 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user."""
-    # Check if email already exists
-    result = await db.execute(select(User).where(User.email == user_data.email))
+    # Check if email already exists, revoked accounts included (the column is unique)
+    result = await db.execute(select(User).where(User.email == user_data.email).execution_options(include_revoked=True))
     if result.scalar_one_or_none():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    # Check if username already exists
-    result = await db.execute(select(User).where(User.username == user_data.username))
+    # Check if username already exists, revoked accounts included
+    result = await db.execute(select(User).where(User.username == user_data.username).execution_options(include_revoked=True))
     if result.scalar_one_or_none():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -57,7 +57,7 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
 async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
     """Login with username and password."""
     # Find user by username
-    result = await db.execute(select(User).where(User.username == user_data.username))
+    result = await db.execute(select(User).where(User.username == user_data.username).execution_options(include_revoked=True))
     user = result.scalar_one_or_none()
     
     if not user or not verify_password(user_data.password, user.hashed_password):
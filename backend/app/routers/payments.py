@@ -1,26 +1,89 @@
+import hashlib
 from uuid import UUID
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from app.dependencies import get_payment_service
-from app.services import PaymentService
-from app.schemas import PaymentCreate, PaymentResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status, Query
+from fastapi.responses import JSONResponse
+from app.cache import RedisCache
+from app.dependencies import get_cache, get_payment_service, get_payment_import_service
+from app.idempotency import Idempotency, IdempotencyInProgress, IdempotencyKeyReused
+from app.settings import get_settings
+from app.services import PaymentService, PaymentImportService
+from app.services.payment_import_service import DEFAULT_IMPORT_BATCH_SIZE, iter_lines
+from app.schemas import PaymentCreate, PaymentResponse, PaymentImportResult
 from app.auth import get_current_active_user
 from app.models.user import User
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 
+# Import formats by request content type
+IMPORT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+}
+
 
 @router.post("/", response_model=PaymentResponse, status_code=status.HTTP_201_CREATED)
 async def create_payment(
     payment_data: PaymentCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
     service: PaymentService = Depends(get_payment_service),
+    cache: RedisCache = Depends(get_cache),
     current_user: User = Depends(get_current_active_user),
 ):
+    """Create a payment.
+
+    Clients that retry should send an ``Idempotency-Key`` header: a request
+    repeated with the same key and body gets the response of the first one
+    back, and the payment is only created once.
+    """
+    if idempotency_key is None:
+        try:
+            payment = await service.create_payment(payment_data)
+            return payment
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    async def create():
+        try:
+            payment = await service.create_payment(payment_data)
+        except ValueError as e:
+            return status.HTTP_400_BAD_REQUEST, {"detail": str(e)}
+        return status.HTTP_201_CREATED, PaymentResponse.model_validate(payment).model_dump(mode="json")
+
+    idempotency = Idempotency(cache, ttl=get_settings().idempotency_ttl)
     try:
-        payment = await service.create_payment(payment_data)
-        return payment
-    except ValueError as e:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        response = await idempotency.run(
+            f"payments:{current_user.id}",
+            idempotency_key,
+            hashlib.sha256(payment_data.model_dump_json().encode()).hexdigest(),
+            create,
+        )
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except IdempotencyInProgress as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return JSONResponse(status_code=response.status_code, content=response.body)
+
+
+@router.post("/import", response_model=PaymentImportResult)
+async def import_payments(
+    request: Request,
+    batch_size: int = Query(DEFAULT_IMPORT_BATCH_SIZE, ge=1, le=10000),
+    service: PaymentImportService = Depends(get_payment_import_service),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Import a settlement file, streamed as CSV (``text/csv``) or NDJSON (``application/x-ndjson``).
+
+    Valid rows are imported even if others fail; failed rows are reported by line.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    file_format = IMPORT_CONTENT_TYPES.get(content_type)
+    if file_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content type must be one of {', '.join(IMPORT_CONTENT_TYPES)}",
+        )
+    return await service.import_payments(iter_lines(request.stream()), file_format, batch_size=batch_size)
 
 
 @router.get("/", response_model=List[PaymentResponse])
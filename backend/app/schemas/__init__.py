@@ -1,15 +1,23 @@
 from app.schemas.school import SchoolCreate, SchoolUpdate, SchoolResponse
 from app.schemas.student import StudentCreate, StudentUpdate, StudentResponse
 from app.schemas.invoice import InvoiceCreate, InvoiceUpdate, InvoiceResponse
-from app.schemas.payment import PaymentCreate, PaymentResponse
+from app.schemas.payment import (
+    PaymentCreate, PaymentResponse, PaymentAllocation, PaymentImportRow, PaymentImportError, PaymentImportResult
+)
 from app.schemas.payment_imputation import PaymentImputationCreate, PaymentImputationResponse
-from app.schemas.account_statement import StudentAccountStatement, SchoolAccountStatement
+from app.schemas.account_statement import (
+    StudentAccountStatement, SchoolAccountStatement, StudentSummaryOrder, InvoiceStatus,
+    StudentStatementBatchRequest, StudentStatementBatch, SchoolAgingReport, SchoolRollupStatement
+)
+from app.schemas.reconciliation import BankStatementLine, ReconciliationStatus, ReconciliationResult
 
 __all__ = [
     "SchoolCreate", "SchoolUpdate", "SchoolResponse",
     "StudentCreate", "StudentUpdate", "StudentResponse",
     "InvoiceCreate", "InvoiceUpdate", "InvoiceResponse",
-    "PaymentCreate", "PaymentResponse",
+    "PaymentCreate", "PaymentResponse", "PaymentAllocation", "PaymentImportRow", "PaymentImportError", "PaymentImportResult",
     "PaymentImputationCreate", "PaymentImputationResponse",
-    "StudentAccountStatement", "SchoolAccountStatement"
+    "StudentAccountStatement", "SchoolAccountStatement", "StudentSummaryOrder", "InvoiceStatus",
+    "StudentStatementBatchRequest", "StudentStatementBatch", "SchoolAgingReport", "SchoolRollupStatement",
+    "BankStatementLine", "ReconciliationStatus", "ReconciliationResult"
 ]
@@ -1,7 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from uuid import UUID
-from typing import List
-from datetime import datetime
+from typing import List, Literal, Optional
+from datetime import datetime, date
 
 
 class MoneyAmount(BaseModel):
@@ -23,13 +23,40 @@ class StudentAccountStatement(BaseModel):
     student_name: str
     school_id: UUID
     school_name: str
-    total_invoiced: MoneyAmount
-    total_paid: MoneyAmount
-    total_outstanding: MoneyAmount
+    # Totals hold one amount per currency, ordered by currency code
+    total_invoiced: List[MoneyAmount]
+    total_paid: List[MoneyAmount]
+    total_outstanding: List[MoneyAmount]
     invoices: List[InvoiceDetail]
+    # Set when the invoice listing is paginated (limit/cursor)
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+
+# Payment status filter for the invoices of a student statement
+InvoiceStatus = Literal["open", "partial", "paid"]
+
+
+# Upper bound on the student IDs accepted by the batch statement endpoint
+MAX_STATEMENT_BATCH_SIZE = 200
+
+
+class StudentStatementBatchRequest(BaseModel):
+    student_ids: List[UUID] = Field(..., min_length=1, max_length=MAX_STATEMENT_BATCH_SIZE)
+
+
+class StudentStatementError(BaseModel):
+    student_id: UUID
+    detail: str
+
+
+class StudentStatementBatch(BaseModel):
+    statements: List[StudentAccountStatement]
+    errors: List[StudentStatementError]
 
 
 class StudentSummary(BaseModel):
+    """Outstanding balance of a student in one currency; a student with several currencies has one entry per currency."""
     student_id: UUID
     student_name: str
     total_outstanding: MoneyAmount
@@ -38,8 +65,83 @@ class StudentSummary(BaseModel):
 class SchoolAccountStatement(BaseModel):
     school_id: UUID
     school_name: str
-    total_invoiced: MoneyAmount
-    total_paid: MoneyAmount
-    total_outstanding: MoneyAmount
+    # Totals hold one amount per currency, ordered by currency code
+    total_invoiced: List[MoneyAmount]
+    total_paid: List[MoneyAmount]
+    total_outstanding: List[MoneyAmount]
     number_of_students: int
     students: List[StudentSummary]
+    # Set when the student breakdown is paginated (limit/cursor)
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+
+# Orderings available for the paginated student breakdown
+StudentSummaryOrder = Literal["name", "outstanding"]
+
+
+class AgingBuckets(BaseModel):
+    """Outstanding amounts in one currency by days past the invoice due date."""
+    current: MoneyAmount
+    days_1_30: MoneyAmount
+    days_31_60: MoneyAmount
+    days_61_90: MoneyAmount
+    days_over_90: MoneyAmount
+    total_outstanding: MoneyAmount
+
+
+class StudentAging(BaseModel):
+    """Aging of a student in one currency; a student with several currencies has one entry per currency."""
+    student_id: UUID
+    student_name: str
+    buckets: AgingBuckets
+
+
+class SchoolAgingReport(BaseModel):
+    school_id: UUID
+    school_name: str
+    as_of: date
+    # One set of buckets per currency, ordered by currency code
+    totals: List[AgingBuckets]
+    students: List[StudentAging]
+
+
+# Upper bound on the schools accepted by the roll-up statement endpoint
+MAX_ROLLUP_SCHOOLS = 200
+
+
+class SchoolSubtotal(BaseModel):
+    school_id: UUID
+    school_name: str
+    total_invoiced: List[MoneyAmount]
+    total_paid: List[MoneyAmount]
+    total_outstanding: List[MoneyAmount]
+    number_of_students: int
+
+
+class SchoolRollupStatement(BaseModel):
+    """Consolidated totals over a group of schools, with one subtotal per school."""
+    total_invoiced: List[MoneyAmount]
+    total_paid: List[MoneyAmount]
+    total_outstanding: List[MoneyAmount]
+    number_of_students: int
+    schools: List[SchoolSubtotal]
+
+
+# NDJSON records of the streamed school statement, in the order they are sent
+class SchoolStatementHeaderRecord(BaseModel):
+    record: Literal["school"] = "school"
+    school_id: UUID
+    school_name: str
+    number_of_students: int
+
+
+class StudentSummaryRecord(StudentSummary):
+    record: Literal["student"] = "student"
+
+
+class SchoolStatementTotalsRecord(BaseModel):
+    record: Literal["totals"] = "totals"
+    total_invoiced: List[MoneyAmount]
+    total_paid: List[MoneyAmount]
+    total_outstanding: List[MoneyAmount]
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from uuid import UUID
-from typing import Optional, List
+from typing import Optional, List, Literal
 from datetime import datetime
 from app.enums import PaymentMethod
 
@@ -10,13 +10,27 @@ class PaymentImputationInput(BaseModel):
     amount_cents: int = Field(..., gt=0)
 
 
+# "manual": the caller lists the imputations. "fifo": the payment is spread over
+# the student's open invoices in the payment currency, oldest due first.
+PaymentAllocation = Literal["manual", "fifo"]
+
+
 class PaymentCreate(BaseModel):
     student_id: UUID
     amount_cents: int = Field(..., gt=0)
     currency: str = Field(default="USD", max_length=3)
     payment_method: PaymentMethod
     reference: Optional[str] = None
-    imputations: List[PaymentImputationInput]
+    imputations: List[PaymentImputationInput] = Field(default_factory=list)
+    allocation: PaymentAllocation = "manual"
+
+    @model_validator(mode="after")
+    def check_allocation(self) -> "PaymentCreate":
+        if self.allocation == "manual" and not self.imputations:
+            raise ValueError("imputations are required unless allocation is fifo")
+        if self.allocation == "fifo" and self.imputations:
+            raise ValueError("imputations must be left out with fifo allocation")
+        return self
 
 
 class PaymentResponse(BaseModel):
@@ -30,3 +44,19 @@ class PaymentResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class PaymentImportRow(PaymentCreate):
+    """A row of a payment import; settlement files carry the date the payment was made."""
+    payment_date: Optional[datetime] = None
+
+
+class PaymentImportError(BaseModel):
+    line: int
+    detail: str
+
+
+class PaymentImportResult(BaseModel):
+    imported: int = 0
+    failed: int = 0
+    errors: List[PaymentImportError] = Field(default_factory=list)
@@ -0,0 +1,52 @@
+from decimal import Decimal, InvalidOperation
+from pydantic import AliasChoices, BaseModel, Field, field_validator, model_validator
+from uuid import UUID
+from typing import Any, List, Literal, Optional
+from datetime import date
+from moneyed import Money
+from app.money import currency, cents_from_money
+
+
+class BankStatementLine(BaseModel):
+    reference: str = Field(..., min_length=1)
+    amount_cents: int
+    currency: str = Field(default="USD", max_length=3)
+    # Value date of the bank movement; payments dated within the date window of it match
+    value_date: date = Field(..., validation_alias=AliasChoices("value_date", "date"))
+
+    @model_validator(mode="before")
+    @classmethod
+    def amount_to_cents(cls, data: Any) -> Any:
+        """Bank exports give decimal amounts; convert ``amount`` to ``amount_cents`` in the line's currency."""
+        if not isinstance(data, dict) or "amount" not in data or "amount_cents" in data:
+            return data
+        data = dict(data)
+        try:
+            amount = Decimal(str(data.pop("amount")))
+        except InvalidOperation:
+            raise ValueError("amount: not a decimal number")
+        data["amount_cents"] = cents_from_money(Money(amount, currency(data.get("currency", "USD"))))
+        return data
+
+    @field_validator("reference", mode="before")
+    @classmethod
+    def strip_reference(cls, reference: Any) -> Any:
+        # Matched against payment references trimmed the same way
+        return reference.strip() if isinstance(reference, str) else reference
+
+
+# matched: exactly one payment fits the line. unmatched: none does, or the line
+# is invalid. ambiguous: several payments fit, or another line claims the same one.
+ReconciliationStatus = Literal["matched", "unmatched", "ambiguous"]
+
+
+class ReconciliationResult(BaseModel):
+    line: int
+    status: ReconciliationStatus
+    reference: Optional[str] = None
+    amount_cents: Optional[int] = None
+    currency: Optional[str] = None
+    value_date: Optional[date] = None
+    # The matched payment, or the candidates of an ambiguous line
+    payment_ids: List[UUID] = Field(default_factory=list)
+    detail: Optional[str] = None
@@ -2,12 +2,25 @@ from app.services.school_service import SchoolService
 from app.services.student_service import StudentService
 from app.services.invoice_service import InvoiceService
 from app.services.payment_service import PaymentService
+from app.services.payment_import_service import PaymentImportService
 from app.services.account_statement_service import AccountStatementService
+from app.services.student_balance_service import StudentBalanceService
+from app.services.balance_snapshot_service import BalanceSnapshotService
+from app.services.statement_cache_warmer import StatementCacheWarmer
+from app.services.reconciliation_service import ReconciliationService
+from app.services.outbox_service import OutboxService, OutboxRelay
 
 __all__ = [
     "SchoolService",
     "StudentService", 
     "InvoiceService",
     "PaymentService",
-    "AccountStatementService"
+    "PaymentImportService",
+    "AccountStatementService",
+    "StudentBalanceService",
+    "BalanceSnapshotService",
+    "StatementCacheWarmer",
+    "ReconciliationService",
+    "OutboxService",
+    "OutboxRelay"
 ]
@@ -1,168 +1,889 @@
+import json
+import time
 from uuid import UUID
-from typing import Dict
+from datetime import datetime, date, timedelta
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, Iterable, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
-from moneyed import Money
-from app.models import Student, School, Invoice, PaymentImputation
+from sqlalchemy import select, func, or_, and_, tuple_, text, BigInteger
+from sqlalchemy.engine import Row
+from sqlalchemy.sql import Select
+from app.models import Student, School, Invoice, Payment, PaymentImputation, StudentBalance
 from app.schemas.account_statement import (
     StudentAccountStatement, SchoolAccountStatement,
-    MoneyAmount, InvoiceDetail, StudentSummary
+    MoneyAmount, InvoiceDetail, StudentSummary,
+    SchoolStatementHeaderRecord, StudentSummaryRecord,
+    SchoolStatementTotalsRecord, StudentSummaryOrder,
+    StudentStatementBatch, StudentStatementError,
+    AgingBuckets, StudentAging, SchoolAgingReport,
+    SchoolSubtotal, SchoolRollupStatement, InvoiceStatus
 )
-from app.money import currency, cents_from_money, money_from_cents
-from app.cache import RedisCache, student_statement_key, school_statement_key
+from app.cache import (
+    RedisCache, student_statement_key, school_statement_key, school_aging_key, stale_key, balance_version_field,
+    student_version_key, school_version_key, school_rollup_key
+)
+from app.pagination import encode_cursor, decode_cursor
+from app.single_flight import SingleFlight
+from app.services.balance_snapshot_service import BalanceSnapshotService, naive_utc
 import logging
 
+if TYPE_CHECKING:
+    from app.services.statement_cache_warmer import StatementCacheWarmer
+
 logger = logging.getLogger(__name__)
 
+# Rows fetched per round trip from the server-side cursor when streaming
+STREAM_BATCH_SIZE = 500
+
+# Upper bound (in days past due) of each aging bucket but the last
+AGING_BUCKET_DAYS = (30, 60, 90)
+AGING_BUCKET_NAMES = ("current", "days_1_30", "days_31_60", "days_61_90", "days_over_90")
+
 class AccountStatementService:
-    def __init__(self, db: AsyncSession, cache: RedisCache):
+    def __init__(self, db: AsyncSession, cache: RedisCache, warmer: Optional["StatementCacheWarmer"] = None):
         self.db = db
         self.cache = cache
+        self.warmer = warmer
+        self.single_flight = SingleFlight(cache)
+        # Set when a read was answered with a cached value marked stale
+        self.served_stale = False
 
-    async def get_student_statement(self, student_id: UUID) -> StudentAccountStatement:
-        # Try to get from cache first
-        cache_key = student_statement_key(student_id)
-        cached = await self.cache.get(cache_key)
+    @property
+    def stale_while_revalidate(self) -> bool:
+        return self.warmer is not None and self.warmer.max_staleness is not None
+
+    async def student_statement_etag(self, student_id: UUID) -> Optional[str]:
+        """ETag of the current student statement, read from its version counter alone."""
+        return self._etag(await self.cache.get_version(student_version_key(student_id)))
+
+    async def school_statement_etag(self, school_id: UUID) -> Optional[str]:
+        """ETag of the current (unpaginated) school statement, read from its version counter alone."""
+        return self._etag(await self.cache.get_version(school_version_key(school_id)))
+
+    async def school_aging_etag(self, school_id: UUID) -> Optional[str]:
+        """ETag of today's aging report: buckets also move with the date, not only with writes."""
+        return self._etag(await self.cache.get_version(school_version_key(school_id)), datetime.utcnow().date())
+
+    async def school_rollup_etag(self, school_ids: List[UUID]) -> Optional[str]:
+        """ETag of a roll-up: the digest of its members' version counters."""
+        key = await self._school_rollup_key(school_ids)
+        return self._etag(key.rsplit(":", 1)[1]) if key else None
+
+    @staticmethod
+    def _etag(version: Optional[int], *qualifiers) -> Optional[str]:
+        if version is None:
+            return None
+        return '"' + "-".join(str(part) for part in (version, *qualifiers)) + '"'
+
+    async def get_student_statement(
+        self,
+        student_id: UUID,
+        as_of: Optional[datetime] = None,
+        status: Optional[InvoiceStatus] = None,
+        issued_after: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> StudentAccountStatement:
+        # Filtered or paginated invoice listings are narrow indexed reads and are not cached
+        if status is not None or issued_after is not None or limit is not None:
+            return await self._get_student_statement_page(student_id, as_of, status, issued_after, limit, cursor)
+        
+        # Point-in-time statements are never cached
+        if as_of is not None:
+            return await self._compute_student_statement(student_id, as_of)
+        return StudentAccountStatement.model_validate_json(await self.get_student_statement_json(student_id))
+
+    async def get_student_statement_json(self, student_id: UUID) -> str:
+        """The current student statement as JSON; a cache hit is returned exactly as stored."""
+        cached = await self._read_cache(
+            student_statement_key(student_id),
+            revalidate=lambda: self.warmer.schedule_student_refresh(student_id),
+        )
         if cached:
-            return StudentAccountStatement(**cached)
+            return cached
+        return await self.refresh_student_statement(student_id)
+
+    async def refresh_student_statement(self, student_id: UUID) -> str:
+        """Compute the current student statement, cache it and return its JSON."""
+        cache_key = student_statement_key(student_id)
+        marker = await self._stale_marker(cache_key)
+        statement = (await self._compute_student_statement(student_id)).model_dump_json()
+        # The student exists: from now on the statement can be tagged
+        await self.cache.start_versions([student_version_key(student_id)])
+        await self.cache.set_raw(cache_key, statement)
+        await self._clear_stale(cache_key, marker)
+        return statement
+
+    async def _compute_student_statement(
+        self, student_id: UUID, as_of: Optional[datetime] = None
+    ) -> StudentAccountStatement:
+        statements = await self._compute_student_statements([student_id], as_of)
+        statement = statements.get(student_id)
+        if statement is None:
+            raise ValueError(f"Student {student_id} not found")
+        return statement
+
+    async def get_student_statements(self, student_ids: List[UUID]) -> StudentStatementBatch:
+        """Statements for many students: one MGET for the hits, one set-based computation for the misses."""
+        statements, errors = await self._get_student_statements_json(student_ids)
+        return StudentStatementBatch(
+            statements=[StudentAccountStatement.model_validate_json(statement) for statement in statements],
+            errors=errors,
+        )
+
+    async def get_student_statements_json(self, student_ids: List[UUID]) -> str:
+        """Like ``get_student_statements``, as JSON assembled from the cached statements without decoding them."""
+        statements, errors = await self._get_student_statements_json(student_ids)
+        return (
+            '{"statements":[' + ",".join(statements) + '],'
+            '"errors":[' + ",".join(error.model_dump_json() for error in errors) + "]}"
+        )
+
+    async def _get_student_statements_json(
+        self, student_ids: List[UUID]
+    ) -> tuple[List[str], List[StudentStatementError]]:
+        student_ids = list(dict.fromkeys(student_ids))
+        keys = [student_statement_key(sid) for sid in student_ids]
+        markers = [None] * len(keys)
+        if self.stale_while_revalidate:
+            # Values and their stale markers in the same round trip
+            values = await self.cache.get_many_raw(keys + [stale_key(key) for key in keys])
+            cached_values = values[:len(keys)]
+            markers = [json.loads(marker) if marker else None for marker in values[len(keys):]]
+        else:
+            cached_values = await self.cache.get_many_raw(keys)
+        
+        results: Dict[UUID, str] = {}
+        misses: Dict[UUID, Optional[dict]] = {}
+        for student_id, cached, marker in zip(student_ids, cached_values, markers):
+            if cached and marker and self._is_too_stale(marker):
+                cached = None
+            if cached:
+                results[student_id] = cached
+                if marker:
+                    self.served_stale = True
+                    self.warmer.schedule_student_refresh(student_id)
+            else:
+                misses[student_id] = marker
         
-        # If not in cache, compute and cache it
+        if misses:
+            computed = {
+                student_id: statement.model_dump_json()
+                for student_id, statement in (await self._compute_student_statements(list(misses))).items()
+            }
+            results.update(computed)
+            await self.cache.start_versions([student_version_key(student_id) for student_id in computed])
+            await self.cache.set_many_raw({
+                student_statement_key(student_id): statement for student_id, statement in computed.items()
+            })
+            for student_id, marker in misses.items():
+                await self._clear_stale(student_statement_key(student_id), marker)
+        
+        statements, errors = [], []
+        for student_id in student_ids:
+            if student_id in results:
+                statements.append(results[student_id])
+            else:
+                errors.append(StudentStatementError(student_id=student_id, detail=f"Student {student_id} not found"))
+        return statements, errors
+
+    async def _compute_student_statements(
+        self, student_ids: List[UUID], as_of: Optional[datetime] = None
+    ) -> Dict[UUID, StudentAccountStatement]:
+        """Build the statements of several students with two set-based queries.
+
+        Students that do not exist are missing from the result. With
+        ``as_of``, only invoices issued and payments dated up to then count.
+        """
+        result = await self.db.execute(self._student_headers_query(student_ids))
+        students = {row.id: row for row in result.all()}
+        if not students:
+            return {}
+        invoices = self._student_invoices_query(list(students), as_of).subquery()
+        
+        # Invoice lines and each student's per-currency totals in the same pass
+        totals_query = self._with_currency_totals(
+            invoices,
+            [invoices.c.student_id],
+            [invoices.c.id, invoices.c.issued_at, invoices.c.description],
+        )
         result = await self.db.execute(
-            select(Student)
-            .options(
-                selectinload(Student.school),
-                selectinload(Student.invoices).selectinload(Invoice.payment_imputations)
-            )
-            .where(Student.id == student_id)
+            totals_query.order_by(invoices.c.student_id, text("is_total"), invoices.c.issued_at, invoices.c.id)
         )
-        student = result.scalar_one_or_none()
-        if not student:
+        invoices_by_student: Dict[UUID, List[Row]] = {student_id: [] for student_id in students}
+        totals_by_student: Dict[UUID, List[Row]] = {student_id: [] for student_id in students}
+        for row in result.all():
+            (totals_by_student if row.is_total else invoices_by_student)[row.student_id].append(row)
+        
+        return {
+            student_id: self._build_student_statement(
+                student, invoices_by_student[student_id], totals_by_student[student_id]
+            )
+            for student_id, student in students.items()
+        }
+
+    async def _get_student_statement_page(
+        self,
+        student_id: UUID,
+        as_of: Optional[datetime],
+        status: Optional[InvoiceStatus],
+        issued_after: Optional[datetime],
+        limit: Optional[int],
+        cursor: Optional[str],
+    ) -> StudentAccountStatement:
+        """A statement with the student's full totals and a filtered, optionally paginated invoice listing."""
+        student = (await self.db.execute(self._student_headers_query([student_id]))).one_or_none()
+        if student is None:
             raise ValueError(f"Student {student_id} not found")
         
-        currency_code = student.invoices[0].currency if student.invoices else "USD"
-        cur = currency(currency_code)
-        total_invoiced_money = Money(0, cur)
-        total_paid_money = Money(0, cur)
-        invoice_details = []
+        # Totals cover every invoice, whatever the listing shows
+        if as_of is None:
+            totals_query = select(
+                StudentBalance.currency, StudentBalance.invoiced_cents, StudentBalance.paid_cents
+            ).where(StudentBalance.student_id == student_id, StudentBalance.invoice_count > 0)
+        else:
+            # From the ledger, like the unfiltered statement as of the same moment
+            invoices = self._student_invoices_query([student_id], as_of).subquery()
+            totals_query = (
+                select(
+                    invoices.c.currency,
+                    func.sum(invoices.c.invoiced_cents).cast(BigInteger).label("invoiced_cents"),
+                    func.sum(invoices.c.paid_cents).cast(BigInteger).label("paid_cents"),
+                )
+                .group_by(invoices.c.currency)
+                .order_by(invoices.c.currency)
+            )
+        totals = (await self.db.execute(totals_query)).all()
         
-        for invoice in student.invoices:
-            if invoice.currency != currency_code:
-                raise ValueError("Mixed currencies are not supported in a single student statement")
-            
-            total_invoiced_money += money_from_cents(invoice.amount_cents, currency_code)
-            
-            paid_amount_cents = sum(imp.amount_cents for imp in invoice.payment_imputations)
-            total_paid_money += money_from_cents(paid_amount_cents, currency_code)
-            
-            invoice_details.append(InvoiceDetail(
-                id=invoice.id,
-                amount=MoneyAmount(amount_cents=invoice.amount_cents, currency=invoice.currency),
-                paid_amount=MoneyAmount(amount_cents=paid_amount_cents, currency=invoice.currency),
-                outstanding_amount=MoneyAmount(amount_cents=invoice.amount_cents - paid_amount_cents, currency=invoice.currency),
-                issued_at=invoice.issued_at,
-                description=invoice.description
-            ))
+        # The status filter is a HAVING on the summed imputations, so only matching invoices leave the database
+        query = self._student_invoices_query([student_id], as_of, status)
+        if issued_after is not None:
+            query = query.where(Invoice.issued_at > naive_utc(issued_after))
+        after = self._decode_invoice_cursor(cursor) if limit is not None else None
+        if after is not None:
+            query = query.where(tuple_(Invoice.issued_at, Invoice.id) > tuple_(*after))
+        query = query.order_by(Invoice.issued_at, Invoice.id)
+        if limit is not None:
+            query = query.limit(limit + 1)
+        invoices = (await self.db.execute(query)).all()
+        
+        has_more = limit is not None and len(invoices) > limit
+        next_cursor = None
+        if has_more:
+            invoices = invoices[:limit]
+            last = invoices[-1]
+            next_cursor = encode_cursor([last.issued_at.isoformat(), str(last.id)])
         
-        statement = StudentAccountStatement(
+        statement = self._build_student_statement(student, invoices, totals)
+        statement.next_cursor = next_cursor
+        statement.has_more = has_more
+        return statement
+
+    @staticmethod
+    def _decode_invoice_cursor(cursor: Optional[str]) -> Optional[tuple]:
+        values = decode_cursor(cursor)
+        if not values or len(values) != 2:
+            return None
+        try:
+            return datetime.fromisoformat(values[0]), UUID(values[1])
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _student_headers_query(student_ids: List[UUID]) -> Select:
+        return (
+            select(
+                Student.id,
+                Student.name,
+                School.id.label("school_id"),
+                School.name.label("school_name"),
+            )
+            .join(School, School.id == Student.school_id)
+            .where(Student.id.in_(student_ids))
+        )
+
+    @staticmethod
+    def _student_invoices_query(
+        student_ids: List[UUID], as_of: Optional[datetime] = None, status: Optional[InvoiceStatus] = None
+    ) -> Select:
+        """One row per invoice of the students with its paid amount, optionally filtered by payment status.
+
+        With ``as_of``, only invoices issued and payments dated up to then count.
+        """
+        paid_cents = func.sum(PaymentImputation.amount_cents)
+        query = (
+            select(
+                Invoice.id,
+                Invoice.student_id,
+                Invoice.amount_cents.label("invoiced_cents"),
+                Invoice.currency,
+                Invoice.issued_at,
+                Invoice.description,
+            )
+            .outerjoin(PaymentImputation, PaymentImputation.invoice_id == Invoice.id)
+            .where(Invoice.student_id.in_(student_ids))
+            .group_by(Invoice.id)
+        )
+        if as_of is not None:
+            as_of = naive_utc(as_of)
+            query = (
+                query
+                .outerjoin(Payment, Payment.id == PaymentImputation.payment_id)
+                .where(Invoice.issued_at <= as_of)
+            )
+            paid_cents = paid_cents.filter(Payment.payment_date <= as_of)
+        paid_cents = func.coalesce(paid_cents, 0)
+        if status == "open":
+            query = query.having(paid_cents == 0)
+        elif status == "partial":
+            query = query.having(and_(paid_cents > 0, paid_cents < Invoice.amount_cents))
+        elif status == "paid":
+            query = query.having(paid_cents >= Invoice.amount_cents)
+        return query.add_columns(paid_cents.label("paid_cents"))
+
+    @staticmethod
+    def _build_student_statement(student: Row, invoices: List[Row], totals: List[Row]) -> StudentAccountStatement:
+        return StudentAccountStatement(
             student_id=student.id,
             student_name=student.name,
-            school_id=student.school.id,
-            school_name=student.school.name,
-            total_invoiced=MoneyAmount(amount_cents=cents_from_money(total_invoiced_money), currency=currency_code),
-            total_paid=MoneyAmount(amount_cents=cents_from_money(total_paid_money), currency=currency_code),
-            total_outstanding=MoneyAmount(amount_cents=cents_from_money(total_invoiced_money - total_paid_money), currency=currency_code),
-            invoices=invoice_details
+            school_id=student.school_id,
+            school_name=student.school_name,
+            **AccountStatementService._money_totals(totals),
+            invoices=[
+                InvoiceDetail(
+                    id=invoice.id,
+                    amount=MoneyAmount(amount_cents=invoice.invoiced_cents, currency=invoice.currency),
+                    paid_amount=MoneyAmount(amount_cents=invoice.paid_cents, currency=invoice.currency),
+                    outstanding_amount=MoneyAmount(
+                        amount_cents=invoice.invoiced_cents - invoice.paid_cents, currency=invoice.currency
+                    ),
+                    issued_at=invoice.issued_at,
+                    description=invoice.description
+                )
+                for invoice in invoices
+            ]
         )
+
+    async def get_school_statement(
+        self,
+        school_id: UUID,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        order_by: StudentSummaryOrder = "name",
+        as_of: Optional[datetime] = None,
+    ) -> SchoolAccountStatement:
+        # Paginated breakdowns are cheap indexed reads and are not cached
+        if limit is not None:
+            return await self._get_school_statement_page(school_id, limit, cursor, order_by)
         
-        # Cache the result
-        await self.cache.set(cache_key, statement.model_dump())
-        
-        return statement
+        # Point-in-time statements are never cached
+        if as_of is not None:
+            return await self._compute_school_statement(school_id, as_of)
+        return SchoolAccountStatement.model_validate_json(await self.get_school_statement_json(school_id))
 
-    async def get_school_statement(self, school_id: UUID) -> SchoolAccountStatement:
-        # Try to get from cache first
+    async def get_school_statement_json(self, school_id: UUID) -> str:
+        """The current school statement as JSON; a cache hit is returned exactly as stored."""
         cache_key = school_statement_key(school_id)
-        cached = await self.cache.get(cache_key)
+        cached = await self._read_cache(
+            cache_key, revalidate=lambda: self.warmer.schedule_school_refresh(school_id)
+        )
         if cached:
-            return SchoolAccountStatement(**cached)
+            return cached
         
-        # If not in cache, compute and cache it
+        # On a miss, compute it once however many requests are waiting for it
+        return await self.single_flight.run(
+            cache_key,
+            compute=lambda: self.refresh_school_statement(school_id),
+            load=lambda: self._read_cache(cache_key),
+        )
+
+    async def refresh_school_statement(self, school_id: UUID) -> str:
+        """Compute the current school statement, cache it and return its JSON."""
+        cache_key = school_statement_key(school_id)
+        marker = await self._stale_marker(cache_key)
+        school = await self._get_school_header(school_id)
+        query = self._school_statement_query(self._school_balances_query(school_id))
+        rows = (await self.db.execute(query)).all()
+        statement = self._build_school_statement(school, rows).model_dump_json()
+        await self.cache.start_versions([school_version_key(school_id)])
+        # Stored with the row versions it reflects, so writes can patch it in place
+        versions = {
+            balance_version_field(row.student_id, row.currency): row.version for row in rows if not row.is_total
+        }
+        await self.cache.set_school_statement(school_id, statement, versions)
+        await self._clear_stale(cache_key, marker)
+        return statement
+
+    async def _compute_school_statement(
+        self, school_id: UUID, as_of: Optional[datetime] = None
+    ) -> SchoolAccountStatement:
+        school = await self._get_school_header(school_id)
+        if as_of is None:
+            balances = self._school_balances_query(school_id)
+        else:
+            balances = await BalanceSnapshotService(self.db).school_balances_as_of_query(school_id, as_of)
+        result = await self.db.execute(self._school_statement_query(balances))
+        return self._build_school_statement(school, result.all())
+
+    @classmethod
+    def _school_statement_query(cls, balances: Select) -> Select:
+        """Student rows of ``balances`` ordered by name, followed by the per-currency totals rows."""
+        rows = balances.subquery()
+        detail_columns = [rows.c.student_id, rows.c.student_name]
+        # The projection rows carry the version the cached statement is stored with
+        if "version" in rows.c:
+            detail_columns.append(rows.c.version)
+        return cls._with_currency_totals(rows, [], detail_columns).order_by(
+            text("is_total"), rows.c.student_name, rows.c.student_id, rows.c.currency
+        )
+
+    @classmethod
+    def _build_school_statement(cls, school: Row, rows: List[Row]) -> SchoolAccountStatement:
+        return SchoolAccountStatement(
+            school_id=school.id,
+            school_name=school.name,
+            **cls._money_totals(row for row in rows if row.is_total),
+            number_of_students=school.number_of_students,
+            students=[
+                StudentSummary(
+                    student_id=row.student_id,
+                    student_name=row.student_name,
+                    total_outstanding=MoneyAmount(
+                        amount_cents=row.invoiced_cents - row.paid_cents, currency=row.currency
+                    )
+                )
+                for row in rows
+                if not row.is_total
+            ]
+        )
+
+    async def _get_school_statement_page(
+        self,
+        school_id: UUID,
+        limit: int,
+        cursor: Optional[str],
+        order_by: StudentSummaryOrder,
+    ) -> SchoolAccountStatement:
+        school = await self._get_school_header(school_id)
+        
+        # School totals from one aggregate over the projection
         result = await self.db.execute(
-            select(School)
-            .options(
-                selectinload(School.students).selectinload(Student.invoices).selectinload(Invoice.payment_imputations)
+            select(
+                StudentBalance.currency,
+                func.sum(StudentBalance.invoiced_cents).cast(BigInteger).label("invoiced_cents"),
+                func.sum(StudentBalance.paid_cents).cast(BigInteger).label("paid_cents"),
             )
-            .where(School.id == school_id)
+            .where(StudentBalance.school_id == school_id, StudentBalance.invoice_count > 0)
+            .group_by(StudentBalance.currency)
         )
-        school = result.scalar_one_or_none()
-        if not school:
-            raise ValueError(f"School {school_id} not found")
+        totals = result.all()
         
-        currency_code = None
-        total_invoiced_money = None
-        total_paid_money = None
-        student_summaries = []
+        # The page itself walks an index from the cursor position
+        query = self._school_balances_query(school_id, order_by)
+        after = self._decode_student_cursor(cursor, order_by)
+        if after is not None:
+            # Currency is the last key: a page may end between a student's currency rows
+            if order_by == "outstanding":
+                outstanding_cents, student_id, currency_code = after
+                query = query.where(or_(
+                    StudentBalance.outstanding_cents < outstanding_cents,
+                    and_(
+                        StudentBalance.outstanding_cents == outstanding_cents,
+                        tuple_(StudentBalance.student_id, StudentBalance.currency) > tuple_(student_id, currency_code),
+                    ),
+                ))
+            else:
+                query = query.where(tuple_(Student.name, Student.id, StudentBalance.currency) > tuple_(*after))
+        result = await self.db.execute(query.limit(limit + 1))
+        rows = result.all()
         
-        for student in school.students:
-            student_invoiced_cents = 0
-            student_paid_cents = 0
-            student_currency = None
-            
-            logger.debug(f"Processing student: {student.name}, invoices count: {len(student.invoices)}")
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            sort_value = last.outstanding_cents if order_by == "outstanding" else last.student_name
+            next_cursor = encode_cursor([sort_value, str(last.student_id), last.currency])
+        
+        return SchoolAccountStatement(
+            school_id=school.id,
+            school_name=school.name,
+            **self._money_totals(totals),
+            number_of_students=school.number_of_students,
+            students=[
+                StudentSummary(
+                    student_id=row.student_id,
+                    student_name=row.student_name,
+                    total_outstanding=MoneyAmount(amount_cents=row.outstanding_cents, currency=row.currency)
+                )
+                for row in rows
+            ],
+            next_cursor=next_cursor,
+            has_more=has_more
+        )
+
+    @staticmethod
+    def _decode_student_cursor(cursor: Optional[str], order_by: StudentSummaryOrder) -> Optional[tuple]:
+        values = decode_cursor(cursor)
+        if not values or len(values) != 3:
+            return None
+        try:
+            sort_value = int(values[0]) if order_by == "outstanding" else str(values[0])
+            return sort_value, UUID(values[1]), str(values[2])
+        except (TypeError, ValueError):
+            return None
+
+    async def stream_school_statement(self, school_id: UUID) -> AsyncIterator[bytes]:
+        """Yield the school statement as NDJSON, one student per line.
+
+        The first line is the school header, the last one the totals. Rows are
+        read through a server-side cursor, so memory stays flat regardless of
+        the number of students. Raises ``ValueError`` before yielding anything
+        if the school does not exist.
+        """
+        school = await self._get_school_header(school_id)
+        return self._stream_school_statement(school)
+
+    async def _stream_school_statement(self, school: Row) -> AsyncIterator[bytes]:
+        try:
+            yield SchoolStatementHeaderRecord(
+                school_id=school.id,
+                school_name=school.name,
+                number_of_students=school.number_of_students
+            ).model_dump_json().encode() + b"\n"
             
-            for invoice in student.invoices:
-                if currency_code is None:
-                    currency_code = invoice.currency
-                    cur = currency(currency_code)
-                    total_invoiced_money = Money(0, cur)
-                    total_paid_money = Money(0, cur)
-                    logger.debug(f"Initialized currency: {currency_code}")
-                elif invoice.currency != currency_code:
-                    raise ValueError("Mixed currencies are not supported in a single school statement")
-                
-                student_currency = invoice.currency
-                invoice_amount = invoice.amount_cents
-                student_invoiced_cents += invoice_amount
-                
-                paid_amount = sum(imp.amount_cents for imp in invoice.payment_imputations)
-                student_paid_cents += paid_amount
-                logger.debug(f"Invoice {invoice.id}: amount={invoice_amount}, paid={paid_amount}, imputations count={len(invoice.payment_imputations)}")
-
-            logger.debug(f"Student totals: invoiced={student_invoiced_cents}, paid={student_paid_cents}, currency={student_currency}")
+            # Totals rows come last, from the same pass as the student rows
+            query = self._school_statement_query(self._school_balances_query(school.id))
+            result = await self.db.stream(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+            totals = []
+            async for row in result:
+                if row.is_total:
+                    totals.append(row)
+                    continue
+                yield StudentSummaryRecord(
+                    student_id=row.student_id,
+                    student_name=row.student_name,
+                    total_outstanding=MoneyAmount(amount_cents=row.invoiced_cents - row.paid_cents, currency=row.currency)
+                ).model_dump_json().encode() + b"\n"
             
-            # Only add to totals and summaries if student has invoices
-            if student_currency is not None:
-                total_invoiced_money += money_from_cents(student_invoiced_cents, currency_code)
-                total_paid_money += money_from_cents(student_paid_cents, currency_code)
-                student_outstanding = student_invoiced_cents - student_paid_cents
-                
-                logger.debug(f"Adding to totals: total_invoiced={total_invoiced_money}, total_paid={total_paid_money}")
-                
-                student_summaries.append(StudentSummary(
-                    student_id=student.id,
-                    student_name=student.name,
-                    total_outstanding=MoneyAmount(amount_cents=student_outstanding, currency=currency_code)
-                ))
-        
-        # Handle case where school has no students or no invoices
-        if currency_code is None:
-            currency_code = "USD"
-            cur = currency(currency_code)
-            total_invoiced_money = Money(0, cur)
-            total_paid_money = Money(0, cur)
+            yield SchoolStatementTotalsRecord(**self._money_totals(totals)).model_dump_json().encode() + b"\n"
+        finally:
+            # The response outlives the request-scoped session, release the connection here
+            await self.db.close()
+
+    async def get_school_aging(self, school_id: UUID) -> SchoolAgingReport:
+        """Outstanding amounts per student, bucketed by days past the invoice due date."""
+        return SchoolAgingReport.model_validate_json(await self.get_school_aging_json(school_id))
+
+    async def get_school_aging_json(self, school_id: UUID) -> str:
+        """The aging report as JSON; a cache hit is returned exactly as stored."""
+        cache_key = school_aging_key(school_id)
+        cached = await self._read_cache(
+            cache_key, revalidate=lambda: self.warmer.schedule_aging_refresh(school_id)
+        )
+        if cached:
+            return cached
+        return await self.single_flight.run(
+            cache_key,
+            compute=lambda: self.refresh_school_aging(school_id),
+            load=lambda: self._read_cache(cache_key),
+        )
+
+    async def refresh_school_aging(self, school_id: UUID) -> str:
+        """Compute the aging report as of today, cache it until the end of the day and return its JSON."""
+        now = datetime.utcnow()
+        today = now.date()
+        cache_key = school_aging_key(school_id)
+        marker = await self._stale_marker(cache_key)
+        school = await self._get_school_header(school_id)
+        result = await self.db.execute(self._school_aging_query(school_id, today))
+        rows = result.all()
         
-        statement = SchoolAccountStatement(
+        report = SchoolAgingReport(
             school_id=school.id,
             school_name=school.name,
-            total_invoiced=MoneyAmount(amount_cents=cents_from_money(total_invoiced_money), currency=currency_code),
-            total_paid=MoneyAmount(amount_cents=cents_from_money(total_paid_money), currency=currency_code),
-            total_outstanding=MoneyAmount(amount_cents=cents_from_money(total_invoiced_money - total_paid_money), currency=currency_code),
-            number_of_students=len(school.students),
-            students=student_summaries
+            as_of=today,
+            totals=[
+                self._aging_buckets({name: getattr(row, name) for name in AGING_BUCKET_NAMES}, row.currency)
+                for row in rows
+                if row.is_total
+            ],
+            students=[
+                StudentAging(
+                    student_id=row.student_id,
+                    student_name=row.student_name,
+                    buckets=self._aging_buckets({name: getattr(row, name) for name in AGING_BUCKET_NAMES}, row.currency),
+                )
+                for row in rows
+                if not row.is_total
+            ],
+        ).model_dump_json()
+        await self.cache.start_versions([school_version_key(school_id)])
+        # Buckets shift as days go by, so the report expires at midnight (UTC)
+        midnight = datetime.combine(today + timedelta(days=1), datetime.min.time())
+        ttl = min(3600, int((midnight - now).total_seconds()))
+        if ttl > 0:
+            await self.cache.set_raw(cache_key, report, ttl)
+        await self._clear_stale(cache_key, marker)
+        return report
+
+    @staticmethod
+    def _aging_buckets(cents: Dict[str, int], currency_code: str) -> AgingBuckets:
+        amounts = {name: MoneyAmount(amount_cents=value, currency=currency_code) for name, value in cents.items()}
+        return AgingBuckets(
+            **amounts,
+            total_outstanding=MoneyAmount(amount_cents=sum(cents.values()), currency=currency_code),
+        )
+
+    @staticmethod
+    def _school_aging_query(school_id: UUID, today: date) -> Select:
+        """Aging buckets per student and currency, in one grouped pass over the school's invoices.
+
+        The same pass adds a totals row per currency, flagged ``is_total`` and
+        sorted last. Imputations are summed per invoice first; fully paid
+        invoices are left out. Invoices without a due date are counted as current.
+        """
+        paid = (
+            select(
+                PaymentImputation.invoice_id,
+                func.sum(PaymentImputation.amount_cents).label("paid_cents"),
+            )
+            .join(Invoice, Invoice.id == PaymentImputation.invoice_id)
+            .join(Student, Student.id == Invoice.student_id)
+            .where(Student.school_id == school_id)
+            .group_by(PaymentImputation.invoice_id)
+            .subquery()
+        )
+        outstanding = Invoice.amount_cents - func.coalesce(paid.c.paid_cents, 0)
+        # Bucket boundaries are computed once as timestamps so the CASE only compares due_date
+        start_of_today = datetime.combine(today, datetime.min.time())
+        boundaries = [start_of_today - timedelta(days=days) for days in AGING_BUCKET_DAYS]
+        current = or_(Invoice.due_date.is_(None), Invoice.due_date >= start_of_today)
+        conditions = {
+            "current": current,
+            "days_1_30": and_(Invoice.due_date < start_of_today, Invoice.due_date >= boundaries[0]),
+            "days_31_60": and_(Invoice.due_date < boundaries[0], Invoice.due_date >= boundaries[1]),
+            "days_61_90": and_(Invoice.due_date < boundaries[1], Invoice.due_date >= boundaries[2]),
+            "days_over_90": Invoice.due_date < boundaries[2],
+        }
+        buckets = [
+            func.coalesce(func.sum(outstanding).filter(condition), 0).cast(BigInteger).label(name)
+            for name, condition in conditions.items()
+        ]
+        return (
+            select(
+                Student.id.label("student_id"),
+                Student.name.label("student_name"),
+                Invoice.currency,
+                *buckets,
+                (func.grouping(Student.id) == 1).label("is_total"),
+            )
+            .join(Invoice, Invoice.student_id == Student.id)
+            .outerjoin(paid, paid.c.invoice_id == Invoice.id)
+            .where(Student.school_id == school_id, outstanding > 0)
+            .group_by(func.grouping_sets(
+                tuple_(Student.id, Student.name, Invoice.currency), tuple_(Invoice.currency)
+            ))
+            .order_by(text("is_total"), Student.name, Student.id, Invoice.currency)
+        )
+
+    async def get_school_rollup(self, school_ids: List[UUID]) -> SchoolRollupStatement:
+        return SchoolRollupStatement.model_validate_json(await self.get_school_rollup_json(school_ids))
+
+    async def get_school_rollup_json(self, school_ids: List[UUID]) -> str:
+        """Consolidated statement of several schools as JSON, cached under its members' versions."""
+        cache_key = await self._school_rollup_key(school_ids)
+        if cache_key is None:
+            # Without the version counters the roll-up cannot be tagged, so it is not cached.
+            # Computing it proves the schools exist, so their counters start for the next request
+            rollup = (await self._compute_school_rollup(school_ids)).model_dump_json()
+            await self.cache.start_versions([school_version_key(school_id) for school_id in set(school_ids)])
+            return rollup
+        cached = await self.cache.get_raw(cache_key)
+        if cached:
+            return cached
+        return await self.single_flight.run(
+            cache_key,
+            compute=lambda: self._refresh_school_rollup(cache_key, school_ids),
+            load=lambda: self.cache.get_raw(cache_key),
         )
+
+    async def _refresh_school_rollup(self, cache_key: str, school_ids: List[UUID]) -> str:
+        rollup = (await self._compute_school_rollup(school_ids)).model_dump_json()
+        await self.cache.set_raw(cache_key, rollup)
+        return rollup
+
+    async def _school_rollup_key(self, school_ids: List[UUID]) -> Optional[str]:
+        school_ids = list(dict.fromkeys(school_ids))
+        versions = await self.cache.get_versions([school_version_key(school_id) for school_id in school_ids])
+        if None in versions:
+            return None
+        return school_rollup_key(dict(zip(school_ids, versions)))
+
+    async def _compute_school_rollup(self, school_ids: List[UUID]) -> SchoolRollupStatement:
+        """Totals of every selected school from one grouped query over the projection."""
+        school_ids = list(dict.fromkeys(school_ids))
+        result = await self.db.execute(self._school_rollup_query(school_ids))
+        rows = result.all()
         
-        # Cache the result
-        await self.cache.set(cache_key, statement.model_dump())
+        subtotals: Dict[UUID, List[Row]] = {}
+        schools: Dict[UUID, Row] = {}
+        for row in rows:
+            if not row.is_total:
+                schools.setdefault(row.school_id, row)
+                subtotals.setdefault(row.school_id, []).append(row)
+        for school_id in school_ids:
+            if school_id not in schools:
+                raise ValueError(f"School {school_id} not found")
         
-        return statement
+        return SchoolRollupStatement(
+            **self._money_totals(row for row in rows if row.is_total),
+            number_of_students=sum(school.number_of_students for school in schools.values()),
+            schools=[
+                SchoolSubtotal(
+                    school_id=school.school_id,
+                    school_name=school.school_name,
+                    **self._money_totals(subtotals[school.school_id]),
+                    number_of_students=school.number_of_students,
+                )
+                for school in schools.values()
+            ],
+        )
+
+    @staticmethod
+    def _school_rollup_query(school_ids: List[UUID]) -> Select:
+        """One row per (school, currency) with the school's totals, then a grand totals row per currency.
+
+        Schools without invoices get a single row with a NULL currency.
+        """
+        student_count = (
+            select(func.count(Student.id))
+            .where(Student.school_id == School.id)
+            .correlate(School)
+            .scalar_subquery()
+        )
+        return (
+            select(
+                School.id.label("school_id"),
+                School.name.label("school_name"),
+                student_count.label("number_of_students"),
+                StudentBalance.currency,
+                func.coalesce(func.sum(StudentBalance.invoiced_cents), 0).cast(BigInteger).label("invoiced_cents"),
+                func.coalesce(func.sum(StudentBalance.paid_cents), 0).cast(BigInteger).label("paid_cents"),
+                (func.grouping(School.id) == 1).label("is_total"),
+            )
+            .outerjoin(
+                StudentBalance,
+                and_(StudentBalance.school_id == School.id, StudentBalance.invoice_count > 0),
+            )
+            .where(School.id.in_(school_ids))
+            .group_by(func.grouping_sets(
+                tuple_(School.id, School.name, StudentBalance.currency), tuple_(StudentBalance.currency)
+            ))
+            .order_by(text("is_total"), School.name, School.id, StudentBalance.currency)
+        )
+
+    @staticmethod
+    def _with_currency_totals(rows, key_columns: List, detail_columns: List) -> Select:
+        """Sums of ``rows`` per detail line, plus a totals row per key and currency.
+
+        Both come from one GROUPING SETS pass, so the totals always match the
+        lines they are shown with. ``detail_columns`` are NULL in the totals
+        rows, which have ``is_total`` set.
+        """
+        detail = (*key_columns, *detail_columns, rows.c.currency)
+        return (
+            select(
+                *detail,
+                func.sum(rows.c.invoiced_cents).cast(BigInteger).label("invoiced_cents"),
+                func.sum(rows.c.paid_cents).cast(BigInteger).label("paid_cents"),
+                (func.grouping(detail_columns[0]) == 1).label("is_total"),
+            )
+            .group_by(func.grouping_sets(tuple_(*detail), tuple_(*key_columns, rows.c.currency)))
+        )
+
+    @staticmethod
+    def _money_totals(rows: Iterable[Row]) -> Dict[str, List[MoneyAmount]]:
+        """Per-currency ``total_invoiced``, ``total_paid`` and ``total_outstanding`` from aggregated rows."""
+        rows = sorted((row for row in rows if row.currency is not None), key=lambda row: row.currency)
+        return {
+            "total_invoiced": [MoneyAmount(amount_cents=row.invoiced_cents, currency=row.currency) for row in rows],
+            "total_paid": [MoneyAmount(amount_cents=row.paid_cents, currency=row.currency) for row in rows],
+            "total_outstanding": [
+                MoneyAmount(amount_cents=row.invoiced_cents - row.paid_cents, currency=row.currency) for row in rows
+            ],
+        }
+
+    async def _read_cache(self, key: str, revalidate: Optional[Callable[[], None]] = None) -> Optional[str]:
+        """Cached JSON of ``key``, or None when it has to be computed now.
+
+        With stale-while-revalidate, a value marked stale is still returned,
+        and ``revalidate`` is called to refresh it in the background, until it
+        has been stale for longer than the max staleness. Without a
+        ``revalidate`` callback only fresh values are returned.
+        """
+        if not self.stale_while_revalidate:
+            return await self.cache.get_raw(key)
+        value, marker = await self.cache.get_many_raw([key, stale_key(key)])
+        if value is None or marker is None:
+            return value
+        if revalidate is None or self._is_too_stale(json.loads(marker)):
+            return None
+        self.served_stale = True
+        revalidate()
+        return value
+
+    def _is_too_stale(self, marker: dict) -> bool:
+        return time.time() - marker["since"] > self.warmer.max_staleness
+
+    async def _stale_marker(self, key: str) -> Optional[dict]:
+        """Read before recomputing ``key``, so the marker is only cleared if no invalidation happens meanwhile."""
+        if not self.stale_while_revalidate:
+            return None
+        return await self.cache.get(stale_key(key))
+
+    async def _clear_stale(self, key: str, marker: Optional[dict]):
+        if marker:
+            await self.cache.clear_stale(key, marker["token"])
+
+    async def _get_school_header(self, school_id: UUID) -> Row:
+        student_count = (
+            select(func.count(Student.id))
+            .where(Student.school_id == School.id)
+            .correlate(School)
+            .scalar_subquery()
+        )
+        result = await self.db.execute(
+            select(School.id, School.name, student_count.label("number_of_students"))
+            .where(School.id == school_id)
+        )
+        school = result.one_or_none()
+        if not school:
+            raise ValueError(f"School {school_id} not found")
+        return school
+
+    @staticmethod
+    def _school_balances_query(school_id: UUID, order_by: StudentSummaryOrder = "name") -> Select:
+        """One projection row per (student, currency) with the invoiced and paid sums."""
+        if order_by == "outstanding":
+            ordering = (StudentBalance.outstanding_cents.desc(), StudentBalance.student_id, StudentBalance.currency)
+        else:
+            ordering = (Student.name, Student.id, StudentBalance.currency)
+        return (
+            select(
+                StudentBalance.student_id,
+                Student.name.label("student_name"),
+                StudentBalance.currency,
+                StudentBalance.invoiced_cents,
+                StudentBalance.paid_cents,
+                StudentBalance.outstanding_cents,
+                StudentBalance.version,
+            )
+            .join(Student, Student.id == StudentBalance.student_id)
+            # school_id is filtered on both sides so either ordering can use its index
+            .where(
+                StudentBalance.school_id == school_id,
+                Student.school_id == school_id,
+                StudentBalance.invoice_count > 0,
+            )
+            .order_by(*ordering)
+        )
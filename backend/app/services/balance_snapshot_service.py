@@ -0,0 +1,145 @@
+from uuid import UUID
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, literal, or_, union_all, BigInteger, Integer
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql import Select
+from app.models import Student, Invoice, Payment, PaymentImputation, BalanceSnapshot
+
+
+def naive_utc(moment: datetime) -> datetime:
+    """Timestamps are stored as naive UTC; normalize aware datetimes to match."""
+    if moment.tzinfo is not None:
+        return moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+class BalanceSnapshotService:
+    """Period-closing balance snapshots and point-in-time balances built on them.
+
+    A balance as of ``T`` is the latest snapshot taken at or before ``T`` plus
+    the invoices issued and payments dated after that snapshot, up to ``T``.
+    A payment counts once its invoice is issued too, like in the student
+    statement, so a payment imputed to a later invoice counts from then on.
+    Closed periods are treated as immutable: backdated changes to activity
+    before a snapshot are not reflected in it.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def latest_period_end(self, as_of: Optional[datetime] = None) -> Optional[datetime]:
+        query = select(func.max(BalanceSnapshot.period_end))
+        if as_of is not None:
+            query = query.where(BalanceSnapshot.period_end <= naive_utc(as_of))
+        return await self.db.scalar(query)
+
+    async def close_period(self, period_end: datetime) -> int:
+        """Store the closing balance of every student at ``period_end``.
+
+        Built from the previous snapshot plus the activity since, so closing a
+        period costs one period of activity. The caller must commit.
+        Returns the number of snapshot rows written.
+        """
+        period_end = naive_utc(period_end)
+        if period_end > datetime.utcnow():
+            raise ValueError("Cannot close a period that ends in the future")
+        previous = await self.latest_period_end()
+        if previous is not None and period_end <= previous:
+            raise ValueError(f"Period ending {previous.isoformat()} is already closed")
+
+        balances = self.balances_query(period_end, previous).subquery()
+        result = await self.db.execute(
+            insert(BalanceSnapshot).from_select(
+                ["period_end", "student_id", "currency", "invoice_count", "invoiced_cents", "paid_cents"],
+                select(
+                    literal(period_end),
+                    balances.c.student_id,
+                    balances.c.currency,
+                    balances.c.invoice_count,
+                    balances.c.invoiced_cents,
+                    balances.c.paid_cents,
+                ),
+            )
+        )
+        return result.rowcount
+
+    async def school_balances_as_of_query(self, school_id: UUID, as_of: datetime) -> Select:
+        """Per student balances of a school as of ``as_of``, shaped like the projection rows."""
+        as_of = naive_utc(as_of)
+        period_end = await self.latest_period_end(as_of)
+        balances = self.balances_query(
+            as_of, period_end, select(Student.id).where(Student.school_id == school_id)
+        ).subquery()
+        return (
+            select(
+                balances.c.student_id,
+                Student.name.label("student_name"),
+                balances.c.currency,
+                balances.c.invoiced_cents,
+                balances.c.paid_cents,
+                (balances.c.invoiced_cents - balances.c.paid_cents).label("outstanding_cents"),
+            )
+            .join(Student, Student.id == balances.c.student_id)
+            .where(balances.c.invoice_count > 0)
+            .order_by(Student.name, Student.id, balances.c.currency)
+        )
+
+    @staticmethod
+    def balances_query(
+        as_of: datetime,
+        period_end: Optional[datetime],
+        student_ids: Optional[Select] = None,
+    ) -> Select:
+        """Balances per student and currency: snapshot at ``period_end`` plus activity in (period_end, as_of]."""
+        snapshot = select(
+            BalanceSnapshot.student_id,
+            BalanceSnapshot.currency,
+            BalanceSnapshot.invoice_count,
+            BalanceSnapshot.invoiced_cents,
+            BalanceSnapshot.paid_cents,
+        ).where(BalanceSnapshot.period_end == period_end)
+        invoiced = select(
+            Invoice.student_id,
+            Invoice.currency,
+            literal(1, Integer),
+            Invoice.amount_cents.cast(BigInteger),
+            literal(0, BigInteger),
+        ).where(Invoice.issued_at <= as_of)
+        # Paid amounts count towards the currency of the invoice they were imputed to,
+        # once both the invoice is issued and the payment dated, as in the student statement
+        paid = (
+            select(
+                Invoice.student_id,
+                Invoice.currency,
+                literal(0, Integer),
+                literal(0, BigInteger),
+                PaymentImputation.amount_cents.cast(BigInteger),
+            )
+            .join(Invoice, Invoice.id == PaymentImputation.invoice_id)
+            .join(Payment, Payment.id == PaymentImputation.payment_id)
+            .where(Payment.payment_date <= as_of, Invoice.issued_at <= as_of)
+        )
+        if period_end is not None:
+            invoiced = invoiced.where(Invoice.issued_at > period_end)
+            # Imputations the snapshot did not count yet
+            paid = paid.where(or_(Payment.payment_date > period_end, Invoice.issued_at > period_end))
+        if student_ids is not None:
+            snapshot = snapshot.where(BalanceSnapshot.student_id.in_(student_ids))
+            invoiced = invoiced.where(Invoice.student_id.in_(student_ids))
+            paid = paid.where(Invoice.student_id.in_(student_ids))
+
+        sources = [invoiced, paid] if period_end is None else [snapshot, invoiced, paid]
+        activity = union_all(*sources).subquery()
+        student_id, currency_code, invoice_count, invoiced_cents, paid_cents = activity.c
+        return (
+            select(
+                student_id.label("student_id"),
+                currency_code.label("currency"),
+                func.sum(invoice_count).cast(Integer).label("invoice_count"),
+                func.sum(invoiced_cents).cast(BigInteger).label("invoiced_cents"),
+                func.sum(paid_cents).cast(BigInteger).label("paid_cents"),
+            )
+            .group_by(student_id, currency_code)
+        )
@@ -1,27 +1,48 @@
 from uuid import UUID
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models import Invoice, Student
+from sqlalchemy import select, func, update
+from app.models import Invoice, PaymentImputation
 from app.schemas import InvoiceCreate, InvoiceUpdate
 from app.money import currency
-from app.cache import RedisCache, student_statement_key, school_statement_key
+from app.cache import RedisCache
+from app.services.student_balance_service import StudentBalanceService
+from app.services.statement_cache_warmer import StatementCacheWarmer
+from app.services.outbox_service import OutboxService
 
 
 class InvoiceService:
-    def __init__(self, db: AsyncSession, cache: RedisCache):
+    def __init__(
+        self,
+        db: AsyncSession,
+        cache: RedisCache,
+        warmer: Optional[StatementCacheWarmer] = None,
+        publish_events_inline: bool = True,
+    ):
         self.db = db
         self.cache = cache
+        self.warmer = warmer
+        self.balances = StudentBalanceService(db)
+        # Statement invalidation goes through the outbox, see OutboxService
+        self.outbox = OutboxService(db, cache, warmer, publish_inline=publish_events_inline)
 
     async def create_invoice(self, invoice_data: InvoiceCreate) -> Invoice:
         currency(invoice_data.currency)
         invoice = Invoice(**invoice_data.model_dump())
         self.db.add(invoice)
+        await self.db.flush()
+        change = await self.balances.apply(
+            invoice.student_id, invoice.currency, invoiced_cents=invoice.amount_cents, invoice_count=1
+        )
+        event_ids = await self.outbox.record(
+            "invoice.created", invoice.student_id, [change],
+            invoice_id=invoice.id, amount_cents=invoice.amount_cents, currency=invoice.currency,
+        )
         await self.db.commit()
-        await self.db.refresh(invoice)
         
         # Invalidate cache for student and school statements
-        await self._invalidate_cache(invoice.student_id)
+        await self.outbox.after_commit(event_ids)
+        await self.db.refresh(invoice)
         
         return invoice
 
@@ -48,15 +69,38 @@ class InvoiceService:
         if invoice_data.currency is not None:
             currency(invoice_data.currency)
         
+        old_amount_cents, old_currency = invoice.amount_cents, invoice.currency
+        
         update_data = invoice_data.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(invoice, field, value)
         
+        changes = []
+        if invoice.currency != old_currency:
+            # The invoice and everything imputed to it move to the other currency bucket
+            paid_cents = await self._paid_cents(invoice.id)
+            changes.append(await self.balances.apply(
+                invoice.student_id, old_currency,
+                invoiced_cents=-old_amount_cents, paid_cents=-paid_cents, invoice_count=-1
+            ))
+            changes.append(await self.balances.apply(
+                invoice.student_id, invoice.currency,
+                invoiced_cents=invoice.amount_cents, paid_cents=paid_cents, invoice_count=1
+            ))
+        elif invoice.amount_cents != old_amount_cents:
+            changes.append(await self.balances.apply(
+                invoice.student_id, invoice.currency, invoiced_cents=invoice.amount_cents - old_amount_cents
+            ))
+        
+        event_ids = await self.outbox.record(
+            "invoice.updated", invoice.student_id, changes,
+            invoice_id=invoice.id, amount_cents=invoice.amount_cents, currency=invoice.currency,
+        )
         await self.db.commit()
-        await self.db.refresh(invoice)
         
         # Invalidate cache for student and school statements
-        await self._invalidate_cache(invoice.student_id)
+        await self.outbox.after_commit(event_ids)
+        await self.db.refresh(invoice)
         
         return invoice
 
@@ -66,26 +110,34 @@ class InvoiceService:
             return False
         
         student_id = invoice.student_id
+        paid_cents = await self._paid_cents(invoice.id)
         
-        await self.db.delete(invoice)
+        # Soft delete, along with what was imputed to the invoice
+        invoice.soft_delete()
+        await self.db.execute(
+            update(PaymentImputation)
+            .where(PaymentImputation.invoice_id == invoice.id)
+            .values(revoked_at=invoice.revoked_at)
+        )
+        change = await self.balances.apply(
+            student_id, invoice.currency,
+            invoiced_cents=-invoice.amount_cents, paid_cents=-paid_cents, invoice_count=-1
+        )
+        event_ids = await self.outbox.record(
+            "invoice.deleted", student_id, [change],
+            invoice_id=invoice.id, amount_cents=invoice.amount_cents, currency=invoice.currency,
+        )
         await self.db.commit()
         
         # Invalidate cache for student and school statements
-        await self._invalidate_cache(student_id)
+        await self.outbox.after_commit(event_ids)
         
         return True
     
-    async def _invalidate_cache(self, student_id: UUID):
-        """Invalidate cache for student and their school."""
-        # Get student to find school_id
-        result = await self.db.execute(
-            select(Student).where(Student.id == student_id)
+    async def _paid_cents(self, invoice_id: UUID) -> int:
+        paid_cents = await self.db.scalar(
+            select(func.coalesce(func.sum(PaymentImputation.amount_cents), 0)).where(
+                PaymentImputation.invoice_id == invoice_id
+            )
         )
-        student = result.scalar_one_or_none()
-        
-        if student:
-            # Invalidate student statement cache
-            await self.cache.delete(student_statement_key(student_id))
-            
-            # Invalidate school statement cache
-            await self.cache.delete(school_statement_key(student.school_id))
+        return int(paid_cents or 0)
@@ -0,0 +1,272 @@
+import asyncio
+import json
+from collections import Counter
+from datetime import datetime
+from uuid import UUID
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import select, delete, insert, literal, column, values, DateTime, String
+from sqlalchemy.dialects.postgresql import JSONB, UUID as PG_UUID
+from sqlalchemy.engine import Row
+from sqlalchemy.sql import Select
+from app.models import OutboxEvent, Student
+from app.cache import (
+    RedisCache, UUIDEncoder, invalidate_student_statements, invalidate_statements, student_version_key,
+    school_version_key,
+)
+from app.db import AsyncSessionLocal
+from app.services.student_balance_service import BalanceChange
+from app.services.statement_cache_warmer import StatementCacheWarmer
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Redis Stream the ledger events are published to, trimmed to about this many entries
+LEDGER_EVENTS_STREAM = "ledger-events"
+LEDGER_EVENTS_STREAM_MAXLEN = 100000
+DEFAULT_OUTBOX_BATCH_SIZE = 500
+
+
+class OutboxPublishError(RuntimeError):
+    """The events could not be added to the stream; they stay in the outbox."""
+
+
+class OutboxService:
+    """Transactional outbox for invoice and payment changes.
+
+    Write services ``record`` an event in the same transaction as the change,
+    so it commits or rolls back with it. ``publish`` later invalidates the
+    statements the events affect, adds the events to the ledger Redis Stream
+    and deletes them from the outbox. Delivery is at least once: a publisher
+    that fails before committing the deletion leaves the events for the next
+    one, so stream consumers should skip ``event_id`` values they have seen.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        cache: RedisCache,
+        warmer: Optional[StatementCacheWarmer] = None,
+        publish_inline: bool = True,
+    ):
+        self.db = db
+        self.cache = cache
+        self.warmer = warmer
+        self.publish_inline = publish_inline
+
+    async def record(
+        self, event_type: str, student_id: UUID, changes: Sequence[Optional[BalanceChange]] = (), **data
+    ) -> List[int]:
+        """Write one event about a student in the current transaction; see ``record_many``."""
+        return await self.record_many([(event_type, student_id, changes, data)])
+
+    async def record_many(
+        self, events: Sequence[Tuple[str, UUID, Sequence[Optional[BalanceChange]], dict]]
+    ) -> List[int]:
+        """Write ``(event_type, student_id, changes, data)`` events in the current transaction, in one statement.
+
+        The student's school is looked up by the same INSERT ... SELECT.
+        ``changes`` are the balance changes the write made; the publisher
+        patches the cached school statement with them. Returns the event IDs.
+        """
+        if not events:
+            return []
+        rows = values(
+            column("event_type", String),
+            column("student_id", PG_UUID(as_uuid=True)),
+            column("payload", JSONB),
+            name="events",
+        ).data([
+            (event_type, student_id, _jsonable({
+                **data,
+                "changes": [change._asdict() for change in changes if change is not None],
+            }))
+            for event_type, student_id, changes, data in events
+        ])
+        result = await self.db.execute(
+            insert(OutboxEvent)
+            .from_select(
+                ["event_type", "student_id", "school_id", "payload", "created_at"],
+                select(
+                    rows.c.event_type, Student.id, Student.school_id, rows.c.payload,
+                    literal(datetime.utcnow(), DateTime),
+                ).join(rows, rows.c.student_id == Student.id),
+            )
+            .returning(OutboxEvent.id)
+        )
+        return list(result.scalars().all())
+
+    async def record_students(self, event_type: str, student_ids: Select, **data) -> List[int]:
+        """Write the same event for every student selected by ``student_ids``, in one INSERT ... SELECT.
+
+        Used for changes to students themselves, which carry no balance
+        changes. Revoked students are not selected, so soft deletes record
+        their events before revoking. Returns the event IDs.
+        """
+        result = await self.db.execute(
+            insert(OutboxEvent)
+            .from_select(
+                ["event_type", "student_id", "school_id", "payload", "created_at"],
+                select(
+                    literal(event_type, String), Student.id, Student.school_id,
+                    literal(_jsonable({**data, "changes": []}), JSONB),
+                    literal(datetime.utcnow(), DateTime),
+                ).where(Student.id.in_(student_ids)),
+            )
+            .returning(OutboxEvent.id)
+        )
+        return list(result.scalars().all())
+
+    async def after_commit(self, event_ids: Sequence[int]):
+        """Publish the events of a write that just committed, unless ``publish_inline`` is off.
+
+        Publishing inline keeps the next read of the statements fresh; without
+        it the write returns sooner and the relay publishes within its poll
+        interval. Failures are logged and left to the relay, the write stands.
+        """
+        if not self.publish_inline or not event_ids:
+            return
+        try:
+            await self.publish(event_ids)
+        except Exception as e:
+            logger.warning(f"Publishing outbox events {list(event_ids)} failed, leaving them to the relay: {e}")
+
+    async def publish(self, event_ids: Optional[Sequence[int]] = None, limit: int = DEFAULT_OUTBOX_BATCH_SIZE) -> int:
+        """Publish pending events, the given ones or else the oldest ``limit``, in a transaction of their own.
+
+        The events are deleted first, keeping their rows locked while the
+        statements are invalidated and the events added to the stream; the
+        deletion only commits once the stream has them. Events locked by
+        another publisher are skipped. Returns how many were published.
+        """
+        pending = select(OutboxEvent.id).order_by(OutboxEvent.id).with_for_update(skip_locked=True)
+        if event_ids is not None:
+            pending = pending.where(OutboxEvent.id.in_(event_ids))
+        else:
+            pending = pending.limit(limit)
+        result = await self.db.execute(
+            delete(OutboxEvent)
+            .where(OutboxEvent.id.in_(pending.scalar_subquery()))
+            .returning(
+                OutboxEvent.id, OutboxEvent.event_type, OutboxEvent.student_id, OutboxEvent.school_id,
+                OutboxEvent.payload, OutboxEvent.created_at,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        events = sorted(result.all(), key=lambda event: event.id)
+        if not events:
+            await self.db.commit()
+            return 0
+        try:
+            await self._invalidate(events)
+            published = await self.cache.add_stream_entries(
+                LEDGER_EVENTS_STREAM, [_stream_entry(event) for event in events], maxlen=LEDGER_EVENTS_STREAM_MAXLEN
+            )
+            if not published:
+                raise OutboxPublishError(f"Could not add {len(events)} event(s) to {LEDGER_EVENTS_STREAM}")
+        except BaseException:
+            await self.db.rollback()
+            raise
+        await self.db.commit()
+        return len(events)
+
+    async def _invalidate(self, events: Sequence[Row]):
+        """Invalidate the statements the events affect.
+
+        A school with a single event in the batch gets its statement patched
+        when possible, as a write would; schools with several are invalidated
+        once, with all their students, rather than patched event by event.
+        A student moved to another school is invalidated in both. Deleted
+        students and schools lose their version counters, so no ETag of
+        theirs matches again.
+        """
+        events_per_school = Counter(event.school_id for event in events)
+        student_ids, school_ids = set(), set()
+        for event in events:
+            if event.payload.get("previous_school_id"):
+                student_ids.add(event.student_id)
+                school_ids.update((event.school_id, UUID(event.payload["previous_school_id"])))
+                continue
+            if events_per_school[event.school_id] > 1:
+                student_ids.add(event.student_id)
+                school_ids.add(event.school_id)
+                continue
+            changes = [_balance_change(change) for change in event.payload.get("changes", [])]
+            if self.warmer:
+                await self.warmer.invalidate(event.student_id, event.school_id, changes)
+            else:
+                await invalidate_student_statements(self.cache, event.student_id, event.school_id, changes=changes)
+        if school_ids:
+            if self.warmer:
+                await self.warmer.invalidate_many(student_ids, school_ids)
+            else:
+                await invalidate_statements(self.cache, student_ids, school_ids)
+        version_keys = {student_version_key(event.student_id) for event in events if event.event_type == "student.deleted"}
+        version_keys.update(school_version_key(event.school_id) for event in events if event.payload.get("school_deleted"))
+        for key in version_keys:
+            await self.cache.delete(key)
+
+
+class OutboxRelay:
+    """Publishes outbox events in the background, a batch at a time.
+
+    Picks up whatever the write services did not publish themselves: all
+    events when they leave publishing to the relay, and events left behind by
+    a crash between commit and publication otherwise. Every batch opens its
+    own session.
+    """
+
+    def __init__(
+        self,
+        cache: RedisCache,
+        warmer: Optional[StatementCacheWarmer] = None,
+        session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+        batch_size: int = DEFAULT_OUTBOX_BATCH_SIZE,
+        poll_interval: float = 1.0,
+    ):
+        self.cache = cache
+        self.warmer = warmer
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+
+    async def run(self):
+        """Drain the outbox until cancelled, polling when it is empty."""
+        while True:
+            try:
+                await self.drain()
+            except Exception as e:
+                logger.warning(f"Outbox relay failed, retrying: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def drain(self) -> int:
+        """Publish batches until the outbox is empty. Returns how many events were published."""
+        total = 0
+        while True:
+            async with self.session_factory() as session:
+                published = await OutboxService(session, self.cache, self.warmer).publish(limit=self.batch_size)
+            total += published
+            if published < self.batch_size:
+                return total
+
+
+def _jsonable(value: dict) -> dict:
+    return json.loads(json.dumps(value, cls=UUIDEncoder))
+
+
+def _balance_change(change: Dict) -> BalanceChange:
+    return BalanceChange(
+        UUID(change["student_id"]), UUID(change["school_id"]), change["currency"], change["version"],
+        change["invoice_count"], change["invoiced_cents"], change["paid_cents"],
+    )
+
+
+def _stream_entry(event: Row) -> Dict[str, str]:
+    return {
+        "event_id": str(event.id),
+        "type": event.event_type,
+        "student_id": str(event.student_id),
+        "school_id": str(event.school_id),
+        "occurred_at": event.created_at.isoformat(),
+        "data": json.dumps(event.payload),
+    }
@@ -0,0 +1,252 @@
+import csv
+import codecs
+import json
+import uuid
+from datetime import datetime
+from uuid import UUID
+from typing import AsyncIterable, AsyncIterator, Callable, Dict, List, Optional, Tuple, Type, TypeVar
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert
+from sqlalchemy.engine import Row
+from app.models import Payment, PaymentImputation
+from app.schemas import PaymentImportRow, PaymentImportError, PaymentImportResult
+from app.cache import RedisCache
+from app.services.payment_service import PaymentService
+from app.services.student_balance_service import StudentBalanceService, BalanceChange
+from app.services.balance_snapshot_service import naive_utc
+from app.services.statement_cache_warmer import StatementCacheWarmer
+
+IMPORT_FORMATS = ("csv", "ndjson")
+DEFAULT_IMPORT_BATCH_SIZE = 1000
+
+RowT = TypeVar("RowT", bound=BaseModel)
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Split a stream of UTF-8 bytes, e.g. a request body, into lines."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def parse_rows(
+    lines: AsyncIterable[str],
+    file_format: str,
+    model: Type[RowT],
+    csv_row: Callable[[dict], dict] = dict,
+) -> AsyncIterator[Tuple[int, Optional[RowT], Optional[str]]]:
+    """Validate ``lines`` (``csv`` with a header line, or ``ndjson``) as ``model`` rows.
+
+    Yields ``(line_number, row, None)``, or ``(line_number, None, detail)``
+    for an invalid line. Line numbers count from 1, header included, and
+    blank lines are skipped. Empty CSV cells are left out so the schema
+    defaults apply; ``csv_row`` can reshape the rest before validation.
+    """
+    header: Optional[List[str]] = None
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        line = line.rstrip("\r")
+        if not line.strip():
+            continue
+        try:
+            if file_format == "csv" and header is None:
+                header = next(csv.reader([line]))
+                continue
+            if file_format == "csv":
+                values = next(csv.reader([line]))
+                if len(values) != len(header):
+                    raise ValueError(f"Expected {len(header)} columns, got {len(values)}")
+                data = csv_row({name: value for name, value in zip(header, values) if value != ""})
+            else:
+                data = json.loads(line)
+            yield line_number, model.model_validate(data), None
+        except ValidationError as e:
+            # Errors of whole-row validators have no location
+            detail = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" if error["loc"] else error["msg"]
+                for error in e.errors()
+            )
+            yield line_number, None, detail
+        except ValueError as e:
+            yield line_number, None, str(e)
+
+
+class PaymentImportService:
+    """Bulk payment import for bank and processor settlement files.
+
+    Rows are validated with the rules of ``PaymentService.create_payment`` a
+    batch at a time: the invoices of a whole batch are loaded in one query,
+    payments and imputations are written with one executemany each, and the
+    balance projection is updated in one statement. Each batch is committed
+    on its own, so a bad row only fails itself and an error in a later batch
+    does not undo earlier ones.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        cache: RedisCache,
+        warmer: Optional[StatementCacheWarmer] = None,
+        publish_events_inline: bool = True,
+    ):
+        self.db = db
+        self.cache = cache
+        self.warmer = warmer
+        self.payments = PaymentService(db, cache, warmer, publish_events_inline=publish_events_inline)
+        self.balances = StudentBalanceService(db)
+        self.outbox = self.payments.outbox
+
+    async def import_payments(
+        self,
+        lines: AsyncIterable[str],
+        file_format: str,
+        batch_size: int = DEFAULT_IMPORT_BATCH_SIZE,
+    ) -> PaymentImportResult:
+        """Import the payments in ``lines`` (``csv`` with a header line, or ``ndjson``).
+
+        Line numbers in the reported errors count from 1, header included.
+        """
+        if file_format not in IMPORT_FORMATS:
+            raise ValueError(f"Unsupported import format {file_format}")
+        result = PaymentImportResult()
+        batch: List[Tuple[int, PaymentImportRow]] = []
+        async for line_number, row in self._parse(lines, file_format, result):
+            batch.append((line_number, row))
+            if len(batch) >= batch_size:
+                await self._import_batch(batch, result)
+                batch = []
+        if batch:
+            await self._import_batch(batch, result)
+        result.errors.sort(key=lambda error: error.line)
+        result.failed = len(result.errors)
+        return result
+
+    async def _parse(
+        self, lines: AsyncIterable[str], file_format: str, result: PaymentImportResult
+    ) -> AsyncIterator[Tuple[int, PaymentImportRow]]:
+        async for line_number, row, detail in parse_rows(lines, file_format, PaymentImportRow, self._csv_row):
+            if row is None:
+                result.errors.append(PaymentImportError(line=line_number, detail=detail))
+            else:
+                yield line_number, row
+
+    @staticmethod
+    def _csv_row(data: dict) -> dict:
+        """A CSV row as ``PaymentImportRow`` data.
+
+        Besides the payment columns, a row has either ``invoice_id`` (the whole
+        amount is imputed to that invoice) or ``imputations`` (a JSON list).
+        """
+        if "imputations" in data:
+            data["imputations"] = json.loads(data["imputations"])
+        elif "invoice_id" in data:
+            data["imputations"] = [{"invoice_id": data["invoice_id"], "amount_cents": data.get("amount_cents")}]
+        data.pop("invoice_id", None)
+        return data
+
+    async def _import_batch(self, batch: List[Tuple[int, PaymentImportRow]], result: PaymentImportResult):
+        invoice_ids = list({imputation.invoice_id for _, row in batch for imputation in row.imputations})
+        fifo_keys = {(row.student_id, row.currency) for _, row in batch if row.allocation == "fifo"}
+        # Concurrent payments and imports to the same invoices wait until this batch commits
+        await self.payments.lock_invoices(invoice_ids, owners=list(fifo_keys))
+
+        # Every invoice the batch imputes to and what is already paid on it, in one query
+        invoices = await self.payments.invoices_with_paid_cents(invoice_ids)
+        # And, in one more, the open invoices of the students with fifo rows. The
+        # lists cover all the batch pays them, manual rows can use up invoices too
+        fifo_amounts: Dict[Tuple[UUID, str], int] = {}
+        for _, row in batch:
+            key = (row.student_id, row.currency)
+            if key in fifo_keys:
+                fifo_amounts[key] = fifo_amounts.get(key, 0) + row.amount_cents
+        open_invoices: Dict[Tuple[UUID, str], List[Row]] = {}
+        for invoice in await self.payments.open_invoices_fifo(fifo_amounts):
+            open_invoices.setdefault((invoice.student_id, invoice.currency), []).append(invoice)
+            invoices[invoice.id] = invoice
+        imputed_cents: Dict[UUID, int] = {}
+        paid_cents: Dict[Tuple[UUID, str], int] = {}
+        payments: List[dict] = []
+        imputations: List[dict] = []
+        events: List[Tuple[UUID, dict]] = []
+        now = datetime.utcnow()
+        for line_number, row in batch:
+            try:
+                # Earlier rows of the batch count against the same outstanding amounts
+                if row.allocation == "fifo":
+                    row = PaymentService.allocate_fifo(
+                        row, open_invoices.get((row.student_id, row.currency), []), imputed_cents
+                    )
+                payment_cents = PaymentService.check_imputations(row, invoices, imputed_cents)
+            except ValueError as e:
+                result.errors.append(PaymentImportError(line=line_number, detail=str(e)))
+                continue
+            for invoice_id, cents in payment_cents.items():
+                imputed_cents[invoice_id] = imputed_cents.get(invoice_id, 0) + cents
+            key = (row.student_id, row.currency)
+            paid_cents[key] = paid_cents.get(key, 0) + row.amount_cents
+
+            payment_id = uuid.uuid4()
+            payments.append({
+                "id": payment_id,
+                "student_id": row.student_id,
+                "amount_cents": row.amount_cents,
+                "currency": row.currency,
+                "payment_date": naive_utc(row.payment_date) if row.payment_date else now,
+                "payment_method": row.payment_method,
+                "reference": row.reference,
+            })
+            imputations += [
+                {
+                    "payment_id": payment_id,
+                    "invoice_id": imputation.invoice_id,
+                    "amount_cents": imputation.amount_cents,
+                    "currency": row.currency,
+                }
+                for imputation in row.imputations
+            ]
+            events.append((row.student_id, PaymentService.event_data(payment_id, row)))
+        if not payments:
+            return
+
+        try:
+            await self.db.execute(insert(Payment), payments)
+            await self.db.execute(insert(PaymentImputation), imputations)
+            changes = await self.balances.apply_paid(paid_cents)
+            event_ids = await self.outbox.record_many(self._events(events, changes))
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+        result.imported += len(payments)
+
+        # Each affected student and school statement is invalidated once per batch
+        await self.outbox.after_commit(event_ids)
+
+    @staticmethod
+    def _events(
+        events: List[Tuple[UUID, dict]], changes: List[BalanceChange]
+    ) -> List[Tuple[str, UUID, List[BalanceChange], dict]]:
+        """One ``payment.created`` event per payment. The balance changes of a
+        student go with their last payment of the batch, so they add up once."""
+        changes_by_student: Dict[UUID, List[BalanceChange]] = {}
+        for change in changes:
+            changes_by_student.setdefault(change.student_id, []).append(change)
+        last_event = {student_id: index for index, (student_id, _) in enumerate(events)}
+        return [
+            (
+                "payment.created",
+                student_id,
+                changes_by_student.get(student_id, []) if last_event[student_id] == index else [],
+                data,
+            )
+            for index, (student_id, data) in enumerate(events)
+        ]
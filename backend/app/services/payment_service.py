@@ -1,73 +1,287 @@
 from uuid import UUID
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update, insert, column, values, or_, tuple_, BigInteger, String
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.engine import Row
 from moneyed import Money
-from app.models import Payment, PaymentImputation, Invoice, Student
+from app.models import Payment, PaymentImputation, Invoice
 from app.schemas import PaymentCreate
+from app.schemas.payment import PaymentImputationInput
 from app.money import currency, money_from_cents
-from app.cache import RedisCache, student_statement_key, school_statement_key
+from app.cache import RedisCache
+from app.services.student_balance_service import StudentBalanceService
+from app.services.statement_cache_warmer import StatementCacheWarmer
+from app.services.outbox_service import OutboxService
 
 
 class PaymentService:
-    def __init__(self, db: AsyncSession, cache: RedisCache):
+    def __init__(
+        self,
+        db: AsyncSession,
+        cache: RedisCache,
+        warmer: Optional[StatementCacheWarmer] = None,
+        publish_events_inline: bool = True,
+    ):
         self.db = db
         self.cache = cache
+        self.warmer = warmer
+        self.balances = StudentBalanceService(db)
+        # Statement invalidation goes through the outbox, see OutboxService
+        self.outbox = OutboxService(db, cache, warmer, publish_inline=publish_events_inline)
 
     async def create_payment(self, payment_data: PaymentCreate) -> Payment:
+        # Concurrent payments to the same invoices wait at the lock until this one commits
+        if payment_data.allocation == "fifo":
+            owner = (payment_data.student_id, payment_data.currency)
+            await self.lock_invoices(owners=[owner])
+            # The student's open invoices, oldest due first, in one query
+            open_invoices = await self.open_invoices_fifo({owner: payment_data.amount_cents})
+            payment_data = self.allocate_fifo(payment_data, open_invoices)
+            invoices = {invoice.id: invoice for invoice in open_invoices}
+        else:
+            invoice_ids = [imputation_input.invoice_id for imputation_input in payment_data.imputations]
+            await self.lock_invoices(invoice_ids)
+            # Every imputed invoice and what is already paid on it, in one query
+            invoices = await self.invoices_with_paid_cents(invoice_ids)
+        self.check_imputations(payment_data, invoices)
+        
+        payment = Payment(
+            student_id=payment_data.student_id,
+            amount_cents=payment_data.amount_cents,
+            currency=payment_data.currency,
+            payment_method=payment_data.payment_method,
+            reference=payment_data.reference
+        )
+        self.db.add(payment)
+        await self.db.flush()
+        
+        # One multi-row INSERT for all the imputations
+        await self.db.execute(
+            insert(PaymentImputation),
+            [
+                {
+                    "payment_id": payment.id,
+                    "invoice_id": imputation_input.invoice_id,
+                    "amount_cents": imputation_input.amount_cents,
+                    "currency": payment_data.currency,
+                }
+                for imputation_input in payment_data.imputations
+            ],
+        )
+        
+        change = await self.balances.apply(payment.student_id, payment.currency, paid_cents=payment.amount_cents)
+        event_ids = await self.outbox.record(
+            "payment.created", payment.student_id, [change], **self.event_data(payment.id, payment_data)
+        )
+        await self.db.commit()
+        
+        # Invalidate cache for student and school statements
+        await self.outbox.after_commit(event_ids)
+        await self.db.refresh(payment)
+        
+        return payment
+
+    @staticmethod
+    def event_data(payment_id: UUID, payment_data: PaymentCreate) -> dict:
+        """What the ``payment.created`` outbox event says about a payment."""
+        return {
+            "payment_id": payment_id,
+            "amount_cents": payment_data.amount_cents,
+            "currency": payment_data.currency,
+            "imputations": [
+                {"invoice_id": imputation.invoice_id, "amount_cents": imputation.amount_cents}
+                for imputation in payment_data.imputations
+            ],
+        }
+
+    async def lock_invoices(
+        self,
+        invoice_ids: Sequence[UUID] = (),
+        owners: Sequence[Tuple[UUID, str]] = (),
+    ):
+        """Lock invoices against concurrent imputations until the transaction ends.
+
+        Locks the given invoices and every invoice of the given (student,
+        currency) pairs with ``SELECT ... FOR UPDATE``, in ID order so that
+        transactions locking overlapping sets cannot deadlock. Paid sums must
+        be read after this, in a separate statement: under READ COMMITTED a
+        statement that waited for a lock still sees the imputations of its
+        own snapshot.
+        """
+        criteria = []
+        if invoice_ids:
+            criteria.append(Invoice.id.in_(set(invoice_ids)))
+        if owners:
+            criteria.append(tuple_(Invoice.student_id, Invoice.currency).in_(set(owners)))
+        if not criteria:
+            return
+        await self.db.execute(
+            select(Invoice.id).where(or_(*criteria)).order_by(Invoice.id).with_for_update()
+        )
+
+    @staticmethod
+    def check_imputations(
+        payment_data: PaymentCreate,
+        invoices: Dict[UUID, Row],
+        imputed_cents: Optional[Dict[UUID, int]] = None,
+    ) -> Dict[UUID, int]:
+        """Check a payment's imputations against ``invoices`` (from ``invoices_with_paid_cents``).
+
+        ``imputed_cents`` holds amounts already imputed per invoice that are not
+        in the paid sums yet, e.g. by earlier payments of the same import batch.
+        Raises ValueError on the first broken rule; returns the amounts this
+        payment imputes per invoice.
+        """
+        imputed_cents = imputed_cents or {}
         cur = currency(payment_data.currency)
         payment_total = money_from_cents(payment_data.amount_cents, payment_data.currency)
         imputed_total = Money(0, cur)
-        
+        payment_cents: Dict[UUID, int] = {}
         for imputation_input in payment_data.imputations:
-            invoice = await self.db.get(Invoice, imputation_input.invoice_id)
+            invoice = invoices.get(imputation_input.invoice_id)
             if not invoice:
                 raise ValueError(f"Invoice {imputation_input.invoice_id} not found")
             if invoice.student_id != payment_data.student_id:
                 raise ValueError(f"Invoice {imputation_input.invoice_id} does not belong to student {payment_data.student_id}")
             if invoice.currency != payment_data.currency:
                 raise ValueError(f"Invoice currency {invoice.currency} does not match payment currency {payment_data.currency}")
-
-            paid_cents = await self.db.scalar(
-                select(func.coalesce(func.sum(PaymentImputation.amount_cents), 0)).where(
-                    PaymentImputation.invoice_id == invoice.id
-                )
-            )
-            outstanding_cents = invoice.amount_cents - int(paid_cents or 0)
-            if imputation_input.amount_cents > outstanding_cents:
+            
+            # Several imputations to the same invoice share its outstanding amount
+            payment_cents[invoice.id] = payment_cents.get(invoice.id, 0) + imputation_input.amount_cents
+            outstanding_cents = invoice.amount_cents - invoice.paid_cents - imputed_cents.get(invoice.id, 0)
+            if payment_cents[invoice.id] > outstanding_cents:
                 raise ValueError(f"Imputation exceeds outstanding amount for invoice {invoice.id}")
 
             imputed_total += money_from_cents(imputation_input.amount_cents, payment_data.currency)
 
         if imputed_total != payment_total:
             raise ValueError("Total imputation amount must equal payment amount")
-        
-        payment = Payment(
-            student_id=payment_data.student_id,
-            amount_cents=payment_data.amount_cents,
-            currency=payment_data.currency,
-            payment_method=payment_data.payment_method,
-            reference=payment_data.reference
+        return payment_cents
+
+    @staticmethod
+    def allocate_fifo(
+        payment_data: PaymentCreate,
+        open_invoices: Sequence[Row],
+        imputed_cents: Optional[Dict[UUID, int]] = None,
+    ) -> PaymentCreate:
+        """``payment_data`` with its amount spread over ``open_invoices`` (from ``open_invoices_fifo``).
+
+        Each invoice in the payment's student and currency gets what is left
+        of the payment, up to its outstanding amount, in order. ``imputed_cents``
+        is as for ``check_imputations``. Raises ValueError when the open
+        invoices cannot take the whole amount.
+        """
+        imputed_cents = imputed_cents or {}
+        remaining_cents = payment_data.amount_cents
+        imputations = []
+        for invoice in open_invoices:
+            if remaining_cents == 0:
+                break
+            if invoice.student_id != payment_data.student_id or invoice.currency != payment_data.currency:
+                continue
+            outstanding_cents = invoice.amount_cents - invoice.paid_cents - imputed_cents.get(invoice.id, 0)
+            if outstanding_cents <= 0:
+                continue
+            amount_cents = min(outstanding_cents, remaining_cents)
+            imputations.append(PaymentImputationInput(invoice_id=invoice.id, amount_cents=amount_cents))
+            remaining_cents -= amount_cents
+        if remaining_cents:
+            raise ValueError(
+                f"Payment amount exceeds outstanding {payment_data.currency} balance of student {payment_data.student_id}"
+            )
+        return payment_data.model_copy(update={"imputations": imputations, "allocation": "manual"})
+
+    async def open_invoices_fifo(self, amounts: Dict[Tuple[UUID, str], int]) -> List[Row]:
+        """Open invoices of each (student, currency) in ``amounts``, in allocation order.
+
+        Invoices are ordered by due date (undated last), then issue date, and
+        each one carries its paid sum like ``invoices_with_paid_cents``. A
+        running total of the outstanding amounts cuts each list off once it
+        covers the amount given for its (student, currency).
+        """
+        if not amounts:
+            return []
+        wanted = values(
+            column("student_id", PG_UUID(as_uuid=True)),
+            column("currency", String),
+            column("amount_cents", BigInteger),
+            name="wanted",
+        ).data([(student_id, currency_code, cents) for (student_id, currency_code), cents in amounts.items()])
+        paid = (
+            select(
+                PaymentImputation.invoice_id,
+                func.sum(PaymentImputation.amount_cents).label("paid_cents"),
+            )
+            .join(Invoice, Invoice.id == PaymentImputation.invoice_id)
+            .join(wanted, (wanted.c.student_id == Invoice.student_id) & (wanted.c.currency == Invoice.currency))
+            .group_by(PaymentImputation.invoice_id)
+            .subquery()
         )
-        self.db.add(payment)
-        await self.db.flush()
-        
-        for imputation_input in payment_data.imputations:
-            imputation = PaymentImputation(
-                payment_id=payment.id,
-                invoice_id=imputation_input.invoice_id,
-                amount_cents=imputation_input.amount_cents,
-                currency=payment_data.currency
+        paid_cents = func.coalesce(paid.c.paid_cents, 0)
+        outstanding_cents = Invoice.amount_cents - paid_cents
+        allocation_order = (Invoice.due_date.asc().nulls_last(), Invoice.issued_at, Invoice.id)
+        open_invoices = (
+            select(
+                Invoice.id,
+                Invoice.student_id,
+                Invoice.currency,
+                Invoice.amount_cents,
+                paid_cents.label("paid_cents"),
+                wanted.c.amount_cents.label("wanted_cents"),
+                # Outstanding on the invoices before this one
+                (
+                    func.sum(outstanding_cents).over(
+                        partition_by=(Invoice.student_id, Invoice.currency), order_by=allocation_order
+                    ) - outstanding_cents
+                ).label("preceding_cents"),
+                func.row_number().over(
+                    partition_by=(Invoice.student_id, Invoice.currency), order_by=allocation_order
+                ).label("position"),
             )
-            self.db.add(imputation)
-        
-        await self.db.commit()
-        await self.db.refresh(payment)
-        
-        # Invalidate cache for student and school statements
-        await self._invalidate_cache(payment.student_id)
-        
-        return payment
+            .join(wanted, (wanted.c.student_id == Invoice.student_id) & (wanted.c.currency == Invoice.currency))
+            .outerjoin(paid, paid.c.invoice_id == Invoice.id)
+            .where(outstanding_cents > 0)
+            .subquery()
+        )
+        result = await self.db.execute(
+            select(
+                open_invoices.c.id,
+                open_invoices.c.student_id,
+                open_invoices.c.currency,
+                open_invoices.c.amount_cents,
+                open_invoices.c.paid_cents,
+            )
+            .where(open_invoices.c.preceding_cents < open_invoices.c.wanted_cents)
+            .order_by(open_invoices.c.student_id, open_invoices.c.currency, open_invoices.c.position)
+        )
+        return list(result.all())
+
+    async def invoices_with_paid_cents(self, invoice_ids: List[UUID]) -> Dict[UUID, Row]:
+        """The given invoices by ID, each with the sum of the imputations already made to it."""
+        if not invoice_ids:
+            return {}
+        paid = (
+            select(
+                PaymentImputation.invoice_id,
+                func.sum(PaymentImputation.amount_cents).label("paid_cents"),
+            )
+            .where(PaymentImputation.invoice_id.in_(invoice_ids))
+            .group_by(PaymentImputation.invoice_id)
+            .subquery()
+        )
+        result = await self.db.execute(
+            select(
+                Invoice.id,
+                Invoice.student_id,
+                Invoice.currency,
+                Invoice.amount_cents,
+                func.coalesce(paid.c.paid_cents, 0).label("paid_cents"),
+            )
+            .outerjoin(paid, paid.c.invoice_id == Invoice.id)
+            .where(Invoice.id.in_(invoice_ids))
+        )
+        return {row.id: row for row in result.all()}
 
     async def get_payment(self, payment_id: UUID) -> Optional[Payment]:
         result = await self.db.execute(
@@ -91,25 +305,33 @@ class PaymentService:
         
         student_id = payment.student_id
         
-        await self.db.delete(payment)
+        # Imputed amounts count towards the currency of the invoice they paid
+        result = await self.db.execute(
+            select(Invoice.currency, func.sum(PaymentImputation.amount_cents))
+            .join(PaymentImputation, PaymentImputation.invoice_id == Invoice.id)
+            .where(PaymentImputation.payment_id == payment.id)
+            .group_by(Invoice.currency)
+        )
+        changes = [
+            await self.balances.apply(student_id, invoice_currency, paid_cents=-int(paid_cents))
+            for invoice_currency, paid_cents in result.all()
+        ]
+        
+        # Soft delete, along with the payment's imputations
+        payment.soft_delete()
+        await self.db.execute(
+            update(PaymentImputation)
+            .where(PaymentImputation.payment_id == payment.id)
+            .values(revoked_at=payment.revoked_at)
+        )
+        event_ids = await self.outbox.record(
+            "payment.deleted", student_id, changes,
+            payment_id=payment.id, amount_cents=payment.amount_cents, currency=payment.currency,
+        )
         await self.db.commit()
         
         # Invalidate cache for student and school statements
-        await self._invalidate_cache(student_id)
+        await self.outbox.after_commit(event_ids)
         
         return True
-    
-    async def _invalidate_cache(self, student_id: UUID):
-        """Invalidate cache for student and their school."""
-        # Get student to find school_id
-        result = await self.db.execute(
-            select(Student).where(Student.id == student_id)
-        )
-        student = result.scalar_one_or_none()
-        
-        if student:
-            # Invalidate student statement cache
-            await self.cache.delete(student_statement_key(student_id))
-            
-            # Invalidate school statement cache
-            await self.cache.delete(school_statement_key(student.school_id))
+
@@ -0,0 +1,131 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+from uuid import UUID
+from typing import AsyncIterable, AsyncIterator, Dict, List, Optional, Set, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from sqlalchemy.engine import Row
+from app.models import Payment
+from app.schemas import BankStatementLine, ReconciliationResult
+from app.services.payment_import_service import parse_rows
+
+RECONCILIATION_FORMATS = ("csv", "ndjson")
+DEFAULT_RECONCILIATION_BATCH_SIZE = 5000
+DEFAULT_DATE_WINDOW = timedelta(days=3)
+
+
+class ReconciliationService:
+    """Matches bank statement lines to payments by reference, amount and date.
+
+    A line matches a payment with the same reference, amount and currency
+    dated within ``date_window`` of the line's value date, counting in days.
+    Lines are read a batch at a time: one indexed query fetches the payments
+    with the batch's references, hashed by reference for the lookups, so
+    memory stays bounded by the batch size, plus the IDs of the payments
+    claimed so far. Two lines of a batch claiming the same payment are both
+    ambiguous, as is any later line claiming a payment an earlier batch
+    claimed. References are compared with surrounding whitespace trimmed.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def reconcile(
+        self,
+        lines: AsyncIterable[str],
+        file_format: str,
+        date_window: timedelta = DEFAULT_DATE_WINDOW,
+        batch_size: int = DEFAULT_RECONCILIATION_BATCH_SIZE,
+    ) -> AsyncIterator[ReconciliationResult]:
+        """Yield one result per statement line (``csv`` with a header line, or ``ndjson``), in order.
+
+        CSV files have ``reference``, ``amount_cents`` or a decimal ``amount``,
+        ``currency`` and ``date`` (or ``value_date``) columns. Invalid lines
+        come out unmatched, with a ``detail``.
+        """
+        if file_format not in RECONCILIATION_FORMATS:
+            raise ValueError(f"Unsupported statement format {file_format}")
+        # Payments matched so far in the run, each accounting for one bank movement
+        claimed: Set[UUID] = set()
+        batch: List[Tuple[int, Optional[BankStatementLine], Optional[str]]] = []
+        async for parsed in parse_rows(lines, file_format, BankStatementLine):
+            batch.append(parsed)
+            if len(batch) >= batch_size:
+                for result in await self._reconcile_batch(batch, date_window, claimed):
+                    yield result
+                batch = []
+        if batch:
+            for result in await self._reconcile_batch(batch, date_window, claimed):
+                yield result
+
+    async def _reconcile_batch(
+        self,
+        batch: List[Tuple[int, Optional[BankStatementLine], Optional[str]]],
+        date_window: timedelta,
+        claimed: Set[UUID],
+    ) -> List[ReconciliationResult]:
+        """Results of a batch of parsed lines; adds the payments they claim to ``claimed``."""
+        statement_lines = [line for _, line, _ in batch if line is not None]
+        payments = await self._payments_by_reference(statement_lines, date_window)
+
+        candidates: Dict[int, List[UUID]] = {}
+        for line_number, line, _ in batch:
+            if line is None:
+                continue
+            candidates[line_number] = [
+                payment.id
+                for payment in payments.get(line.reference, [])
+                if payment.amount_cents == line.amount_cents
+                and payment.currency == line.currency
+                and abs(payment.payment_date.date() - line.value_date) <= date_window
+            ]
+        # A payment accounts for one bank movement; lines competing for it are ambiguous
+        claims = Counter(ids[0] for ids in candidates.values() if len(ids) == 1)
+
+        results = []
+        for line_number, line, detail in batch:
+            if line is None:
+                results.append(ReconciliationResult(line=line_number, status="unmatched", detail=detail))
+                continue
+            payment_ids = candidates[line_number]
+            if not payment_ids:
+                status = "unmatched"
+            elif len(payment_ids) == 1 and claims[payment_ids[0]] == 1 and payment_ids[0] not in claimed:
+                status = "matched"
+            else:
+                status = "ambiguous"
+            results.append(ReconciliationResult(
+                line=line_number,
+                status=status,
+                reference=line.reference,
+                amount_cents=line.amount_cents,
+                currency=line.currency,
+                value_date=line.value_date,
+                payment_ids=payment_ids,
+            ))
+        claimed.update(claims)
+        return results
+
+    async def _payments_by_reference(
+        self, statement_lines: List[BankStatementLine], date_window: timedelta
+    ) -> Dict[str, List[Row]]:
+        """Payments with the references of ``statement_lines`` dated around them, in one query, by trimmed reference."""
+        if not statement_lines:
+            return {}
+        dates = [line.value_date for line in statement_lines]
+        # Trimmed like the statement lines' references, and like the index expression
+        reference = func.btrim(Payment.reference)
+        result = await self.db.execute(
+            select(
+                Payment.id, reference.label("reference"), Payment.amount_cents, Payment.currency, Payment.payment_date
+            )
+            .where(
+                reference.in_({line.reference for line in statement_lines}),
+                Payment.payment_date >= datetime.combine(min(dates) - date_window, time.min),
+                Payment.payment_date < datetime.combine(max(dates) + date_window + timedelta(days=1), time.min),
+            )
+        )
+        payments: Dict[str, List[Row]] = {}
+        for payment in result.all():
+            payments.setdefault(payment.reference, []).append(payment)
+        return payments
@@ -1,14 +1,26 @@
 from uuid import UUID
+from datetime import datetime
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from app.models import School, Student
 from app.schemas import SchoolCreate, SchoolUpdate
+from app.cache import RedisCache, invalidate_statements, school_version_key
+from app.services.student_service import StudentService
+from app.services.statement_cache_warmer import StatementCacheWarmer
 
 
 class SchoolService:
-    def __init__(self, db: AsyncSession):
+    def __init__(
+        self,
+        db: AsyncSession,
+        cache: RedisCache,
+        warmer: Optional[StatementCacheWarmer] = None,
+        publish_events_inline: bool = True,
+    ):
         self.db = db
+        self.cache = cache
+        self.students = StudentService(db, cache, warmer, publish_events_inline=publish_events_inline)
 
     async def create_school(self, school_data: SchoolCreate) -> School:
         school = School(**school_data.model_dump())
@@ -47,8 +59,20 @@ class SchoolService:
         if not school:
             return False
         
-        await self.db.delete(school)
+        # Soft delete, cascading to the school's students like the relationship does for hard deletes
+        revoked_at = datetime.utcnow()
+        event_ids = await self.students.revoke_students(
+            select(Student.id).where(Student.school_id == school_id), revoked_at, school_deleted=True
+        )
+        school.revoked_at = revoked_at
         await self.db.commit()
+        
+        # Invalidate cache for the students' and the school's statements
+        await self.students.outbox.after_commit(event_ids)
+        if not event_ids:
+            # Events are per student; a school without any is invalidated here
+            await invalidate_statements(self.cache, [], [school_id])
+            await self.cache.delete(school_version_key(school_id))
         return True
 
     async def get_student_count(self, school_id: UUID) -> int:
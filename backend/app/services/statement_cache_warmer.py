@@ -0,0 +1,176 @@
+import asyncio
+from uuid import UUID
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Set
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.models import School, Student, StudentBalance
+from app.cache import (
+    RedisCache, student_statement_key, school_statement_key, school_aging_key, invalidate_student_statements,
+    invalidate_statements
+)
+from app.db import AsyncSessionLocal
+from app.schemas.account_statement import MAX_STATEMENT_BATCH_SIZE
+from app.services.account_statement_service import AccountStatementService
+from app.services.student_balance_service import BalanceChange
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class StatementCacheWarmer:
+    """Precomputes account statements into the cache ahead of requests.
+
+    Every unit of work opens its own session, so the warmer can run outside a
+    request (CLI, lifespan task) and after the request that triggered a
+    re-warm has returned. At most ``concurrency`` units run at once.
+
+    With ``max_staleness`` (seconds) set, writes mark statements stale instead
+    of deleting them, and readers keep getting the stale value while the
+    warmer refreshes it, up to that bound.
+    """
+
+    def __init__(
+        self,
+        cache: RedisCache,
+        session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+        concurrency: int = 4,
+        rewarm_on_invalidate: bool = True,
+        max_staleness: Optional[int] = None,
+    ):
+        self.cache = cache
+        self.session_factory = session_factory
+        self.rewarm_on_invalidate = rewarm_on_invalidate
+        self.max_staleness = max_staleness
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # Re-warms in flight per cache key, and keys invalidated again meanwhile
+        self._rewarming: Dict[str, asyncio.Task] = {}
+        self._dirty: Set[str] = set()
+
+    async def warm_all(self, school_ids: Optional[List[UUID]] = None) -> int:
+        """Fill missing school and student statements, highest outstanding balance first.
+
+        Statements already cached are left alone. Returns the number of schools walked.
+        """
+        if school_ids is None:
+            school_ids = await self._schools_by_priority()
+        await asyncio.gather(*(self.warm_school(school_id) for school_id in school_ids))
+        return len(school_ids)
+
+    async def warm_school(self, school_id: UUID):
+        """Warm a school statement, then its students' statements in batches."""
+        await self._warm_school_statement(school_id)
+        async with self._semaphore, self.session_factory() as session:
+            student_ids = await self._students_by_priority(session, school_id)
+        for start in range(0, len(student_ids), MAX_STATEMENT_BATCH_SIZE):
+            batch = student_ids[start:start + MAX_STATEMENT_BATCH_SIZE]
+            async with self._semaphore, self.session_factory() as session:
+                await AccountStatementService(session, self.cache).get_student_statements_json(batch)
+
+    async def invalidate(self, student_id: UUID, school_id: UUID, changes: Sequence[BalanceChange] = ()):
+        """Invalidate a student's and their school's statements after a committed write.
+
+        The school statement is patched with ``changes`` when possible, and is
+        then neither invalidated nor re-warmed.
+        """
+        invalidated = await invalidate_student_statements(
+            self.cache, student_id, school_id, mark_stale=self.max_staleness is not None, changes=changes
+        )
+        if self.rewarm_on_invalidate:
+            self.schedule_student_refresh(student_id)
+            if school_statement_key(school_id) in invalidated:
+                self.schedule_school_refresh(school_id)
+
+    async def invalidate_many(self, student_ids: Iterable[UUID], school_ids: Iterable[UUID]):
+        """Invalidate the statements of many students and schools after a bulk write.
+
+        Only the school statements are re-warmed; student statements are
+        computed again on their next read.
+        """
+        school_ids = set(school_ids)
+        await invalidate_statements(
+            self.cache, student_ids, school_ids, mark_stale=self.max_staleness is not None
+        )
+        if self.rewarm_on_invalidate:
+            for school_id in school_ids:
+                self.schedule_school_refresh(school_id)
+
+    def schedule_student_refresh(self, student_id: UUID):
+        self._schedule(
+            student_statement_key(student_id),
+            lambda service: service.refresh_student_statement(student_id),
+        )
+
+    def schedule_school_refresh(self, school_id: UUID):
+        self._schedule(
+            school_statement_key(school_id),
+            lambda service: service.refresh_school_statement(school_id),
+        )
+
+    def schedule_aging_refresh(self, school_id: UUID):
+        self._schedule(
+            school_aging_key(school_id),
+            lambda service: service.refresh_school_aging(school_id),
+        )
+
+    def _schedule(self, key: str, refresh: Callable[[AccountStatementService], Awaitable]):
+        """Run one background refresh per key at a time.
+
+        A key invalidated again while its refresh is running is refreshed once
+        more when the current run finishes, so a value computed before the
+        latest change never stays cached.
+        """
+        if key in self._rewarming:
+            self._dirty.add(key)
+            return
+        self._rewarming[key] = asyncio.create_task(self._refresh(key, refresh))
+
+    async def _refresh(self, key: str, refresh: Callable[[AccountStatementService], Awaitable]):
+        try:
+            while True:
+                self._dirty.discard(key)
+                async with self._semaphore, self.session_factory() as session:
+                    try:
+                        await refresh(AccountStatementService(session, self.cache, warmer=self))
+                    except ValueError as e:
+                        # Deleted student or school: nothing to cache
+                        logger.info(f"Skipping refresh of {key}: {e}")
+                if key not in self._dirty:
+                    break
+        finally:
+            self._rewarming.pop(key, None)
+
+    async def wait_for_rewarms(self):
+        """Wait for the refreshes scheduled so far; used on shutdown and in tests."""
+        while self._rewarming:
+            await asyncio.gather(*self._rewarming.values(), return_exceptions=True)
+
+    async def _warm_school_statement(self, school_id: UUID):
+        async with self._semaphore, self.session_factory() as session:
+            try:
+                await AccountStatementService(session, self.cache).get_school_statement_json(school_id)
+            except ValueError as e:
+                # Deleted school: nothing to cache
+                logger.info(f"Skipping school statement {school_id}: {e}")
+
+    async def _schools_by_priority(self) -> List[UUID]:
+        outstanding = func.coalesce(func.sum(StudentBalance.outstanding_cents), 0)
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(School.id)
+                .outerjoin(StudentBalance, StudentBalance.school_id == School.id)
+                .group_by(School.id, School.name)
+                .order_by(outstanding.desc(), School.name, School.id)
+            )
+            return list(result.scalars().all())
+
+    @staticmethod
+    async def _students_by_priority(session: AsyncSession, school_id: UUID) -> List[UUID]:
+        outstanding = func.coalesce(func.sum(StudentBalance.outstanding_cents), 0)
+        result = await session.execute(
+            select(Student.id)
+            .outerjoin(StudentBalance, StudentBalance.student_id == Student.id)
+            .where(Student.school_id == school_id)
+            .group_by(Student.id, Student.name)
+            .order_by(outstanding.desc(), Student.name, Student.id)
+        )
+        return list(result.scalars().all())
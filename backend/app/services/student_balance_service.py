@@ -0,0 +1,269 @@
+from uuid import UUID
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, update, literal, text, or_, tuple_, column, values, BigInteger, Integer, String
+from sqlalchemy.dialects.postgresql import insert, UUID as PG_UUID
+from sqlalchemy.engine import Row
+from sqlalchemy.sql import Select
+from app.models import Student, Invoice, PaymentImputation, StudentBalance
+
+_COLUMNS = ["student_id", "school_id", "currency", "invoice_count", "invoiced_cents", "paid_cents", "outstanding_cents"]
+
+
+class BalanceChange(NamedTuple):
+    """A change applied to one projection row: the deltas and the row's state after it."""
+    student_id: UUID
+    school_id: UUID
+    currency: str
+    version: int
+    invoice_count: int
+    invoiced_cents: int
+    paid_cents: int
+
+
+class StudentBalanceService:
+    """Maintains the ``student_balances`` projection.
+
+    Write services call ``apply`` inside their own transaction, so the
+    projection commits (or rolls back) together with the ledger change.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def apply(
+        self,
+        student_id: UUID,
+        currency_code: str,
+        invoiced_cents: int = 0,
+        paid_cents: int = 0,
+        invoice_count: int = 0,
+    ) -> Optional[BalanceChange]:
+        """Add the given deltas to the student's balance row, creating it if needed.
+
+        Returns the change with the row's new version, or None if the student does not exist.
+        """
+        stmt = insert(StudentBalance).from_select(
+            _COLUMNS + ["version"],
+            select(
+                Student.id,
+                Student.school_id,
+                literal(currency_code, String),
+                literal(invoice_count, Integer),
+                literal(invoiced_cents, BigInteger),
+                literal(paid_cents, BigInteger),
+                literal(invoiced_cents - paid_cents, BigInteger),
+                literal(1, BigInteger),
+            ).where(Student.id == student_id),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StudentBalance.student_id, StudentBalance.currency],
+            set_={
+                "invoice_count": StudentBalance.invoice_count + stmt.excluded.invoice_count,
+                "invoiced_cents": StudentBalance.invoiced_cents + stmt.excluded.invoiced_cents,
+                "paid_cents": StudentBalance.paid_cents + stmt.excluded.paid_cents,
+                "outstanding_cents": StudentBalance.outstanding_cents + stmt.excluded.outstanding_cents,
+                "version": StudentBalance.version + 1,
+            },
+        ).returning(StudentBalance.school_id, StudentBalance.version, StudentBalance.invoice_count)
+        row = (await self.db.execute(stmt)).one_or_none()
+        if row is None:
+            return None
+        return BalanceChange(
+            student_id, row.school_id, currency_code, row.version, row.invoice_count, invoiced_cents, paid_cents
+        )
+
+    async def apply_paid(self, paid_cents: Dict[Tuple[UUID, str], int]) -> List[BalanceChange]:
+        """Add paid amounts to many (student, currency) rows in one statement, like ``apply`` with ``paid_cents``.
+
+        Students that do not exist are left out of the result.
+        """
+        if not paid_cents:
+            return []
+        deltas = values(
+            column("student_id", PG_UUID(as_uuid=True)),
+            column("currency", String),
+            column("paid_cents", BigInteger),
+            name="deltas",
+        ).data(sorted(
+            # In key order, which makes concurrent batches less likely to deadlock on rows
+            (student_id, currency_code, cents) for (student_id, currency_code), cents in paid_cents.items()
+        ))
+        stmt = insert(StudentBalance).from_select(
+            _COLUMNS + ["version"],
+            select(
+                Student.id,
+                Student.school_id,
+                deltas.c.currency,
+                literal(0, Integer),
+                literal(0, BigInteger),
+                deltas.c.paid_cents,
+                -deltas.c.paid_cents,
+                literal(1, BigInteger),
+            ).join(deltas, deltas.c.student_id == Student.id),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StudentBalance.student_id, StudentBalance.currency],
+            set_={
+                "paid_cents": StudentBalance.paid_cents + stmt.excluded.paid_cents,
+                "outstanding_cents": StudentBalance.outstanding_cents + stmt.excluded.outstanding_cents,
+                "version": StudentBalance.version + 1,
+            },
+        ).returning(
+            StudentBalance.student_id, StudentBalance.currency, StudentBalance.school_id,
+            StudentBalance.version, StudentBalance.invoice_count,
+        )
+        result = await self.db.execute(stmt)
+        return [
+            BalanceChange(
+                row.student_id, row.school_id, row.currency, row.version, row.invoice_count,
+                0, paid_cents[(row.student_id, row.currency)],
+            )
+            for row in result.all()
+        ]
+
+    async def move_student(self, student_id: UUID, school_id: UUID):
+        """Keep the denormalized school_id in sync when a student changes school."""
+        await self.db.execute(
+            update(StudentBalance)
+            .where(StudentBalance.student_id == student_id)
+            .values(school_id=school_id)
+        )
+
+    async def clear_students(self, student_ids: Select):
+        """Zero the balance rows of students about to be revoked, bumping their versions."""
+        await self.db.execute(
+            update(StudentBalance)
+            .where(
+                StudentBalance.student_id.in_(student_ids),
+                or_(
+                    StudentBalance.invoice_count != 0,
+                    StudentBalance.invoiced_cents != 0,
+                    StudentBalance.paid_cents != 0,
+                ),
+            )
+            .values(
+                invoice_count=0, invoiced_cents=0, paid_cents=0, outstanding_cents=0,
+                version=StudentBalance.version + 1,
+            )
+        )
+
+    async def rebuild(self, school_id: Optional[UUID] = None) -> int:
+        """Recompute the projection from the ledger tables, optionally for one school.
+
+        Revoked rows do not count. Rows are updated in place and rows with no invoices left are zeroed
+        rather than deleted, so row versions never go back. The caller owns
+        the transaction and must commit. Returns the number of rows written.
+        """
+        # Conflicts with the ROW EXCLUSIVE lock taken by apply(): in-flight writers
+        # finish first, new ones wait until the rebuilt rows are committed.
+        await self.db.execute(text("LOCK TABLE student_balances IN SHARE ROW EXCLUSIVE MODE"))
+        recomputed = self.recomputed_balances_query(school_id).subquery()
+        orphaned = (
+            update(StudentBalance)
+            .where(
+                tuple_(StudentBalance.student_id, StudentBalance.currency).not_in(
+                    select(recomputed.c.student_id, recomputed.c.currency)
+                ),
+                or_(
+                    StudentBalance.invoice_count != 0,
+                    StudentBalance.invoiced_cents != 0,
+                    StudentBalance.paid_cents != 0,
+                ),
+            )
+            .values(
+                invoice_count=0, invoiced_cents=0, paid_cents=0, outstanding_cents=0,
+                version=StudentBalance.version + 1,
+            )
+        )
+        if school_id:
+            orphaned = orphaned.where(StudentBalance.school_id == school_id)
+        await self.db.execute(orphaned)
+
+        stmt = insert(StudentBalance).from_select(
+            _COLUMNS + ["version"],
+            select(*(recomputed.c[column] for column in _COLUMNS), literal(1, BigInteger)),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StudentBalance.student_id, StudentBalance.currency],
+            set_={
+                **{column: stmt.excluded[column] for column in _COLUMNS[3:]},
+                "school_id": stmt.excluded.school_id,
+                "version": StudentBalance.version + 1,
+            },
+        )
+        result = await self.db.execute(stmt)
+        return result.rowcount
+
+    async def find_drift(self, school_id: Optional[UUID] = None) -> List[Row]:
+        """Return the (student, currency) rows where the projection disagrees with the ledger."""
+        expected = self.recomputed_balances_query(school_id).subquery()
+        stored = select(StudentBalance)
+        if school_id:
+            stored = stored.where(StudentBalance.school_id == school_id)
+        stored = stored.subquery()
+        # A missing row on either side counts as zero, so zeroed rows left
+        # behind by deletions are not reported as drift
+        differs = [
+            func.coalesce(expected.c[column], 0) != func.coalesce(stored.c[column], 0)
+            for column in ("invoice_count", "invoiced_cents", "paid_cents", "outstanding_cents")
+        ]
+        differs.append(expected.c.school_id != stored.c.school_id)
+        result = await self.db.execute(
+            select(
+                func.coalesce(expected.c.student_id, stored.c.student_id).label("student_id"),
+                func.coalesce(expected.c.currency, stored.c.currency).label("currency"),
+                expected.c.invoiced_cents.label("expected_invoiced_cents"),
+                stored.c.invoiced_cents.label("stored_invoiced_cents"),
+                expected.c.paid_cents.label("expected_paid_cents"),
+                stored.c.paid_cents.label("stored_paid_cents"),
+            )
+            .select_from(expected)
+            .join(
+                stored,
+                (stored.c.student_id == expected.c.student_id) & (stored.c.currency == expected.c.currency),
+                full=True,
+            )
+            .where(or_(*differs))
+        )
+        return list(result.all())
+
+    @staticmethod
+    def recomputed_balances_query(school_id: Optional[UUID] = None) -> Select:
+        """Aggregate the ledger into projection rows, one per student and currency.
+
+        Imputations are summed per invoice first so that an invoice with several
+        imputations is not counted more than once in the invoiced total.
+        """
+        invoice_balances = (
+            select(
+                Invoice.student_id,
+                Invoice.currency,
+                Invoice.amount_cents,
+                func.coalesce(func.sum(PaymentImputation.amount_cents), 0).label("paid_cents"),
+            )
+            .outerjoin(PaymentImputation, PaymentImputation.invoice_id == Invoice.id)
+            .group_by(Invoice.id)
+        )
+        if school_id:
+            invoice_balances = (
+                invoice_balances
+                .join(Student, Student.id == Invoice.student_id)
+                .where(Student.school_id == school_id)
+            )
+        invoice_balances = invoice_balances.subquery()
+        invoiced = func.sum(invoice_balances.c.amount_cents).cast(BigInteger)
+        paid = func.sum(invoice_balances.c.paid_cents).cast(BigInteger)
+        return (
+            select(
+                Student.id.label("student_id"),
+                Student.school_id,
+                invoice_balances.c.currency,
+                func.count().cast(Integer).label("invoice_count"),
+                invoiced.label("invoiced_cents"),
+                paid.label("paid_cents"),
+                (invoiced - paid).label("outstanding_cents"),
+            )
+            .join(invoice_balances, invoice_balances.c.student_id == Student.id)
+            .group_by(Student.id, Student.school_id, invoice_balances.c.currency)
+        )
@@ -1,14 +1,30 @@
 from uuid import UUID
+from datetime import datetime
 from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models import Student
+from sqlalchemy import select, update, or_
+from sqlalchemy.sql import Select
+from app.models import Student, Invoice, Payment, PaymentImputation
 from app.schemas import StudentCreate, StudentUpdate
+from app.cache import RedisCache
+from app.services.student_balance_service import StudentBalanceService
+from app.services.statement_cache_warmer import StatementCacheWarmer
+from app.services.outbox_service import OutboxService
 
 
 class StudentService:
-    def __init__(self, db: AsyncSession):
+    def __init__(
+        self,
+        db: AsyncSession,
+        cache: RedisCache,
+        warmer: Optional[StatementCacheWarmer] = None,
+        publish_events_inline: bool = True,
+    ):
         self.db = db
+        self.cache = cache
+        self.warmer = warmer
+        # Statement invalidation goes through the outbox, see OutboxService
+        self.outbox = OutboxService(db, cache, warmer, publish_inline=publish_events_inline)
 
     async def create_student(self, student_data: StudentCreate) -> Student:
         student = Student(**student_data.model_dump())
@@ -37,11 +53,24 @@ class StudentService:
         if not student:
             return None
         
+        previous_school_id = student.school_id
         update_data = student_data.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(student, field, value)
         
+        data = {}
+        if "school_id" in update_data and student.school_id != previous_school_id:
+            await StudentBalanceService(self.db).move_student(student.id, student.school_id)
+            # Both schools' statements list the student
+            data["previous_school_id"] = previous_school_id
+        await self.db.flush()
+        event_ids = await self.outbox.record_students(
+            "student.updated", select(Student.id).where(Student.id == student.id), **data
+        )
         await self.db.commit()
+        
+        # Invalidate cache for student and school statements, which show the student's name
+        await self.outbox.after_commit(event_ids)
         await self.db.refresh(student)
         return student
 
@@ -50,6 +79,34 @@ class StudentService:
         if not student:
             return False
         
-        await self.db.delete(student)
+        event_ids = await self.revoke_students(select(Student.id).where(Student.id == student_id), datetime.utcnow())
         await self.db.commit()
+        
+        # Invalidate cache for student and school statements
+        await self.outbox.after_commit(event_ids)
         return True
+
+    async def revoke_students(self, student_ids: Select, revoked_at: datetime, **event_data) -> List[int]:
+        """Soft delete students along with their invoices, payments and imputations.
+
+        Their balance rows are zeroed and a ``student.deleted`` event, with
+        ``event_data`` in its payload, is recorded for each. The caller must
+        commit, then publish the returned event IDs with ``outbox.after_commit``.
+        """
+        # Recorded first, revoked students are no longer selectable
+        event_ids = await self.outbox.record_students("student.deleted", student_ids, **event_data)
+        # Children first: revoked rows drop out of the subqueries that select them
+        await StudentBalanceService(self.db).clear_students(student_ids)
+        invoice_ids = select(Invoice.id).where(Invoice.student_id.in_(student_ids))
+        payment_ids = select(Payment.id).where(Payment.student_id.in_(student_ids))
+        await self.db.execute(
+            update(PaymentImputation)
+            .where(or_(PaymentImputation.invoice_id.in_(invoice_ids), PaymentImputation.payment_id.in_(payment_ids)))
+            .values(revoked_at=revoked_at)
+        )
+        for model in (Invoice, Payment):
+            await self.db.execute(
+                update(model).where(model.student_id.in_(student_ids)).values(revoked_at=revoked_at)
+            )
+        await self.db.execute(update(Student).where(Student.id.in_(student_ids)).values(revoked_at=revoked_at))
+        return event_ids
@@ -12,6 +12,27 @@ class Settings(BaseSettings):
     db_port: int = 5432
     db_name: str = "mattilda"
     debug: bool = True
+    # Fill missing statements in the background when the API starts
+    statement_cache_warm_on_startup: bool = False
+    # Recompute statements right after writes invalidate them
+    statement_cache_rewarm: bool = False
+    statement_cache_warm_concurrency: int = 4
+    # Mark statements stale on writes and keep serving them while they are
+    # refreshed in the background, for at most max_staleness seconds
+    statement_cache_stale_while_revalidate: bool = False
+    statement_cache_max_staleness: int = 300
+    # In-process cache tier in front of Redis, kept coherent through pub/sub
+    cache_l1_enabled: bool = False
+    cache_l1_max_entries: int = 1024
+    cache_l1_ttl: float = 5.0
+    # How long responses to requests with an Idempotency-Key are kept for replay (seconds)
+    idempotency_ttl: int = 86400
+    # Writes publish their outbox events right after committing; when off,
+    # the background relay publishes them within its poll interval (seconds)
+    outbox_publish_inline: bool = True
+    outbox_relay_enabled: bool = True
+    outbox_relay_poll_interval: float = 1.0
+    outbox_relay_batch_size: int = 500
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,112 @@
+import asyncio
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+from app.cache import RedisCache, lock_key
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Computations in flight in this process, by cache key
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+class SingleFlightTimeout(TimeoutError):
+    """Another worker held the lock past ``wait_timeout`` and computing twice is not allowed."""
+
+
+class SingleFlight:
+    """Runs at most one computation per cache key at a time.
+
+    Within a process, concurrent callers for the same key await the future of
+    the first one. Across processes, the first caller takes a short Redis lock
+    and the others poll the cache until the value shows up. If the lock holder
+    fails or takes longer than ``wait_timeout`` seconds, a waiter computes the
+    value itself rather than failing the request, unless ``compute_on_timeout``
+    is off, in which case SingleFlightTimeout is raised.
+    """
+
+    def __init__(
+        self,
+        cache: RedisCache,
+        lock_ttl_ms: int = 15000,
+        wait_timeout: float = 10.0,
+        poll_interval: float = 0.05,
+        compute_on_timeout: bool = True,
+    ):
+        self.cache = cache
+        self.lock_ttl_ms = lock_ttl_ms
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.compute_on_timeout = compute_on_timeout
+
+    async def run(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[T]],
+        load: Callable[[], Awaitable[Optional[T]]],
+    ) -> T:
+        """Return ``compute()``, sharing one computation among concurrent callers.
+
+        ``compute`` must store its result under ``key``; ``load`` reads it back
+        from the cache and returns None on a miss.
+        """
+        while True:
+            future = _inflight.get(key)
+            if future is None:
+                break
+            try:
+                # Shielded so a cancelled waiter does not cancel the shared computation
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The computing request was cancelled; take over
+
+        future = asyncio.get_running_loop().create_future()
+        _inflight[key] = future
+        try:
+            result = await self._run_across_workers(key, compute, load)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            _inflight.pop(key, None)
+
+    async def _run_across_workers(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[T]],
+        load: Callable[[], Awaitable[Optional[T]]],
+    ) -> T:
+        lock = lock_key(key)
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait_timeout
+        while not await self.cache.acquire_lock(lock, token, self.lock_ttl_ms):
+            if time.monotonic() >= deadline:
+                if not self.compute_on_timeout:
+                    raise SingleFlightTimeout(f"Timed out waiting for {lock}")
+                logger.warning(f"Timed out waiting for {lock}, computing {key} anyway")
+                return await compute()
+            await asyncio.sleep(self.poll_interval)
+            cached = await load()
+            if cached is not None:
+                return cached
+        try:
+            # The previous holder may have stored the value just before releasing the lock
+            cached = await load()
+            if cached is not None:
+                return cached
+            return await compute()
+        finally:
+            await self.cache.release_lock(lock, token)
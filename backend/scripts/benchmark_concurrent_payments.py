@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Benchmark concurrent payments hammering the same invoices, and check none is overpaid.
+
+Seeds a throwaway school with a few students and invoices in the configured
+database, then runs many clients posting payments to random invoices at once,
+each payment in its own session and transaction, like separate API requests.
+Prints payments/sec, how many payments were accepted or rejected, and how many
+invoices ended up paid beyond their amount. Statement caching is disabled.
+
+Run from ``backend/``:
+
+    DEBUG=false python -m scripts.benchmark_concurrent_payments --clients 20 --payments 100
+    DEBUG=false python -m scripts.benchmark_concurrent_payments --allocation fifo
+    DEBUG=false python -m scripts.benchmark_concurrent_payments --without-locks   # shows the race
+
+Exits with status 1 when an invoice is overpaid or the balance projection drifted.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import select, delete, insert, func
+
+from app.db import AsyncSessionLocal, engine
+from app.enums import PaymentMethod
+from app.models import School, Student, Invoice, Payment, PaymentImputation, StudentBalance, OutboxEvent
+from app.schemas import PaymentCreate
+from app.services import PaymentService, StudentBalanceService
+
+INVOICE_CENTS = 10000
+
+
+class NullCache:
+    """Cache that stores nothing, so payments only measure the database."""
+
+    async def patch_school_statement(self, *args, **kwargs):
+        return None
+
+    async def delete(self, key: str):
+        pass
+
+    async def mark_stale(self, key: str, ttl: int = 3600):
+        pass
+
+    async def bump_version(self, key: str, ttl: int = 3600):
+        return None
+
+    async def add_stream_entries(self, stream: str, entries: list[dict[str, str]], maxlen: int = 100000) -> bool:
+        return True
+
+
+class UnlockedPaymentService(PaymentService):
+    """``PaymentService`` without the invoice row locks, to show what they prevent."""
+
+    async def lock_invoices(self, invoice_ids=(), owners=()):
+        pass
+
+
+async def seed(students: int, invoices_per_student: int) -> tuple[uuid.UUID, dict[uuid.UUID, list[uuid.UUID]]]:
+    school_id = uuid.uuid4()
+    now = datetime.utcnow()
+    student_rows, invoice_rows = [], []
+    invoices: dict[uuid.UUID, list[uuid.UUID]] = {}
+
+    for s in range(students):
+        student_id = uuid.uuid4()
+        student_rows.append({"id": student_id, "name": f"Student {s:06d}", "school_id": school_id,
+                             "created_at": now, "updated_at": now})
+        invoices[student_id] = []
+        for _ in range(invoices_per_student):
+            invoice_id = uuid.uuid4()
+            invoices[student_id].append(invoice_id)
+            invoice_rows.append({"id": invoice_id, "student_id": student_id, "amount_cents": INVOICE_CENTS,
+                                 "currency": "USD", "issued_at": now, "created_at": now, "updated_at": now})
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(School), [{"id": school_id, "name": "Benchmark School",
+                                                 "created_at": now, "updated_at": now}])
+        await session.execute(insert(Student), student_rows)
+        await session.execute(insert(Invoice), invoice_rows)
+        await StudentBalanceService(session).rebuild(school_id)
+        await session.commit()
+    return school_id, invoices
+
+
+async def cleanup(school_id: uuid.UUID) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(StudentBalance).where(StudentBalance.school_id == school_id))
+        await session.execute(delete(OutboxEvent).where(OutboxEvent.school_id == school_id))
+        students = select(Student.id).where(Student.school_id == school_id)
+        await session.execute(delete(PaymentImputation).where(
+            PaymentImputation.payment_id.in_(select(Payment.id).where(Payment.student_id.in_(students)))
+        ))
+        await session.execute(delete(Payment).where(Payment.student_id.in_(students)))
+        await session.execute(delete(Invoice).where(Invoice.student_id.in_(students)))
+        await session.execute(delete(Student).where(Student.school_id == school_id))
+        await session.execute(delete(School).where(School.id == school_id))
+        await session.commit()
+
+
+async def client(
+    service_class: type[PaymentService],
+    invoices: dict[uuid.UUID, list[uuid.UUID]],
+    payments: int,
+    amount_cents: int,
+    allocation: str,
+    counts: dict[str, int],
+) -> None:
+    cache = NullCache()
+    for _ in range(payments):
+        student_id = random.choice(list(invoices))
+        imputations = []
+        if allocation == "manual":
+            imputations = [{"invoice_id": random.choice(invoices[student_id]), "amount_cents": amount_cents}]
+        payment_data = PaymentCreate(
+            student_id=student_id,
+            amount_cents=amount_cents,
+            payment_method=PaymentMethod.BANK_TRANSFER,
+            imputations=imputations,
+            allocation=allocation,
+        )
+        async with AsyncSessionLocal() as session:
+            try:
+                await service_class(session, cache).create_payment(payment_data)
+                counts["accepted"] += 1
+            except ValueError:
+                await session.rollback()
+                counts["rejected"] += 1
+
+
+async def overpaid_invoices(school_id: uuid.UUID) -> int:
+    async with AsyncSessionLocal() as session:
+        paid = (
+            select(PaymentImputation.invoice_id, func.sum(PaymentImputation.amount_cents).label("paid_cents"))
+            .group_by(PaymentImputation.invoice_id)
+            .subquery()
+        )
+        result = await session.execute(
+            select(func.count())
+            .select_from(Invoice)
+            .join(paid, paid.c.invoice_id == Invoice.id)
+            .join(Student, Student.id == Invoice.student_id)
+            .where(Student.school_id == school_id, paid.c.paid_cents > Invoice.amount_cents)
+        )
+        return result.scalar_one()
+
+
+async def main(
+    students: int, invoices_per_student: int, clients: int, payments: int, amount_cents: int,
+    allocation: str, without_locks: bool,
+) -> int:
+    print(f"Seeding {students} students x {invoices_per_student} invoices of {INVOICE_CENTS} cents...")
+    school_id, invoices = await seed(students, invoices_per_student)
+    try:
+        service_class = UnlockedPaymentService if without_locks else PaymentService
+        counts = {"accepted": 0, "rejected": 0}
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            client(service_class, invoices, payments, amount_cents, allocation, counts) for _ in range(clients)
+        ))
+        elapsed = time.perf_counter() - started
+
+        total = counts["accepted"] + counts["rejected"]
+        print(f"{clients} clients, {total} payments in {elapsed:.1f}s: {total / elapsed:.0f} payments/sec")
+        print(f"accepted={counts['accepted']} ({counts['accepted'] / elapsed:.0f}/sec)  rejected={counts['rejected']}")
+
+        overpaid = await overpaid_invoices(school_id)
+        async with AsyncSessionLocal() as session:
+            drift = await StudentBalanceService(session).find_drift(school_id)
+        print(f"overpaid invoices={overpaid}  drifted balances={len(drift)}")
+        return 1 if overpaid or drift else 0
+    finally:
+        await cleanup(school_id)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=5)
+    parser.add_argument("--invoices", type=int, default=4, help="invoices per student")
+    parser.add_argument("--clients", type=int, default=20, help="concurrent clients")
+    parser.add_argument("--payments", type=int, default=50, help="payments per client")
+    parser.add_argument("--amount", type=int, default=1000, help="cents per payment")
+    parser.add_argument("--allocation", choices=("manual", "fifo"), default="manual")
+    parser.add_argument("--without-locks", action="store_true", help="skip the invoice row locks")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(
+        args.students, args.invoices, args.clients, args.payments, args.amount, args.allocation, args.without_locks
+    )))
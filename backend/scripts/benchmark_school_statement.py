@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Benchmark the school statement: ORM object graph vs SQL aggregation vs projection.
+
+Seeds a throwaway school in the configured database, computes its totals
+with each strategy (cache disabled) and prints the timings.
+
+Run from ``backend/``:
+
+    DEBUG=false python -m scripts.benchmark_school_statement --students 2000 --invoices 12
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import select, delete, insert
+from sqlalchemy.orm import selectinload
+
+from app.db import AsyncSessionLocal, engine
+from app.enums import PaymentMethod
+from app.models import School, Student, Invoice, Payment, PaymentImputation, StudentBalance
+from app.services import AccountStatementService, StudentBalanceService
+
+
+class NullCache:
+    """Cache that never hits, so every call measures the computation."""
+
+    async def get_raw(self, key: str):
+        return None
+
+    async def set_raw(self, key: str, value: str, ttl: int = 3600):
+        pass
+
+    async def set_school_statement(self, school_id, statement: str, versions: dict, ttl: int = 3600):
+        pass
+
+    async def acquire_lock(self, name: str, token: str, ttl_ms: int) -> bool:
+        return True
+
+    async def release_lock(self, name: str, token: str):
+        pass
+
+
+async def seed(students: int, invoices_per_student: int) -> uuid.UUID:
+    school_id = uuid.uuid4()
+    now = datetime.utcnow()
+    student_rows, invoice_rows, payment_rows, imputation_rows = [], [], [], []
+
+    for s in range(students):
+        student_id = uuid.uuid4()
+        student_rows.append({"id": student_id, "name": f"Student {s:06d}", "school_id": school_id,
+                             "created_at": now, "updated_at": now})
+        for i in range(invoices_per_student):
+            invoice_id = uuid.uuid4()
+            invoice_rows.append({"id": invoice_id, "student_id": student_id, "amount_cents": 10000,
+                                 "currency": "USD", "issued_at": now, "created_at": now, "updated_at": now})
+            # Every other invoice is half paid
+            if i % 2 == 0:
+                payment_id = uuid.uuid4()
+                payment_rows.append({"id": payment_id, "student_id": student_id, "amount_cents": 5000,
+                                     "currency": "USD", "payment_date": now,
+                                     "payment_method": PaymentMethod.CASH, "created_at": now, "updated_at": now})
+                imputation_rows.append({"id": uuid.uuid4(), "payment_id": payment_id, "invoice_id": invoice_id,
+                                        "amount_cents": 5000, "currency": "USD",
+                                        "created_at": now, "updated_at": now})
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(School), [{"id": school_id, "name": "Benchmark School",
+                                                 "created_at": now, "updated_at": now}])
+        for model, rows in ((Student, student_rows), (Invoice, invoice_rows),
+                            (Payment, payment_rows), (PaymentImputation, imputation_rows)):
+            if rows:
+                await session.execute(insert(model), rows)
+        await StudentBalanceService(session).rebuild(school_id)
+        await session.commit()
+    return school_id
+
+
+async def cleanup(school_id: uuid.UUID) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(StudentBalance).where(StudentBalance.school_id == school_id))
+        students = select(Student.id).where(Student.school_id == school_id)
+        invoices = select(Invoice.id).where(Invoice.student_id.in_(students))
+        await session.execute(delete(PaymentImputation).where(PaymentImputation.invoice_id.in_(invoices)))
+        await session.execute(delete(Payment).where(Payment.student_id.in_(students)))
+        await session.execute(delete(Invoice).where(Invoice.student_id.in_(students)))
+        await session.execute(delete(Student).where(Student.school_id == school_id))
+        await session.execute(delete(School).where(School.id == school_id))
+        await session.commit()
+
+
+async def orm_statement_totals(school_id: uuid.UUID) -> tuple[int, int]:
+    """The previous implementation: load the whole object graph and sum in Python."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(School)
+            .options(
+                selectinload(School.students).selectinload(Student.invoices).selectinload(Invoice.payment_imputations)
+            )
+            .where(School.id == school_id)
+        )
+        school = result.scalar_one()
+        invoiced = paid = 0
+        for student in school.students:
+            for invoice in student.invoices:
+                invoiced += invoice.amount_cents
+                paid += sum(imp.amount_cents for imp in invoice.payment_imputations)
+        return invoiced, paid
+
+
+async def sql_statement_totals(school_id: uuid.UUID) -> tuple[int, int]:
+    """Grouped SUMs over the ledger tables, as used to rebuild the projection."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(StudentBalanceService.recomputed_balances_query(school_id))
+        rows = result.all()
+        return sum(row.invoiced_cents for row in rows), sum(row.paid_cents for row in rows)
+
+
+async def projection_statement_totals(school_id: uuid.UUID) -> tuple[int, int]:
+    async with AsyncSessionLocal() as session:
+        statement = await AccountStatementService(session, NullCache()).get_school_statement(school_id)
+        return (
+            sum(amount.amount_cents for amount in statement.total_invoiced),
+            sum(amount.amount_cents for amount in statement.total_paid),
+        )
+
+
+async def timed(label: str, fn, school_id: uuid.UUID, repeat: int) -> tuple[int, int]:
+    timings = []
+    totals = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        totals = await fn(school_id)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    print(f"{label:<16} best={timings[0] * 1000:9.1f}ms  median={timings[len(timings) // 2] * 1000:9.1f}ms")
+    return totals
+
+
+async def main(students: int, invoices_per_student: int, repeat: int) -> None:
+    print(f"Seeding {students} students x {invoices_per_student} invoices...")
+    school_id = await seed(students, invoices_per_student)
+    try:
+        orm_totals = await timed("orm+python", orm_statement_totals, school_id, repeat)
+        sql_totals = await timed("sql aggregate", sql_statement_totals, school_id, repeat)
+        projection_totals = await timed("projection", projection_statement_totals, school_id, repeat)
+        if not orm_totals == sql_totals == projection_totals:
+            raise SystemExit(f"Totals differ: orm={orm_totals} sql={sql_totals} projection={projection_totals}")
+        print(f"Totals match: invoiced={sql_totals[0]} paid={sql_totals[1]}")
+    finally:
+        await cleanup(school_id)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--invoices", type=int, default=12, help="invoices per student")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.students, args.invoices, args.repeat))
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Close a billing period by storing every student's closing balance.
+
+Point-in-time statements (``as_of``) start from the latest closed period and
+only sum the activity after it. Run monthly, from ``backend/``:
+
+    python -m scripts.close_balance_period                        # up to the start of this month (UTC)
+    python -m scripts.close_balance_period --period-end 2026-09-30T23:59:59
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+
+from app.db import AsyncSessionLocal, engine
+from app.services import BalanceSnapshotService
+
+
+def start_of_current_month() -> datetime:
+    return datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+async def main(period_end: datetime) -> int:
+    try:
+        async with AsyncSessionLocal() as session:
+            try:
+                written = await BalanceSnapshotService(session).close_period(period_end)
+            except ValueError as e:
+                print(e, file=sys.stderr)
+                return 1
+            await session.commit()
+            print(f"Closed period ending {period_end.isoformat()}: {written} snapshot row(s)")
+            return 0
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--period-end", type=datetime.fromisoformat, default=None,
+        help="inclusive end of the period, UTC (default: start of the current month)"
+    )
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.period_end or start_of_current_month())))
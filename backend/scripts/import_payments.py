@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Import the payments of a bank or processor settlement file.
+
+Reads CSV (with a header line) or NDJSON, one payment per line, with the same
+fields as ``POST /payments/`` plus an optional ``payment_date``. In CSV files
+the imputations go in an ``imputations`` column as JSON, or an ``invoice_id``
+column imputes the whole amount to one invoice.
+
+Run from ``backend/``:
+
+    python -m scripts.import_payments settlement-2026-09.csv
+    python -m scripts.import_payments settlement.jsonl --format ndjson --batch-size 5000
+
+Valid rows are imported even if others fail. Exits with status 1 when any row failed.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import AsyncIterator
+
+from app.cache import RedisCache
+from app.db import AsyncSessionLocal, engine
+from app.services import PaymentImportService
+from app.services.payment_import_service import DEFAULT_IMPORT_BATCH_SIZE, IMPORT_FORMATS
+
+FORMATS_BY_SUFFIX = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+
+async def read_lines(path: Path) -> AsyncIterator[str]:
+    with path.open(encoding="utf-8", newline="") as file:
+        for line in file:
+            yield line.rstrip("\n")
+
+
+async def main(path: Path, file_format: str, batch_size: int) -> int:
+    cache = RedisCache()
+    try:
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            result = await PaymentImportService(session, cache).import_payments(
+                read_lines(path), file_format, batch_size=batch_size
+            )
+        for error in result.errors:
+            print(f"line {error.line}: {error.detail}", file=sys.stderr)
+        print(
+            f"Imported {result.imported} payment(s), {result.failed} failed, "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        return 1 if result.failed else 0
+    finally:
+        await cache.close()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", type=Path, help="settlement file")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, default=None,
+                        help="file format (default: from the file extension)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_IMPORT_BATCH_SIZE,
+                        help="rows validated and written per transaction")
+    args = parser.parse_args()
+    file_format = args.format or FORMATS_BY_SUFFIX.get(args.path.suffix.lower())
+    if file_format is None:
+        parser.error(f"cannot tell the format of {args.path}, pass --format")
+    sys.exit(asyncio.run(main(args.path, file_format, args.batch_size)))
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Rebuild the student_balances projection from invoices and payment imputations.
+
+Run from ``backend/``:
+
+    python -m scripts.rebuild_student_balances            # rebuild everything
+    python -m scripts.rebuild_student_balances --check    # only report drift
+    python -m scripts.rebuild_student_balances --school-id <uuid>
+
+Exits with status 1 when ``--check`` finds drift.
+"""
+import argparse
+import asyncio
+import sys
+from uuid import UUID
+
+from app.db import AsyncSessionLocal, engine
+from app.services import StudentBalanceService
+
+
+def report(drift) -> None:
+    for row in drift:
+        print(
+            f"student={row.student_id} currency={row.currency} "
+            f"invoiced expected={row.expected_invoiced_cents} stored={row.stored_invoiced_cents} "
+            f"paid expected={row.expected_paid_cents} stored={row.stored_paid_cents}"
+        )
+    print(f"{len(drift)} drifted row(s)")
+
+
+async def main(check_only: bool, school_id: UUID | None) -> int:
+    try:
+        async with AsyncSessionLocal() as session:
+            service = StudentBalanceService(session)
+            drift = await service.find_drift(school_id)
+            report(drift)
+            if check_only:
+                return 1 if drift else 0
+
+            written = await service.rebuild(school_id)
+            await session.commit()
+            print(f"Rebuilt {written} balance row(s)")
+
+            remaining = await service.find_drift(school_id)
+            if remaining:
+                report(remaining)
+                return 1
+            return 0
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="report drift without rewriting the projection")
+    parser.add_argument("--school-id", type=UUID, default=None, help="limit to one school")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.check, args.school_id)))
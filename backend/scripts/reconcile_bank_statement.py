@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Reconcile a bank statement export against the recorded payments.
+
+Each statement line is matched to a payment with the same reference, amount
+and currency, dated within a few days of the line. Lines go to
+``matched.ndjson``, ``unmatched.ndjson`` or ``ambiguous.ndjson`` in the output
+directory as they are reconciled, one JSON object per line.
+
+CSV files need a header with ``reference``, ``amount_cents`` or a decimal
+``amount``, ``currency`` and ``date`` columns; NDJSON lines have the same fields.
+
+Run from ``backend/``:
+
+    python -m scripts.reconcile_bank_statement statement-2026-09.csv --output-dir reconciliation/
+    python -m scripts.reconcile_bank_statement statement.jsonl --format ndjson --date-window-days 5
+
+Exits with status 1 when any line is left unmatched or ambiguous.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from app.db import AsyncSessionLocal, engine
+from app.services import ReconciliationService
+from app.services.reconciliation_service import DEFAULT_RECONCILIATION_BATCH_SIZE, RECONCILIATION_FORMATS
+from scripts.import_payments import FORMATS_BY_SUFFIX, read_lines
+
+STATUSES = ("matched", "unmatched", "ambiguous")
+
+
+async def main(path: Path, file_format: str, output_dir: Path, date_window_days: int, batch_size: int) -> int:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    outputs = {status: (output_dir / f"{status}.ndjson").open("w", encoding="utf-8") for status in STATUSES}
+    counts = dict.fromkeys(STATUSES, 0)
+    try:
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            results = ReconciliationService(session).reconcile(
+                read_lines(path), file_format, timedelta(days=date_window_days), batch_size=batch_size
+            )
+            async for result in results:
+                outputs[result.status].write(result.model_dump_json(exclude_none=True) + "\n")
+                counts[result.status] += 1
+        print(
+            f"Reconciled {sum(counts.values())} line(s) in {time.perf_counter() - started:.1f}s: "
+            + ", ".join(f"{counts[status]} {status}" for status in STATUSES)
+        )
+        print(f"Results written to {output_dir}/")
+        return 1 if counts["unmatched"] or counts["ambiguous"] else 0
+    finally:
+        for output in outputs.values():
+            output.close()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", type=Path, help="bank statement export")
+    parser.add_argument("--format", choices=RECONCILIATION_FORMATS, default=None,
+                        help="file format (default: from the file extension)")
+    parser.add_argument("--output-dir", type=Path, default=Path("reconciliation"),
+                        help="where matched/unmatched/ambiguous.ndjson are written")
+    parser.add_argument("--date-window-days", type=int, default=3,
+                        help="how many days a payment date may be off the statement date")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_RECONCILIATION_BATCH_SIZE,
+                        help="statement lines looked up per query")
+    args = parser.parse_args()
+    file_format = args.format or FORMATS_BY_SUFFIX.get(args.path.suffix.lower())
+    if file_format is None:
+        parser.error(f"cannot tell the format of {args.path}, pass --format")
+    sys.exit(asyncio.run(main(args.path, file_format, args.output_dir, args.date_window_days, args.batch_size)))
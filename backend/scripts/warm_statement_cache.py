@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Fill the statement cache after a deploy or a Redis flush.
+
+Walks schools by total outstanding balance, highest first, and caches every
+school statement and student statement that is missing. Statements already
+cached are left alone.
+
+Run from ``backend/``:
+
+    python -m scripts.warm_statement_cache
+    python -m scripts.warm_statement_cache --concurrency 8
+    python -m scripts.warm_statement_cache --school-id <uuid> --school-id <uuid>
+"""
+import argparse
+import asyncio
+import time
+from uuid import UUID
+
+from app.cache import RedisCache
+from app.db import engine
+from app.services import StatementCacheWarmer
+
+
+async def main(school_ids: list[UUID] | None, concurrency: int) -> None:
+    cache = RedisCache()
+    try:
+        started = time.perf_counter()
+        warmed = await StatementCacheWarmer(cache, concurrency=concurrency).warm_all(school_ids)
+        print(f"Warmed statements for {warmed} school(s) in {time.perf_counter() - started:.1f}s")
+    finally:
+        await cache.close()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--school-id", type=UUID, action="append", default=None,
+                        help="only warm this school (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=4, help="statements computed at once")
+    args = parser.parse_args()
+    asyncio.run(main(args.school_id, args.concurrency))
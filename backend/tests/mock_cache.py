@@ -1,19 +1,38 @@
+import json
+import time
+import uuid
 from typing import Optional, Dict, List
 from uuid import UUID
+from app.cache import (
+    UUIDEncoder, stale_key, tier_stats, school_statement_key, school_statement_versions_key, balance_version_field
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class MockCache:
-    """Mock cache for testing that tracks all operations."""
+    """Mock cache for testing that tracks all operations.
+    
+    Values are stored serialized, like in Redis.
+    """
     
     def __init__(self):
-        self._store: Dict[str, dict] = {}
+        self._store: Dict[str, str] = {}
+        self._hashes: Dict[str, Dict[str, int]] = {}
+        self._versions: Dict[str, int] = {}
         self.get_calls: List[str] = []
-        self.set_calls: List[tuple[str, dict, int]] = []
+        self.set_calls: List[tuple[str, str, int]] = []
         self.delete_calls: List[str] = []
         self.delete_pattern_calls: List[str] = []
+        self.get_many_calls: List[List[str]] = []
+        self.set_many_calls: List[tuple[Dict[str, str], int]] = []
+        self._locks: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self.acquire_lock_calls: List[str] = []
+        self.patch_calls: List[tuple[UUID, UUID, str, int, int, int]] = []
+        self.streams: Dict[str, List[Dict[str, str]]] = {}
     
     async def get_client(self):
         """Mock get_client - not needed for mock."""
@@ -23,29 +42,142 @@ class MockCache:
         """Mock close - not needed for mock."""
         pass
     
+    def stats(self) -> Dict[str, dict]:
+        """Hit and miss counts of ``get`` calls."""
+        return {"mock": tier_stats(self.hits, self.misses)}
+    
     async def get(self, key: str) -> Optional[dict]:
         """Get cached value by key and track the call."""
+        value = await self.get_raw(key)
+        return json.loads(value) if value else None
+    
+    async def set(self, key: str, value: dict, ttl: int = 3600):
+        """Set cached value and track the call."""
+        await self.set_raw(key, json.dumps(value, cls=UUIDEncoder), ttl)
+    
+    async def get_raw(self, key: str) -> Optional[str]:
+        """Get the serialized value by key and track the call."""
         self.get_calls.append(key)
         value = self._store.get(key)
         if value:
+            self.hits += 1
             logger.debug(f"MockCache HIT: {key}")
         else:
+            self.misses += 1
             logger.debug(f"MockCache MISS: {key}")
         return value
     
-    async def set(self, key: str, value: dict, ttl: int = 3600):
-        """Set cached value and track the call."""
+    async def set_raw(self, key: str, value: str, ttl: int = 3600):
+        """Store a serialized value and track the call."""
         self.set_calls.append((key, value, ttl))
         self._store[key] = value
         logger.debug(f"MockCache SET: {key} (TTL: {ttl}s)")
     
+    async def get_many_raw(self, keys: List[str]) -> List[Optional[str]]:
+        """Get several serialized values and track the call."""
+        self.get_many_calls.append(list(keys))
+        return [self._store.get(key) for key in keys]
+    
+    async def set_many_raw(self, values: Dict[str, str], ttl: int = 3600):
+        """Store several serialized values and track the call."""
+        self.set_many_calls.append((dict(values), ttl))
+        self._store.update(values)
+    
+    async def set_school_statement(self, school_id: UUID, statement: str, versions: Dict[str, int], ttl: int = 3600):
+        """Store a school statement with its balance row versions and track it as a set call."""
+        await self.set_raw(school_statement_key(school_id), statement, ttl)
+        self._hashes[school_statement_versions_key(school_id)] = dict(versions)
+    
+    async def patch_school_statement(
+        self, school_id: UUID, student_id: UUID, currency: str, version: int, invoiced_cents: int, paid_cents: int
+    ) -> bool:
+        """Apply a balance change like the Redis script does, and track the call."""
+        self.patch_calls.append((school_id, student_id, currency, version, invoiced_cents, paid_cents))
+        key = school_statement_key(school_id)
+        if key not in self._store:
+            return False
+        versions = self._hashes.get(school_statement_versions_key(school_id), {})
+        field = balance_version_field(student_id, currency)
+        if versions.get(field) == version:
+            return True
+        if versions.get(field) != version - 1:
+            return False
+        statement = json.loads(self._store[key])
+        for student in statement["students"]:
+            if student["student_id"] == str(student_id) and student["total_outstanding"]["currency"] == currency:
+                student["total_outstanding"]["amount_cents"] += invoiced_cents - paid_cents
+                for name, cents in (
+                    ("total_invoiced", invoiced_cents),
+                    ("total_paid", paid_cents),
+                    ("total_outstanding", invoiced_cents - paid_cents),
+                ):
+                    amounts = [amount for amount in statement[name] if amount["currency"] == currency]
+                    if not amounts:
+                        return False
+                    amounts[0]["amount_cents"] += cents
+                self._store[key] = json.dumps(statement)
+                versions[field] = version
+                return True
+        return False
+    
+    async def get_version(self, key: str) -> Optional[int]:
+        """Current value of a version counter, None if it was never started."""
+        return self._versions.get(key)
+    
+    async def get_versions(self, keys: List[str]) -> List[Optional[int]]:
+        """Current values of several version counters."""
+        return [self._versions.get(key) for key in keys]
+    
+    async def start_versions(self, keys: List[str], ttl: int = 3600):
+        """Start missing version counters from the time in ms (counters never expire here)."""
+        for key in keys:
+            self._versions.setdefault(key, int(time.time() * 1000))
+    
+    async def bump_version(self, key: str, ttl: int = 3600) -> Optional[int]:
+        """Increment a version counter, starting it if needed."""
+        await self.start_versions([key], ttl)
+        self._versions[key] += 1
+        return self._versions[key]
+    
     async def delete(self, key: str):
         """Delete cached value and track the call."""
         self.delete_calls.append(key)
         if key in self._store:
             del self._store[key]
+        self._hashes.pop(key, None)
+        self._versions.pop(key, None)
         logger.debug(f"MockCache DELETE: {key}")
     
+    async def acquire_lock(self, name: str, token: str, ttl_ms: int) -> bool:
+        """Take a lock if it is free and track the call (locks never expire here)."""
+        self.acquire_lock_calls.append(name)
+        if name in self._locks:
+            return False
+        self._locks[name] = token
+        return True
+    
+    async def release_lock(self, name: str, token: str):
+        """Release a lock if it is held with the given token."""
+        if self._locks.get(name) == token:
+            del self._locks[name]
+    
+    async def mark_stale(self, key: str, ttl: int = 3600):
+        """Flag a cached value as stale, keeping the time of the first invalidation."""
+        marker = self._store.get(stale_key(key))
+        since = json.loads(marker)["since"] if marker else time.time()
+        self._store[stale_key(key)] = json.dumps({"since": since, "token": uuid.uuid4().hex})
+    
+    async def clear_stale(self, key: str, token: str):
+        """Drop the stale marker if it still carries the given token."""
+        marker = self._store.get(stale_key(key))
+        if marker and json.loads(marker)["token"] == token:
+            del self._store[stale_key(key)]
+    
+    async def add_stream_entries(self, stream: str, entries: List[Dict[str, str]], maxlen: int = 100000) -> bool:
+        """Append entries to an in-memory stream."""
+        self.streams.setdefault(stream, []).extend(entries)
+        return True
+    
     async def delete_pattern(self, pattern: str):
         """Delete all keys matching pattern and track the call."""
         self.delete_pattern_calls.append(pattern)
@@ -53,15 +185,27 @@ class MockCache:
         keys_to_delete = [k for k in self._store.keys() if pattern.replace('*', '') in k]
         for key in keys_to_delete:
             del self._store[key]
+        for key in [k for k in self._hashes if pattern.replace('*', '') in k]:
+            del self._hashes[key]
         logger.debug(f"MockCache DELETE pattern: {pattern} ({len(keys_to_delete)} keys)")
     
     def reset(self):
         """Reset all tracking and storage."""
         self._store.clear()
+        self._hashes.clear()
+        self._versions.clear()
         self.get_calls.clear()
         self.set_calls.clear()
         self.delete_calls.clear()
         self.delete_pattern_calls.clear()
+        self.get_many_calls.clear()
+        self.set_many_calls.clear()
+        self._locks.clear()
+        self.acquire_lock_calls.clear()
+        self.patch_calls.clear()
+        self.streams.clear()
+        self.hits = 0
+        self.misses = 0
     
     def was_get_called_with(self, key: str) -> bool:
         """Check if get was called with specific key."""
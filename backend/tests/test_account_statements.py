@@ -1,6 +1,11 @@
+import json
 import pytest
 from http import HTTPStatus
 from httpx import AsyncClient
+from uuid import uuid4
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services import BalanceSnapshotService
 
 
 pytestmark = pytest.mark.asyncio
@@ -42,11 +47,62 @@ class TestAccountStatements:
 
         data = response.json()
         assert data["student_id"] == student_id
-        assert data["total_invoiced"]["amount_cents"] == 15000
-        assert data["total_paid"]["amount_cents"] == 0
-        assert data["total_outstanding"]["amount_cents"] == 15000
+        assert data["total_invoiced"][0]["amount_cents"] == 15000
+        assert data["total_paid"][0]["amount_cents"] == 0
+        assert data["total_outstanding"][0]["amount_cents"] == 15000
         assert len(data["invoices"]) == 2
 
+    async def test_mixed_currency_statements(self, authenticated_client: AsyncClient):
+        school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
+        school_id = school_response.json()["id"]
+        student_response = await authenticated_client.post(
+            "/students/", json={"name": "John Doe", "school_id": school_id}
+        )
+        student_id = student_response.json()["id"]
+        for amount, currency in ((10000, "USD"), (4000, "EUR"), (2000, "USD")):
+            await authenticated_client.post(
+                "/invoices/", json={"student_id": student_id, "amount_cents": amount, "currency": currency}
+            )
+
+        response = await authenticated_client.get(f"/account-statements/students/{student_id}")
+        assert response.status_code == HTTPStatus.OK
+        totals = [(amount["currency"], amount["amount_cents"]) for amount in response.json()["total_invoiced"]]
+        assert totals == [("EUR", 4000), ("USD", 12000)]
+
+        response = await authenticated_client.get(f"/account-statements/schools/{school_id}")
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        totals = [(amount["currency"], amount["amount_cents"]) for amount in data["total_outstanding"]]
+        assert totals == [("EUR", 4000), ("USD", 12000)]
+        assert [s["total_outstanding"]["currency"] for s in data["students"]] == ["EUR", "USD"]
+
+        # Paginated, every page carries the per-currency totals and each currency row shows up once
+        for order_by in ("name", "outstanding"):
+            currencies = []
+            cursor = None
+            while True:
+                params = {"limit": 1, "order_by": order_by}
+                if cursor:
+                    params["cursor"] = cursor
+                response = await authenticated_client.get(f"/account-statements/schools/{school_id}", params=params)
+                assert response.status_code == HTTPStatus.OK
+                data = response.json()
+                totals = [(amount["currency"], amount["amount_cents"]) for amount in data["total_outstanding"]]
+                assert totals == [("EUR", 4000), ("USD", 12000)]
+                currencies.extend(s["total_outstanding"]["currency"] for s in data["students"])
+                if not data["has_more"]:
+                    break
+                cursor = data["next_cursor"]
+            assert sorted(currencies) == ["EUR", "USD"]
+            assert len(currencies) == 2
+
+        response = await authenticated_client.get(f"/account-statements/schools/{school_id}/aging")
+        assert response.status_code == HTTPStatus.OK
+        totals = response.json()["totals"]
+        assert [(t["total_outstanding"]["currency"], t["total_outstanding"]["amount_cents"]) for t in totals] == [
+            ("EUR", 4000), ("USD", 12000)
+        ]
+
     async def test_school_account_statement(self, authenticated_client: AsyncClient):
         school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
         school_id = school_response.json()["id"]
@@ -86,9 +142,9 @@ class TestAccountStatements:
 
         data = response.json()
         assert data["school_id"] == school_id
-        assert data["total_invoiced"]["amount_cents"] == 18000
-        assert data["total_paid"]["amount_cents"] == 0
-        assert data["total_outstanding"]["amount_cents"] == 18000
+        assert data["total_invoiced"][0]["amount_cents"] == 18000
+        assert data["total_paid"][0]["amount_cents"] == 0
+        assert data["total_outstanding"][0]["amount_cents"] == 18000
         assert data["number_of_students"] == 2
         assert len(data["students"]) == 2
 
@@ -129,9 +185,9 @@ class TestAccountStatements:
         assert response.status_code == HTTPStatus.OK
 
         data = response.json()
-        assert data["total_invoiced"]["amount_cents"] == 10000
-        assert data["total_paid"]["amount_cents"] == 6000
-        assert data["total_outstanding"]["amount_cents"] == 4000
+        assert data["total_invoiced"][0]["amount_cents"] == 10000
+        assert data["total_paid"][0]["amount_cents"] == 6000
+        assert data["total_outstanding"][0]["amount_cents"] == 4000
 
     async def test_freshly_created_school_statement(self, authenticated_client: AsyncClient):
         """Test that getting a statement for a school with no students doesn't cause a 500 error."""
@@ -143,8 +199,462 @@ class TestAccountStatements:
 
         data = response.json()
         assert data["school_id"] == school_id
-        assert data["total_invoiced"]["amount_cents"] == 0
-        assert data["total_paid"]["amount_cents"] == 0
-        assert data["total_outstanding"]["amount_cents"] == 0
+        assert data["total_invoiced"] == []
+        assert data["total_paid"] == []
+        assert data["total_outstanding"] == []
         assert data["number_of_students"] == 0
         assert len(data["students"]) == 0
+
+    async def test_school_statement_student_breakdown(self, authenticated_client: AsyncClient):
+        school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
+        school_id = school_response.json()["id"]
+
+        student_ids = []
+        for name in ("Alice", "Bob", "Carol"):
+            student_response = await authenticated_client.post(
+                "/students/",
+                json={"name": name, "school_id": school_id}
+            )
+            student_ids.append(student_response.json()["id"])
+        alice_id, bob_id, _ = student_ids
+
+        invoice_ids = []
+        for amount in (10000, 5000):
+            invoice_response = await authenticated_client.post(
+                "/invoices/",
+                json={"student_id": alice_id, "amount_cents": amount, "currency": "USD"}
+            )
+            invoice_ids.append(invoice_response.json()["id"])
+
+        await authenticated_client.post(
+            "/invoices/",
+            json={"student_id": bob_id, "amount_cents": 7000, "currency": "USD"}
+        )
+
+        await authenticated_client.post(
+            "/payments/",
+            json={
+                "student_id": alice_id,
+                "amount_cents": 12000,
+                "currency": "USD",
+                "payment_method": "cash",
+                "imputations": [
+                    {"invoice_id": invoice_ids[0], "amount_cents": 10000},
+                    {"invoice_id": invoice_ids[1], "amount_cents": 2000}
+                ]
+            }
+        )
+
+        response = await authenticated_client.get(f"/account-statements/schools/{school_id}")
+        assert response.status_code == HTTPStatus.OK
+
+        data = response.json()
+        assert data["total_invoiced"][0]["amount_cents"] == 22000
+        assert data["total_paid"][0]["amount_cents"] == 12000
+        assert data["total_outstanding"][0]["amount_cents"] == 10000
+        # Students without invoices are counted but not listed
+        assert data["number_of_students"] == 3
+        outstanding = {s["student_id"]: s["total_outstanding"]["amount_cents"] for s in data["students"]}
+        assert outstanding == {alice_id: 3000, bob_id: 7000}
+
+    async def test_school_statement_stream(self, authenticated_client: AsyncClient):
+        school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
+        school_id = school_response.json()["id"]
+
+        for name, amount in (("John Doe", 10000), ("Jane Smith", 8000)):
+            student_response = await authenticated_client.post(
+                "/students/",
+                json={"name": name, "school_id": school_id}
+            )
+            await authenticated_client.post(
+                "/invoices/",
+                json={"student_id": student_response.json()["id"], "amount_cents": amount, "currency": "USD"}
+            )
+
+        response = await authenticated_client.get(f"/account-statements/schools/{school_id}/stream")
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["record"] for r in records] == ["school", "student", "student", "totals"]
+        assert records[0]["number_of_students"] == 2
+        assert [r["student_name"] for r in records[1:3]] == ["Jane Smith", "John Doe"]
+        assert records[-1]["total_invoiced"][0]["amount_cents"] == 18000
+        assert records[-1]["total_outstanding"][0]["amount_cents"] == 18000
+
+    async def test_school_statement_stream_not_found(self, authenticated_client: AsyncClient):
+        response = await authenticated_client.get(f"/account-statements/schools/{uuid4()}/stream")
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    async def test_school_statement_keyset_pagination(self, authenticated_client: AsyncClient):
+        school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
+        school_id = school_response.json()["id"]
+
+        amounts = {"Alice": 3000, "Bob": 9000, "Carol": 1000, "Dave": 5000, "Eve": 7000}
+        for name, amount in amounts.items():
+            student_response = await authenticated_client.post(
+                "/students/",
+                json={"name": name, "school_id": school_id}
+            )
+            await authenticated_client.post(
+                "/invoices/",
+                json={"student_id": student_response.json()["id"], "amount_cents": amount, "currency": "USD"}
+            )
+
+        for order_by, expected in (
+            ("name", ["Alice", "Bob", "Carol", "Dave", "Eve"]),
+            ("outstanding", ["Bob", "Eve", "Dave", "Alice", "Carol"]),
+        ):
+            names = []
+            cursor = None
+            pages = 0
+            while True:
+                params = {"limit": 2, "order_by": order_by}
+                if cursor:
+                    params["cursor"] = cursor
+                response = await authenticated_client.get(f"/account-statements/schools/{school_id}", params=params)
+                assert response.status_code == HTTPStatus.OK
+                data = response.json()
+                # Totals always cover the whole school
+                assert data["total_invoiced"][0]["amount_cents"] == 25000
+                assert data["number_of_students"] == 5
+                names.extend(s["student_name"] for s in data["students"])
+                pages += 1
+                if not data["has_more"]:
+                    assert data["next_cursor"] is None
+                    break
+                cursor = data["next_cursor"]
+            assert names == expected
+            assert pages == 3
+
+    async def test_school_statement_pagination_within_a_student(self, authenticated_client: AsyncClient):
+        school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
+        school_id = school_response.json()["id"]
+
+        invoices = {"Alice": [(3000, "USD"), (3000, "EUR")], "Bob": [(5000, "USD"), (1000, "EUR")]}
+        for name, amounts in invoices.items():
+            student_response = await authenticated_client.post(
+                "/students/",
+                json={"name": name, "school_id": school_id}
+            )
+            for amount, currency in amounts:
+                await authenticated_client.post(
+                    "/invoices/",
+                    json={"student_id": student_response.json()["id"], "amount_cents": amount, "currency": currency}
+                )
+
+        # One (student, currency) row per page, so pages end between a student's rows
+        for order_by, expected in (
+            ("name", [("Alice", "EUR"), ("Alice", "USD"), ("Bob", "EUR"), ("Bob", "USD")]),
+            ("outstanding", [("Bob", "USD"), ("Alice", "EUR"), ("Alice", "USD"), ("Bob", "EUR")]),
+        ):
+            rows = []
+            cursor = None
+            while True:
+                params = {"limit": 1, "order_by": order_by}
+                if cursor:
+                    params["cursor"] = cursor
+                response = await authenticated_client.get(f"/account-statements/schools/{school_id}", params=params)
+                assert response.status_code == HTTPStatus.OK
+                data = response.json()
+                rows.extend((s["student_name"], s["total_outstanding"]["currency"]) for s in data["students"])
+                if not data["has_more"]:
+                    break
+                cursor = data["next_cursor"]
+            assert rows == expected
+
+    async def test_student_statement_invoice_filters(self, authenticated_client: AsyncClient):
+        school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
+        student_response = await authenticated_client.post(
+            "/students/", json={"name": "John Doe", "school_id": school_response.json()["id"]}
+        )
+        student_id = student_response.json()["id"]
+        invoices = []
+        for amount in (1000, 2000, 3000, 4000):
+            invoice_response = await authenticated_client.post(
+                "/invoices/", json={"student_id": student_id, "amount_cents": amount, "currency": "USD"}
+            )
+            invoices.append(invoice_response.json())
+        for invoice, paid in ((invoices[0], 1000), (invoices[1], 500)):
+            await authenticated_client.post(
+                "/payments/",
+                json={
+                    "student_id": student_id, "amount_cents": paid, "currency": "USD", "payment_method": "cash",
+                    "imputations": [{"invoice_id": invoice["id"], "amount_cents": paid}],
+                }
+            )
+
+        url = f"/account-statements/students/{student_id}"
+        for status, expected in (("paid", [1000]), ("partial", [2000]), ("open", [3000, 4000])):
+            response = await authenticated_client.get(url, params={"status": status})
+            assert response.status_code == HTTPStatus.OK
+            data = response.json()
+            assert [invoice["amount"]["amount_cents"] for invoice in data["invoices"]] == expected
+            # Totals always cover every invoice
+            assert data["total_invoiced"][0]["amount_cents"] == 10000
+            assert data["total_paid"][0]["amount_cents"] == 1500
+
+        response = await authenticated_client.get(url, params={"issued_after": invoices[1]["issued_at"]})
+        assert [invoice["id"] for invoice in response.json()["invoices"]] == [invoices[2]["id"], invoices[3]["id"]]
+
+        listed = []
+        cursor = None
+        while True:
+            params = {"limit": 3}
+            if cursor:
+                params["cursor"] = cursor
+            data = (await authenticated_client.get(url, params=params)).json()
+            listed.extend(invoice["id"] for invoice in data["invoices"])
+            if not data["has_more"]:
+                break
+            cursor = data["next_cursor"]
+        assert listed == [invoice["id"] for invoice in invoices]
+
+        response = await authenticated_client.get(url, params={"status": "overdue"})
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+    async def test_statements_as_of_closed_period(self, authenticated_client: AsyncClient, db_session: AsyncSession):
+        school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
+        school_id = school_response.json()["id"]
+
+        student_response = await authenticated_client.post(
+            "/students/",
+            json={"name": "John Doe", "school_id": school_id}
+        )
+        student_id = student_response.json()["id"]
+
+        invoice_response = await authenticated_client.post(
+            "/invoices/",
+            json={"student_id": student_id, "amount_cents": 10000, "currency": "USD"}
+        )
+        invoice_id = invoice_response.json()["id"]
+        payment = {
+            "student_id": student_id,
+            "currency": "USD",
+            "payment_method": "cash",
+        }
+        await authenticated_client.post(
+            "/payments/",
+            json={**payment, "amount_cents": 4000, "imputations": [{"invoice_id": invoice_id, "amount_cents": 4000}]}
+        )
+
+        period_end = datetime.utcnow()
+        await BalanceSnapshotService(db_session).close_period(period_end)
+        await db_session.commit()
+
+        # Activity after the closed period
+        await authenticated_client.post(
+            "/invoices/",
+            json={"student_id": student_id, "amount_cents": 5000, "currency": "USD"}
+        )
+        await authenticated_client.post(
+            "/payments/",
+            json={**payment, "amount_cents": 1000, "imputations": [{"invoice_id": invoice_id, "amount_cents": 1000}]}
+        )
+        now = datetime.utcnow()
+
+        for as_of, invoiced, paid in ((period_end, 10000, 4000), (now, 15000, 5000)):
+            params = {"as_of": as_of.isoformat()}
+            response = await authenticated_client.get(f"/account-statements/schools/{school_id}", params=params)
+            assert response.status_code == HTTPStatus.OK
+            data = response.json()
+            assert data["total_invoiced"][0]["amount_cents"] == invoiced
+            assert data["total_paid"][0]["amount_cents"] == paid
+            assert data["students"][0]["total_outstanding"]["amount_cents"] == invoiced - paid
+
+            response = await authenticated_client.get(f"/account-statements/students/{student_id}", params=params)
+            assert response.status_code == HTTPStatus.OK
+            data = response.json()
+            assert data["total_invoiced"][0]["amount_cents"] == invoiced
+            assert data["total_paid"][0]["amount_cents"] == paid
+
+        response = await authenticated_client.get(
+            f"/account-statements/students/{student_id}", params={"as_of": period_end.isoformat()}
+        )
+        assert len(response.json()["invoices"]) == 1
+
+        response = await authenticated_client.get(
+            f"/account-statements/schools/{school_id}", params={"as_of": now.isoformat(), "limit": 10}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    async def test_student_statement_as_of_totals_match_when_paginated(
+        self, authenticated_client: AsyncClient, db_session: AsyncSession
+    ):
+        school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
+        student_response = await authenticated_client.post(
+            "/students/",
+            json={"name": "John Doe", "school_id": school_response.json()["id"]}
+        )
+        student_id = student_response.json()["id"]
+        invoice_ids = []
+        for amount in (10000, 3000):
+            invoice_response = await authenticated_client.post(
+                "/invoices/",
+                json={"student_id": student_id, "amount_cents": amount, "currency": "USD"}
+            )
+            invoice_ids.append(invoice_response.json()["id"])
+        await authenticated_client.post(
+            "/payments/",
+            json={
+                "student_id": student_id, "amount_cents": 4000, "currency": "USD", "payment_method": "cash",
+                "imputations": [{"invoice_id": invoice_ids[0], "amount_cents": 4000}],
+            }
+        )
+
+        period_end = datetime.utcnow()
+        await BalanceSnapshotService(db_session).close_period(period_end)
+        await db_session.commit()
+        # Deleting an invoice of the closed period leaves the snapshot behind the ledger
+        await authenticated_client.delete(f"/invoices/{invoice_ids[1]}")
+
+        url = f"/account-statements/students/{student_id}"
+        responses = [
+            await authenticated_client.get(url, params={"as_of": period_end.isoformat(), **params})
+            for params in ({}, {"limit": 1}, {"status": "partial"})
+        ]
+        for response in responses:
+            assert response.status_code == HTTPStatus.OK
+            data = response.json()
+            for field in ("total_invoiced", "total_paid", "total_outstanding"):
+                assert data[field] == responses[0].json()[field]
+        assert responses[0].json()["total_invoiced"] == [{"amount_cents": 10000, "currency": "USD"}]
+
+    async def test_payments_on_invoices_issued_after_as_of_are_left_out(
+        self, authenticated_client: AsyncClient, db_session: AsyncSession
+    ):
+        school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
+        school_id = school_response.json()["id"]
+        student_response = await authenticated_client.post(
+            "/students/",
+            json={"name": "John Doe", "school_id": school_id}
+        )
+        student_id = student_response.json()["id"]
+        await authenticated_client.post(
+            "/invoices/",
+            json={"student_id": student_id, "amount_cents": 10000, "currency": "USD"}
+        )
+        as_of = datetime.utcnow()
+        invoice_response = await authenticated_client.post(
+            "/invoices/",
+            json={"student_id": student_id, "amount_cents": 5000, "currency": "USD"}
+        )
+        # A payment dated before the invoice it is imputed to was issued
+        row = {
+            "student_id": student_id, "amount_cents": 3000, "currency": "USD", "payment_method": "cash",
+            "imputations": [{"invoice_id": invoice_response.json()["id"], "amount_cents": 3000}],
+            "payment_date": (as_of - timedelta(seconds=1)).isoformat(),
+        }
+        response = await authenticated_client.post(
+            "/payments/import", content=json.dumps(row), headers={"Content-Type": "application/x-ndjson"}
+        )
+        assert response.json()["imported"] == 1
+
+        async def statements(moment: datetime) -> tuple[dict, dict]:
+            params = {"as_of": moment.isoformat()}
+            school = await authenticated_client.get(f"/account-statements/schools/{school_id}", params=params)
+            student = await authenticated_client.get(f"/account-statements/students/{student_id}", params=params)
+            return school.json(), student.json()
+
+        school, student = await statements(as_of)
+        for field in ("total_invoiced", "total_paid", "total_outstanding"):
+            assert school[field] == student[field]
+        assert school["total_outstanding"] == [{"amount_cents": 10000, "currency": "USD"}]
+
+        # Once the invoice is issued, the payment counts, though the snapshot predates the invoice
+        await BalanceSnapshotService(db_session).close_period(as_of)
+        await db_session.commit()
+        school, student = await statements(datetime.utcnow())
+        for field in ("total_invoiced", "total_paid", "total_outstanding"):
+            assert school[field] == student[field]
+        assert school["total_paid"] == [{"amount_cents": 3000, "currency": "USD"}]
+
+    async def test_school_aging_report(self, authenticated_client: AsyncClient):
+        school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
+        school_id = school_response.json()["id"]
+
+        student_response = await authenticated_client.post(
+            "/students/",
+            json={"name": "John Doe", "school_id": school_id}
+        )
+        student_id = student_response.json()["id"]
+
+        now = datetime.utcnow()
+        invoice_ids = []
+        for days_past_due, amount in ((None, 1000), (10, 2000), (45, 3000), (75, 4000), (120, 5000)):
+            invoice = {"student_id": student_id, "amount_cents": amount, "currency": "USD"}
+            if days_past_due is not None:
+                invoice["due_date"] = (now - timedelta(days=days_past_due)).isoformat()
+            invoice_response = await authenticated_client.post("/invoices/", json=invoice)
+            invoice_ids.append(invoice_response.json()["id"])
+
+        response = await authenticated_client.get(f"/account-statements/schools/{school_id}/aging")
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert len(data["totals"]) == 1
+        totals = data["totals"][0]
+        assert totals["current"]["amount_cents"] == 1000
+        assert totals["days_1_30"]["amount_cents"] == 2000
+        assert totals["days_31_60"]["amount_cents"] == 3000
+        assert totals["days_61_90"]["amount_cents"] == 4000
+        assert totals["days_over_90"]["amount_cents"] == 5000
+        assert totals["total_outstanding"]["amount_cents"] == 15000
+        assert len(data["students"]) == 1
+        assert data["students"][0]["buckets"]["total_outstanding"]["amount_cents"] == 15000
+
+        # Paying the oldest invoice in full invalidates the cached report
+        await authenticated_client.post(
+            "/payments/",
+            json={
+                "student_id": student_id,
+                "amount_cents": 5000,
+                "currency": "USD",
+                "payment_method": "cash",
+                "imputations": [{"invoice_id": invoice_ids[-1], "amount_cents": 5000}]
+            }
+        )
+        response = await authenticated_client.get(f"/account-statements/schools/{school_id}/aging")
+        totals = response.json()["totals"][0]
+        assert totals["days_over_90"]["amount_cents"] == 0
+        assert totals["total_outstanding"]["amount_cents"] == 10000
+
+    async def test_school_aging_report_not_found(self, authenticated_client: AsyncClient):
+        response = await authenticated_client.get(f"/account-statements/schools/{uuid4()}/aging")
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    async def test_school_rollup(self, authenticated_client: AsyncClient):
+        school_ids = []
+        for school_name, amounts in (("North School", (10000, 5000)), ("South School", (2000,)), ("Empty School", ())):
+            school_response = await authenticated_client.post("/schools/", json={"name": school_name})
+            school_id = school_response.json()["id"]
+            school_ids.append(school_id)
+            for i, amount in enumerate(amounts):
+                student_response = await authenticated_client.post(
+                    "/students/", json={"name": f"Student {i}", "school_id": school_id}
+                )
+                await authenticated_client.post(
+                    "/invoices/",
+                    json={"student_id": student_response.json()["id"], "amount_cents": amount, "currency": "USD"}
+                )
+
+        response = await authenticated_client.get(
+            "/account-statements/rollup", params={"school_id": school_ids + [school_ids[0]]}
+        )
+        assert response.status_code == HTTPStatus.OK
+
+        data = response.json()
+        assert data["total_invoiced"][0]["amount_cents"] == 17000
+        assert data["total_outstanding"][0]["amount_cents"] == 17000
+        assert data["number_of_students"] == 3
+        subtotals = {school["school_name"]: school for school in data["schools"]}
+        assert [school["school_name"] for school in data["schools"]] == ["Empty School", "North School", "South School"]
+        assert subtotals["North School"]["total_invoiced"][0]["amount_cents"] == 15000
+        assert subtotals["North School"]["number_of_students"] == 2
+        assert subtotals["Empty School"]["total_outstanding"] == []
+
+    async def test_school_rollup_unknown_school(self, authenticated_client: AsyncClient):
+        school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
+        response = await authenticated_client.get(
+            "/account-statements/rollup", params={"school_id": [school_response.json()["id"], str(uuid4())]}
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
@@ -1,7 +1,16 @@
+import json
 import pytest
 from httpx import AsyncClient
 from http import HTTPStatus
-from app.cache import student_statement_key, school_statement_key
+from uuid import UUID, uuid4
+from app.cache import (
+    student_statement_key, school_statement_key, school_aging_key, stale_key, patch_school_statement,
+    student_version_key, school_version_key
+)
+from app.main import app
+from app.dependencies import get_statement_cache_warmer
+from app.services import StatementCacheWarmer
+from app.services.student_balance_service import BalanceChange
 from tests.mock_cache import MockCache
 from tests.test_schemas import (
     create_school_data,
@@ -99,12 +108,13 @@ class TestCacheVerification:
             json=create_invoice_data(student_id, 5000, currency="USD", description="Second")
         )
         
-        # Verify delete was called for both student and school cache
-        assert mock_cache.delete_call_count() == initial_delete_count + 2
+        # Verify delete was called for the student, school and aging caches
+        assert mock_cache.delete_call_count() == initial_delete_count + 3
         
         # Verify correct keys were deleted
         assert mock_cache.was_delete_called_with(student_statement_key(student_id))
         assert mock_cache.was_delete_called_with(school_statement_key(school_id))
+        assert mock_cache.was_delete_called_with(school_aging_key(school_id))
     
     async def test_cache_delete_called_on_payment_creation(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache]):
         """Verify cache.delete() is called when payment is created."""
@@ -146,12 +156,13 @@ class TestCacheVerification:
         # Verify payment was created successfully
         assert payment_response.status_code == HTTPStatus.CREATED, f"Payment creation failed: {payment_response.json()}"
         
-        # Verify delete was called for both student and school cache
-        assert mock_cache.delete_call_count() == initial_delete_count + 2
+        # Verify delete was called for the student, school and aging caches
+        assert mock_cache.delete_call_count() == initial_delete_count + 3
         
         # Verify correct keys were deleted
         assert mock_cache.was_delete_called_with(student_statement_key(student_id))
         assert mock_cache.was_delete_called_with(school_statement_key(school_id))
+        assert mock_cache.was_delete_called_with(school_aging_key(school_id))
     
     async def test_cache_invalidation_on_invoice_update(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache]):
         """Verify cache is invalidated when invoice is updated."""
@@ -186,11 +197,12 @@ class TestCacheVerification:
         )
         
         # Verify delete was called
-        assert mock_cache.delete_call_count() == initial_delete_count + 2
+        assert mock_cache.delete_call_count() == initial_delete_count + 3
         
         # Verify correct keys were deleted
         assert mock_cache.was_delete_called_with(student_statement_key(student_id))
         assert mock_cache.was_delete_called_with(school_statement_key(school_id))
+        assert mock_cache.was_delete_called_with(school_aging_key(school_id))
     
     async def test_cache_invalidation_on_invoice_deletion(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache]):
         """Verify cache is invalidated when invoice is deleted."""
@@ -222,11 +234,12 @@ class TestCacheVerification:
         await client.delete(f"/invoices/{invoice_id}")
         
         # Verify delete was called
-        assert mock_cache.delete_call_count() == initial_delete_count + 2
+        assert mock_cache.delete_call_count() == initial_delete_count + 3
         
         # Verify correct keys were deleted
         assert mock_cache.was_delete_called_with(student_statement_key(student_id))
         assert mock_cache.was_delete_called_with(school_statement_key(school_id))
+        assert mock_cache.was_delete_called_with(school_aging_key(school_id))
     
     async def test_cache_invalidation_on_payment_deletion(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache]):
         """Verify cache is invalidated when payment is deleted."""
@@ -264,11 +277,43 @@ class TestCacheVerification:
         await client.delete(f"/payments/{payment_id}")
         
         # Verify delete was called
-        assert mock_cache.delete_call_count() == initial_delete_count + 2
+        assert mock_cache.delete_call_count() == initial_delete_count + 3
         
         # Verify correct keys were deleted
         assert mock_cache.was_delete_called_with(student_statement_key(student_id))
         assert mock_cache.was_delete_called_with(school_statement_key(school_id))
+        assert mock_cache.was_delete_called_with(school_aging_key(school_id))
+
+    async def test_payment_import_invalidates_each_key_once_per_batch(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache]):
+        """Verify an import batch deletes each affected statement key once."""
+        client, mock_cache = authenticated_client_with_mock_cache
+        
+        school_response = await client.post("/schools/", json=create_school_data("Test School"))
+        school_id = school_response.json()["id"]
+        rows = []
+        student_ids = []
+        for name in ("Alice", "Bob"):
+            student_response = await client.post("/students/", json=create_student_data(name, school_id))
+            student_id = student_response.json()["id"]
+            student_ids.append(student_id)
+            invoice_response = await client.post(
+                "/invoices/",
+                json=create_invoice_data(student_id, 10000, currency="USD", description="Tuition")
+            )
+            for amount in (3000, 2000):
+                rows.append(create_payment_data(student_id, amount, invoice_response.json()["id"]))
+        
+        mock_cache.delete_calls.clear()
+        response = await client.post(
+            "/payments/import",
+            content="\n".join(json.dumps(row) for row in rows),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.json()["imported"] == 4
+        
+        expected = [student_statement_key(student_id) for student_id in student_ids]
+        expected += [school_statement_key(school_id), school_aging_key(school_id)]
+        assert sorted(mock_cache.delete_calls) == sorted(expected)
 
 
 class TestCacheKeyCorrectness:
@@ -316,3 +361,431 @@ class TestCacheKeyCorrectness:
         
         # Verify get was called with correct key
         assert mock_cache.was_get_called_with(expected_key)
+
+
+class TestBatchStatementCaching:
+    """Batch statements read hits with one MGET and write misses with one pipeline."""
+    
+    async def test_batch_statements_use_mget_and_pipelined_set(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache]):
+        client, mock_cache = authenticated_client_with_mock_cache
+        
+        school_response = await client.post("/schools/", json=create_school_data("Test School"))
+        school_id = school_response.json()["id"]
+        
+        student_ids = []
+        for name, amount in (("Alice", 10000), ("Bob", 5000)):
+            student_response = await client.post("/students/", json=create_student_data(name, school_id))
+            student_id = student_response.json()["id"]
+            student_ids.append(student_id)
+            await client.post("/invoices/", json=create_invoice_data(student_id, amount))
+        
+        # Alice is already cached, Bob is not
+        await client.get(f"/account-statements/students/{student_ids[0]}")
+        mock_cache.get_many_calls.clear()
+        
+        unknown_id = str(uuid4())
+        response = await client.post(
+            "/account-statements/students:batch",
+            json={"student_ids": student_ids + [unknown_id]}
+        )
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert [s["student_id"] for s in data["statements"]] == student_ids
+        assert [s["total_invoiced"][0]["amount_cents"] for s in data["statements"]] == [10000, 5000]
+        assert [e["student_id"] for e in data["errors"]] == [unknown_id]
+        
+        assert len(mock_cache.get_many_calls) == 1
+        assert len(mock_cache.set_many_calls) == 1
+        written, _ = mock_cache.set_many_calls[0]
+        assert list(written) == [student_statement_key(student_ids[1])]
+        
+        # Everything is cached now: no further writes
+        await client.post("/account-statements/students:batch", json={"student_ids": student_ids})
+        assert len(mock_cache.set_many_calls) == 1
+    
+    async def test_batch_statements_reject_empty_request(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache]):
+        client, _ = authenticated_client_with_mock_cache
+        
+        response = await client.post("/account-statements/students:batch", json={"student_ids": []})
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+class TestStatementCacheWarmer:
+    """Tests for precomputing statements into the cache."""
+
+    async def test_warm_all_fills_missing_statements(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache], test_sessionmaker):
+        client, mock_cache = authenticated_client_with_mock_cache
+
+        school_response = await client.post("/schools/", json=create_school_data("Test School"))
+        school_id = school_response.json()["id"]
+        student_ids = []
+        for name in ("Alice", "Bob"):
+            student_response = await client.post("/students/", json=create_student_data(name, school_id))
+            student_ids.append(student_response.json()["id"])
+        await client.post("/invoices/", json=create_invoice_data(student_ids[0], 10000))
+
+        mock_cache.reset()
+        warmer = StatementCacheWarmer(mock_cache, session_factory=test_sessionmaker, concurrency=2)
+        assert await warmer.warm_all() == 1
+
+        assert mock_cache.was_set_called_with(school_statement_key(school_id))
+        warmed = mock_cache.set_many_calls[0][0]
+        assert set(warmed) == {student_statement_key(student_id) for student_id in student_ids}
+
+        # Statements already cached are not recomputed
+        await warmer.warm_all()
+        assert mock_cache.set_call_count() == 1
+        assert len(mock_cache.set_many_calls) == 1
+
+    async def test_invalidated_statements_are_rewarmed(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache], test_sessionmaker):
+        client, mock_cache = authenticated_client_with_mock_cache
+        warmer = StatementCacheWarmer(mock_cache, session_factory=test_sessionmaker)
+
+        async def override_get_statement_cache_warmer():
+            return warmer
+
+        app.dependency_overrides[get_statement_cache_warmer] = override_get_statement_cache_warmer
+
+        school_response = await client.post("/schools/", json=create_school_data("Test School"))
+        school_id = school_response.json()["id"]
+        student_response = await client.post("/students/", json=create_student_data("John Doe", school_id))
+        student_id = student_response.json()["id"]
+
+        await client.post("/invoices/", json=create_invoice_data(student_id, 10000))
+        await warmer.wait_for_rewarms()
+
+        assert mock_cache.was_delete_called_with(student_statement_key(student_id))
+        cached_student = await mock_cache.get(student_statement_key(student_id))
+        cached_school = await mock_cache.get(school_statement_key(school_id))
+        assert cached_student["total_invoiced"][0]["amount_cents"] == 10000
+        assert cached_school["total_invoiced"][0]["amount_cents"] == 10000
+
+        # The next read is served from the re-warmed cache
+        set_count = mock_cache.set_call_count()
+        response = await client.get(f"/account-statements/students/{student_id}")
+        assert response.json()["total_invoiced"][0]["amount_cents"] == 10000
+        assert mock_cache.set_call_count() == set_count
+
+
+class TestSchoolStatementPatching:
+    """Writes patch the cached school statement in place instead of dropping it."""
+
+    async def test_payment_patches_cached_school_statement(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache]):
+        client, mock_cache = authenticated_client_with_mock_cache
+
+        school_response = await client.post("/schools/", json=create_school_data("Test School"))
+        school_id = school_response.json()["id"]
+        student_response = await client.post("/students/", json=create_student_data("Alice", school_id))
+        student_id = student_response.json()["id"]
+        invoice_response = await client.post("/invoices/", json=create_invoice_data(student_id, 10000))
+        await client.get(f"/account-statements/schools/{school_id}")
+        mock_cache.delete_calls.clear()
+
+        await client.post(
+            "/payments/", json=create_payment_data(student_id, 4000, invoice_response.json()["id"])
+        )
+        assert not mock_cache.was_delete_called_with(school_statement_key(school_id))
+        assert mock_cache.was_delete_called_with(student_statement_key(student_id))
+
+        set_count = mock_cache.set_call_count()
+        response = await client.get(f"/account-statements/schools/{school_id}")
+        assert mock_cache.set_call_count() == set_count
+        data = response.json()
+        assert (data["total_invoiced"][0]["amount_cents"], data["total_paid"][0]["amount_cents"]) == (10000, 4000)
+        assert data["total_outstanding"][0]["amount_cents"] == 6000
+        assert data["students"][0]["total_outstanding"]["amount_cents"] == 6000
+
+        # The patched statement matches a fresh computation
+        fresh = await client.get(f"/account-statements/schools/{school_id}", params={"limit": 10})
+        assert fresh.json()["students"] == data["students"]
+
+    async def test_unpatchable_writes_invalidate_school_statement(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache]):
+        client, mock_cache = authenticated_client_with_mock_cache
+
+        school_response = await client.post("/schools/", json=create_school_data("Test School"))
+        school_id = school_response.json()["id"]
+        student_response = await client.post("/students/", json=create_student_data("Alice", school_id))
+        student_id = student_response.json()["id"]
+        invoice_response = await client.post("/invoices/", json=create_invoice_data(student_id, 10000))
+        await client.get(f"/account-statements/schools/{school_id}")
+
+        # A student entering the statement
+        other_response = await client.post("/students/", json=create_student_data("Bob", school_id))
+        await client.post("/invoices/", json=create_invoice_data(other_response.json()["id"], 5000))
+        assert mock_cache.was_delete_called_with(school_statement_key(school_id))
+
+        # A student leaving it
+        await client.get(f"/account-statements/schools/{school_id}")
+        mock_cache.delete_calls.clear()
+        await client.delete(f"/invoices/{invoice_response.json()['id']}")
+        assert mock_cache.was_delete_called_with(school_statement_key(school_id))
+
+        response = await client.get(f"/account-statements/schools/{school_id}")
+        assert [s["student_name"] for s in response.json()["students"]] == ["Bob"]
+
+    async def test_patch_requires_the_previous_version(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache]):
+        client, mock_cache = authenticated_client_with_mock_cache
+
+        school_response = await client.post("/schools/", json=create_school_data("Test School"))
+        school_id = school_response.json()["id"]
+        student_response = await client.post("/students/", json=create_student_data("Alice", school_id))
+        student_id = student_response.json()["id"]
+        await client.post("/invoices/", json=create_invoice_data(student_id, 10000))
+        await client.get(f"/account-statements/schools/{school_id}")
+
+        def change(version: int) -> BalanceChange:
+            return BalanceChange(UUID(student_id), UUID(school_id), "USD", version, 1, 0, 1000)
+
+        # Version 1 is already reflected in the cached statement
+        assert await patch_school_statement(mock_cache, UUID(school_id), [change(1)])
+        # Version 3 means version 2 was missed
+        assert not await patch_school_statement(mock_cache, UUID(school_id), [change(3)])
+        cached = await mock_cache.get(school_statement_key(school_id))
+        assert cached["total_paid"][0]["amount_cents"] == 0
+
+
+class TestStaleWhileRevalidate:
+    """Tests for serving stale statements while they are refreshed."""
+
+    async def test_stale_statement_served_while_refreshed(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache], test_sessionmaker):
+        client, mock_cache = authenticated_client_with_mock_cache
+        warmer = StatementCacheWarmer(
+            mock_cache, session_factory=test_sessionmaker, rewarm_on_invalidate=False, max_staleness=300
+        )
+
+        async def override_get_statement_cache_warmer():
+            return warmer
+
+        app.dependency_overrides[get_statement_cache_warmer] = override_get_statement_cache_warmer
+
+        school_response = await client.post("/schools/", json=create_school_data("Test School"))
+        school_id = school_response.json()["id"]
+        student_response = await client.post("/students/", json=create_student_data("John Doe", school_id))
+        student_id = student_response.json()["id"]
+        await client.post("/invoices/", json=create_invoice_data(student_id, 10000))
+
+        response = await client.get(f"/account-statements/schools/{school_id}")
+        assert "Stale" not in response.headers
+        assert response.json()["total_invoiced"][0]["amount_cents"] == 10000
+
+        # A write that cannot be patched in (a new student) marks the statement stale instead of deleting it
+        other_response = await client.post("/students/", json=create_student_data("Jane Roe", school_id))
+        await client.post("/invoices/", json=create_invoice_data(other_response.json()["id"], 5000))
+        assert not mock_cache.was_delete_called_with(school_statement_key(school_id))
+
+        response = await client.get(f"/account-statements/schools/{school_id}")
+        assert response.headers["Stale"] == "true"
+        assert response.json()["total_invoiced"][0]["amount_cents"] == 10000
+
+        await warmer.wait_for_rewarms()
+        response = await client.get(f"/account-statements/schools/{school_id}")
+        assert "Stale" not in response.headers
+        assert response.json()["total_invoiced"][0]["amount_cents"] == 15000
+        assert await mock_cache.get(stale_key(school_statement_key(school_id))) is None
+
+    async def test_statement_past_max_staleness_is_recomputed(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache], test_sessionmaker):
+        client, mock_cache = authenticated_client_with_mock_cache
+        warmer = StatementCacheWarmer(
+            mock_cache, session_factory=test_sessionmaker, rewarm_on_invalidate=False, max_staleness=300
+        )
+
+        async def override_get_statement_cache_warmer():
+            return warmer
+
+        app.dependency_overrides[get_statement_cache_warmer] = override_get_statement_cache_warmer
+
+        school_response = await client.post("/schools/", json=create_school_data("Test School"))
+        school_id = school_response.json()["id"]
+        student_response = await client.post("/students/", json=create_student_data("John Doe", school_id))
+        student_id = student_response.json()["id"]
+        await client.post("/invoices/", json=create_invoice_data(student_id, 10000))
+        await client.get(f"/account-statements/students/{student_id}")
+
+        await client.post("/invoices/", json=create_invoice_data(student_id, 5000))
+        marker = await mock_cache.get(stale_key(student_statement_key(student_id)))
+        await mock_cache.set(stale_key(student_statement_key(student_id)), {**marker, "since": marker["since"] - 301})
+
+        response = await client.get(f"/account-statements/students/{student_id}")
+        assert "Stale" not in response.headers
+        assert response.json()["total_invoiced"][0]["amount_cents"] == 15000
+
+
+class TestSchoolRollupCaching:
+    async def test_rollup_cached_until_a_member_school_changes(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache]):
+        client, mock_cache = authenticated_client_with_mock_cache
+
+        school_ids = []
+        for name in ("North School", "South School"):
+            school_response = await client.post("/schools/", json=create_school_data(name))
+            school_ids.append(school_response.json()["id"])
+        student_response = await client.post("/students/", json=create_student_data("Alice", school_ids[1]))
+        student_id = student_response.json()["id"]
+        await client.post("/invoices/", json=create_invoice_data(student_id, 10000))
+
+        params = {"school_id": school_ids}
+        await client.get("/account-statements/rollup", params=params)
+        set_count = mock_cache.set_call_count()
+        response = await client.get("/account-statements/rollup", params=params)
+        assert mock_cache.set_call_count() == set_count
+        assert response.json()["total_invoiced"][0]["amount_cents"] == 10000
+
+        # A write to one member school moves the roll-up to a new key
+        await client.post("/invoices/", json=create_invoice_data(student_id, 5000))
+        response = await client.get("/account-statements/rollup", params=params)
+        assert mock_cache.set_call_count() == set_count + 1
+        assert response.json()["total_invoiced"][0]["amount_cents"] == 15000
+
+
+class TestStatementETags:
+    """Statement routes answer If-None-Match from the version counters alone."""
+
+    async def test_matching_etag_returns_304_without_fetching_statement(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache]):
+        client, mock_cache = authenticated_client_with_mock_cache
+
+        school_response = await client.post("/schools/", json=create_school_data("Test School"))
+        school_id = school_response.json()["id"]
+        student_response = await client.post("/students/", json=create_student_data("John Doe", school_id))
+        student_id = student_response.json()["id"]
+        invoice_response = await client.post("/invoices/", json=create_invoice_data(student_id, 10000))
+
+        student_url = f"/account-statements/students/{student_id}"
+        etags = {}
+        for url in (
+            student_url,
+            f"/account-statements/schools/{school_id}",
+            f"/account-statements/schools/{school_id}/aging",
+        ):
+            response = await client.get(url)
+            etag = etags[url] = response.headers["ETag"]
+
+            get_count = mock_cache.get_call_count()
+            response = await client.get(url, headers={"If-None-Match": etag})
+            assert response.status_code == HTTPStatus.NOT_MODIFIED
+            assert response.headers["ETag"] == etag
+            assert response.content == b""
+            assert mock_cache.get_call_count() == get_count
+
+        # A write bumps the versions: the old ETags no longer match
+        await client.post(
+            "/payments/", json=create_payment_data(student_id, 4000, invoice_response.json()["id"])
+        )
+        response = await client.get(student_url, headers={"If-None-Match": etags[student_url]})
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["ETag"] != etags[student_url]
+        assert response.json()["total_paid"][0]["amount_cents"] == 4000
+
+    async def test_conditional_requests_for_unknown_or_revoked_ids_are_not_found(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache]):
+        client, mock_cache = authenticated_client_with_mock_cache
+
+        school_response = await client.post("/schools/", json=create_school_data("Test School"))
+        school_id = school_response.json()["id"]
+        student_response = await client.post("/students/", json=create_student_data("John Doe", school_id))
+        student_id = student_response.json()["id"]
+        await client.post("/invoices/", json=create_invoice_data(student_id, 10000))
+        closed_school_response = await client.post("/schools/", json=create_school_data("Closed School"))
+        closed_school_id = closed_school_response.json()["id"]
+
+        revoked_urls = [f"/account-statements/students/{student_id}", f"/account-statements/schools/{closed_school_id}"]
+        etags = {}
+        for url in revoked_urls:
+            # The first computation starts the closed school's counter
+            await client.get(url)
+            etags[url] = (await client.get(url)).headers["ETag"]
+        assert (await client.delete(f"/students/{student_id}")).status_code == HTTPStatus.NO_CONTENT
+        assert (await client.delete(f"/schools/{closed_school_id}")).status_code == HTTPStatus.NO_CONTENT
+        assert await mock_cache.get_version(student_version_key(student_id)) is None
+        assert await mock_cache.get_version(school_version_key(closed_school_id)) is None
+
+        unknown_id = str(uuid4())
+        for url in revoked_urls + [
+            f"/account-statements/students/{unknown_id}",
+            f"/account-statements/schools/{unknown_id}",
+            f"/account-statements/schools/{unknown_id}/aging",
+            f"/account-statements/rollup?school_id={school_id}&school_id={unknown_id}",
+        ]:
+            response = await client.get(url, headers={"If-None-Match": "*"})
+            assert response.status_code == HTTPStatus.NOT_FOUND
+            if url in etags:
+                # ETags handed out before the deletion do not match either
+                response = await client.get(url, headers={"If-None-Match": etags[url]})
+                assert response.status_code == HTTPStatus.NOT_FOUND
+        # Reads do not start counters for IDs that do not exist
+        assert await mock_cache.get_version(student_version_key(unknown_id)) is None
+        assert await mock_cache.get_version(school_version_key(unknown_id)) is None
+
+    async def test_uncached_variants_have_no_etag(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache]):
+        client, _ = authenticated_client_with_mock_cache
+
+        school_response = await client.post("/schools/", json=create_school_data("Test School"))
+        school_id = school_response.json()["id"]
+
+        response = await client.get(f"/account-statements/schools/{school_id}", params={"limit": 10})
+        assert response.status_code == HTTPStatus.OK
+        assert "ETag" not in response.headers
+
+
+class TestStudentWrites:
+    """Deleting or moving a student invalidates every statement listing them."""
+
+    async def test_deleted_student_leaves_cached_school_statement(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache]):
+        client, mock_cache = authenticated_client_with_mock_cache
+
+        school_response = await client.post("/schools/", json=create_school_data("Test School"))
+        school_id = school_response.json()["id"]
+        student_ids = []
+        for name in ("Alice", "Bob"):
+            student_response = await client.post("/students/", json=create_student_data(name, school_id))
+            student_ids.append(student_response.json()["id"])
+            await client.post("/invoices/", json=create_invoice_data(student_ids[-1], 10000))
+
+        school_url = f"/account-statements/schools/{school_id}"
+        response = await client.get(school_url)
+        etag = response.headers["ETag"]
+        assert [s["student_name"] for s in response.json()["students"]] == ["Alice", "Bob"]
+        assert mock_cache.was_set_called_with(school_statement_key(school_id))
+
+        response = await client.delete(f"/students/{student_ids[0]}")
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert mock_cache.was_delete_called_with(school_statement_key(school_id))
+        assert mock_cache.was_delete_called_with(student_statement_key(student_ids[0]))
+
+        # The old ETag no longer matches and the student is gone
+        response = await client.get(school_url, headers={"If-None-Match": etag})
+        assert response.status_code == HTTPStatus.OK
+        assert [s["student_name"] for s in response.json()["students"]] == ["Bob"]
+        assert response.json()["total_invoiced"][0]["amount_cents"] == 10000
+
+    async def test_moved_student_leaves_previous_school_statement(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache]):
+        client, mock_cache = authenticated_client_with_mock_cache
+
+        school_ids = []
+        for name in ("First School", "Second School"):
+            school_response = await client.post("/schools/", json=create_school_data(name))
+            school_ids.append(school_response.json()["id"])
+        student_response = await client.post("/students/", json=create_student_data("John Doe", school_ids[0]))
+        student_id = student_response.json()["id"]
+        await client.post("/invoices/", json=create_invoice_data(student_id, 10000))
+        for school_id in school_ids:
+            await client.get(f"/account-statements/schools/{school_id}")
+
+        response = await client.put(f"/students/{student_id}", json={"school_id": school_ids[1]})
+        assert response.status_code == HTTPStatus.OK
+        for school_id in school_ids:
+            assert mock_cache.was_delete_called_with(school_statement_key(school_id))
+
+        response = await client.get(f"/account-statements/schools/{school_ids[0]}")
+        assert response.json()["students"] == []
+        response = await client.get(f"/account-statements/schools/{school_ids[1]}")
+        assert [s["student_name"] for s in response.json()["students"]] == ["John Doe"]
+
+
+class TestCacheStats:
+    async def test_cache_stats_reported_per_tier(self, client_with_mock_cache: tuple[AsyncClient, MockCache]):
+        client, mock_cache = client_with_mock_cache
+        await mock_cache.set("key", {"value": 1})
+        await mock_cache.get("key")
+        await mock_cache.get("missing")
+
+        response = await client.get("/health/cache")
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == {"mock": {"hits": 1, "misses": 1, "hit_ratio": 0.5}}
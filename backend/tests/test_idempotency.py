@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from app.cache import idempotency_key, lock_key
+from app.idempotency import Idempotency, IdempotencyInProgress, IdempotencyKeyReused
+from tests.mock_cache import MockCache
+
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestIdempotency:
+    async def test_repeated_key_replays_stored_response(self):
+        cache = MockCache()
+        idempotency = Idempotency(cache)
+        runs = 0
+
+        async def compute():
+            nonlocal runs
+            runs += 1
+            return 201, {"id": "payment-1"}
+
+        first = await idempotency.run("payments:user", "key", "body", compute)
+        second = await idempotency.run("payments:user", "key", "body", compute)
+
+        assert runs == 1
+        assert first == second == (201, {"id": "payment-1"})
+        assert cache.was_set_called_with(idempotency_key("payments:user", "key"))
+
+    async def test_in_flight_duplicates_wait_for_the_first_request(self):
+        cache = MockCache()
+        idempotency = Idempotency(cache)
+        runs = 0
+
+        async def compute():
+            nonlocal runs
+            runs += 1
+            await asyncio.sleep(0.01)
+            return 201, {"id": "payment-1"}
+
+        responses = await asyncio.gather(
+            *(idempotency.run("payments:user", "key", "body", compute) for _ in range(5))
+        )
+
+        assert runs == 1
+        assert {response.body["id"] for response in responses} == {"payment-1"}
+
+    async def test_key_reused_with_different_body_is_rejected(self):
+        idempotency = Idempotency(MockCache())
+
+        async def compute():
+            return 201, {"id": "payment-1"}
+
+        await idempotency.run("payments:user", "key", "body", compute)
+        with pytest.raises(IdempotencyKeyReused):
+            await idempotency.run("payments:user", "key", "other body", compute)
+
+    async def test_never_runs_twice_when_another_worker_is_slow(self):
+        cache = MockCache()
+        idempotency = Idempotency(cache, wait_timeout=0.01)
+        cache_key = idempotency_key("payments:user", "key")
+        await cache.acquire_lock(lock_key(cache_key), "other-worker", 1000)
+
+        async def compute():
+            raise AssertionError("the lock holder runs the request")
+
+        with pytest.raises(IdempotencyInProgress):
+            await idempotency.run("payments:user", "key", "body", compute)
@@ -0,0 +1,36 @@
+import time
+from app.cache import LocalCache
+
+
+class TestLocalCache:
+    def test_evicts_least_recently_used(self):
+        cache = LocalCache(max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        assert cache.get("a") == "1"
+
+        cache.set("c", "3")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        assert cache.get("c") == "3"
+
+    def test_entries_expire(self):
+        cache = LocalCache(ttl=0.01)
+        cache.set("a", "1")
+        time.sleep(0.02)
+        assert cache.get("a") is None
+
+    def test_discard_key_or_pattern(self):
+        cache = LocalCache()
+        for key in ("statement:school:1", "statement:school:1:aging", "statement:student:2"):
+            cache.set(key, key)
+
+        cache.discard("statement:student:2")
+        assert cache.get("statement:student:2") is None
+
+        generation = cache.generation
+        cache.discard("statement:school:1*")
+        assert cache.get("statement:school:1") is None
+        assert cache.get("statement:school:1:aging") is None
+        assert cache.generation > generation
@@ -0,0 +1,106 @@
+import json
+import pytest
+from http import HTTPStatus
+from uuid import UUID
+from httpx import AsyncClient
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.cache import student_statement_key, school_statement_key
+from app.models import OutboxEvent
+from app.schemas import InvoiceCreate
+from app.services import InvoiceService, OutboxRelay
+from app.services.outbox_service import LEDGER_EVENTS_STREAM
+from tests.mock_cache import MockCache
+from tests.test_schemas import (
+    create_school_data,
+    create_student_data,
+    create_invoice_data,
+    create_payment_data,
+)
+
+
+pytestmark = pytest.mark.asyncio
+
+
+async def _pending_events(db_session: AsyncSession) -> int:
+    return await db_session.scalar(select(func.count()).select_from(OutboxEvent))
+
+
+async def _create_student(client: AsyncClient) -> tuple[str, str]:
+    school_response = await client.post("/schools/", json=create_school_data("Test School"))
+    school_id = school_response.json()["id"]
+    student_response = await client.post("/students/", json=create_student_data("John Doe", school_id))
+    return school_id, student_response.json()["id"]
+
+
+class TestOutbox:
+    async def test_writes_publish_their_events_to_the_stream(
+        self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache], db_session: AsyncSession
+    ):
+        client, mock_cache = authenticated_client_with_mock_cache
+        school_id, student_id = await _create_student(client)
+
+        invoice_response = await client.post("/invoices/", json=create_invoice_data(student_id, 10000))
+        invoice_id = invoice_response.json()["id"]
+        payment_response = await client.post("/payments/", json=create_payment_data(student_id, 4000, invoice_id))
+        assert payment_response.status_code == HTTPStatus.CREATED
+
+        entries = mock_cache.streams[LEDGER_EVENTS_STREAM]
+        assert [entry["type"] for entry in entries] == ["invoice.created", "payment.created"]
+        assert all(entry["student_id"] == student_id and entry["school_id"] == school_id for entry in entries)
+        assert int(entries[0]["event_id"]) < int(entries[1]["event_id"])
+        data = json.loads(entries[1]["data"])
+        assert data["payment_id"] == payment_response.json()["id"]
+        assert data["imputations"] == [{"invoice_id": invoice_id, "amount_cents": 4000}]
+        assert data["changes"][0]["paid_cents"] == 4000
+
+        # Published events leave the outbox, and the statements were invalidated
+        assert await _pending_events(db_session) == 0
+        assert mock_cache.was_delete_called_with(student_statement_key(student_id))
+
+    async def test_relay_publishes_events_left_in_the_outbox(
+        self,
+        authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache],
+        db_session: AsyncSession,
+        test_sessionmaker,
+    ):
+        client, mock_cache = authenticated_client_with_mock_cache
+        school_id, student_id = await _create_student(client)
+        service = InvoiceService(db_session, mock_cache, publish_events_inline=False)
+
+        await service.create_invoice(InvoiceCreate(student_id=UUID(student_id), amount_cents=10000, currency="USD"))
+        assert LEDGER_EVENTS_STREAM not in mock_cache.streams
+        assert not mock_cache.was_delete_called_with(student_statement_key(student_id))
+        assert await _pending_events(db_session) == 1
+
+        relay = OutboxRelay(mock_cache, session_factory=test_sessionmaker, batch_size=10)
+        assert await relay.drain() == 1
+        assert [entry["type"] for entry in mock_cache.streams[LEDGER_EVENTS_STREAM]] == ["invoice.created"]
+        assert mock_cache.was_delete_called_with(student_statement_key(student_id))
+        assert mock_cache.was_delete_called_with(school_statement_key(school_id))
+        assert await _pending_events(db_session) == 0
+        assert await relay.drain() == 0
+
+    async def test_events_stay_in_the_outbox_when_the_stream_is_unavailable(
+        self,
+        authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache],
+        db_session: AsyncSession,
+        test_sessionmaker,
+    ):
+        client, mock_cache = authenticated_client_with_mock_cache
+        _, student_id = await _create_student(client)
+
+        async def unavailable(stream, entries, maxlen=100000):
+            return False
+
+        add_stream_entries = mock_cache.add_stream_entries
+        mock_cache.add_stream_entries = unavailable
+        # The write succeeds all the same
+        response = await client.post("/invoices/", json=create_invoice_data(student_id, 10000))
+        assert response.status_code == HTTPStatus.CREATED
+        assert await _pending_events(db_session) == 1
+
+        mock_cache.add_stream_entries = add_stream_entries
+        assert await OutboxRelay(mock_cache, session_factory=test_sessionmaker).drain() == 1
+        assert len(mock_cache.streams[LEDGER_EVENTS_STREAM]) == 1
+        assert await _pending_events(db_session) == 0
@@ -1,6 +1,11 @@
+import asyncio
+import json
 import pytest
 from http import HTTPStatus
 from httpx import AsyncClient
+from app.schemas import PaymentCreate
+from app.services import PaymentService
+from tests.mock_cache import MockCache
 
 
 pytestmark = pytest.mark.asyncio
@@ -87,9 +92,9 @@ class TestPayments:
         assert statement_response.status_code == HTTPStatus.OK
         statement = statement_response.json()
 
-        assert statement["total_invoiced"]["amount_cents"] == 25000
-        assert statement["total_paid"]["amount_cents"] == 25000
-        assert statement["total_outstanding"]["amount_cents"] == 0
+        assert statement["total_invoiced"][0]["amount_cents"] == 25000
+        assert statement["total_paid"][0]["amount_cents"] == 25000
+        assert statement["total_outstanding"][0]["amount_cents"] == 0
         assert len(statement["invoices"]) == 1
 
         inv = statement["invoices"][0]
@@ -136,7 +141,7 @@ class TestPayments:
         statement_response = await authenticated_client.get(f"/account-statements/students/{student_id}")
         assert statement_response.status_code == HTTPStatus.OK
         statement = statement_response.json()
-        assert statement["total_outstanding"]["amount_cents"] == 5000
+        assert statement["total_outstanding"][0]["amount_cents"] == 5000
 
     async def test_create_payment_split_across_invoices(self, authenticated_client: AsyncClient):
         school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
@@ -187,7 +192,7 @@ class TestPayments:
 
         statement_response = await authenticated_client.get(f"/account-statements/students/{student_id}")
         statement = statement_response.json()
-        assert statement["total_outstanding"]["amount_cents"] == 3000
+        assert statement["total_outstanding"][0]["amount_cents"] == 3000
 
     async def test_payment_validation_amount_mismatch(self, authenticated_client: AsyncClient):
         school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
@@ -263,9 +268,9 @@ class TestPayments:
         assert statement_response.status_code == HTTPStatus.OK
         statement = statement_response.json()
 
-        assert statement["total_invoiced"]["amount_cents"] == 15000
-        assert statement["total_paid"]["amount_cents"] == 8000
-        assert statement["total_outstanding"]["amount_cents"] == 7000
+        assert statement["total_invoiced"][0]["amount_cents"] == 15000
+        assert statement["total_paid"][0]["amount_cents"] == 8000
+        assert statement["total_outstanding"][0]["amount_cents"] == 7000
 
         inv = statement["invoices"][0]
         assert inv["amount"]["amount_cents"] == 15000
@@ -324,9 +329,9 @@ class TestPayments:
         assert statement_response.status_code == HTTPStatus.OK
         statement = statement_response.json()
 
-        assert statement["total_invoiced"]["amount_cents"] == 20000
-        assert statement["total_paid"]["amount_cents"] == 20000
-        assert statement["total_outstanding"]["amount_cents"] == 0
+        assert statement["total_invoiced"][0]["amount_cents"] == 20000
+        assert statement["total_paid"][0]["amount_cents"] == 20000
+        assert statement["total_outstanding"][0]["amount_cents"] == 0
 
         for inv in statement["invoices"]:
             assert inv["outstanding_amount"]["amount_cents"] == 0
@@ -385,9 +390,9 @@ class TestPayments:
         assert statement_response.status_code == HTTPStatus.OK
         statement = statement_response.json()
 
-        assert statement["total_invoiced"]["amount_cents"] == 20000
-        assert statement["total_paid"]["amount_cents"] == 20000
-        assert statement["total_outstanding"]["amount_cents"] == 0
+        assert statement["total_invoiced"][0]["amount_cents"] == 20000
+        assert statement["total_paid"][0]["amount_cents"] == 20000
+        assert statement["total_outstanding"][0]["amount_cents"] == 0
 
         inv = statement["invoices"][0]
         assert inv["amount"]["amount_cents"] == 20000
@@ -446,9 +451,9 @@ class TestPayments:
         assert statement_response.status_code == HTTPStatus.OK
         statement = statement_response.json()
 
-        assert statement["total_invoiced"]["amount_cents"] == 25000
-        assert statement["total_paid"]["amount_cents"] == 18000
-        assert statement["total_outstanding"]["amount_cents"] == 7000
+        assert statement["total_invoiced"][0]["amount_cents"] == 25000
+        assert statement["total_paid"][0]["amount_cents"] == 18000
+        assert statement["total_outstanding"][0]["amount_cents"] == 7000
 
         invoices_by_id = {inv["id"]: inv for inv in statement["invoices"]}
         
@@ -514,9 +519,9 @@ class TestPayments:
         assert statement_response.status_code == HTTPStatus.OK
         statement = statement_response.json()
 
-        assert statement["total_invoiced"]["amount_cents"] == 38000
-        assert statement["total_paid"]["amount_cents"] == 15000
-        assert statement["total_outstanding"]["amount_cents"] == 23000
+        assert statement["total_invoiced"][0]["amount_cents"] == 38000
+        assert statement["total_paid"][0]["amount_cents"] == 15000
+        assert statement["total_outstanding"][0]["amount_cents"] == 23000
 
         invoices_by_id = {inv["id"]: inv for inv in statement["invoices"]}
         
@@ -529,3 +534,306 @@ class TestPayments:
         assert inv2["amount"]["amount_cents"] == 18000
         assert inv2["paid_amount"]["amount_cents"] == 6000
         assert inv2["outstanding_amount"]["amount_cents"] == 12000
+
+    async def test_payment_across_many_invoices(self, authenticated_client: AsyncClient):
+        school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
+        student_response = await authenticated_client.post(
+            "/students/",
+            json={"name": "John Doe", "school_id": school_response.json()["id"]}
+        )
+        student_id = student_response.json()["id"]
+        invoice_ids = []
+        for month in range(12):
+            invoice_response = await authenticated_client.post(
+                "/invoices/",
+                json={"student_id": student_id, "amount_cents": 1000, "currency": "USD", "description": f"Month {month + 1}"}
+            )
+            invoice_ids.append(invoice_response.json()["id"])
+
+        payment_response = await authenticated_client.post(
+            "/payments/",
+            json={
+                "student_id": student_id,
+                "amount_cents": 12000,
+                "currency": "USD",
+                "payment_method": "cash",
+                "imputations": [{"invoice_id": invoice_id, "amount_cents": 1000} for invoice_id in invoice_ids]
+            }
+        )
+        assert payment_response.status_code == HTTPStatus.CREATED
+
+        statement = (await authenticated_client.get(f"/account-statements/students/{student_id}")).json()
+        assert statement["total_outstanding"][0]["amount_cents"] == 0
+        assert all(inv["outstanding_amount"]["amount_cents"] == 0 for inv in statement["invoices"])
+
+    async def test_repeated_imputations_share_outstanding_amount(self, authenticated_client: AsyncClient):
+        school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
+        student_response = await authenticated_client.post(
+            "/students/",
+            json={"name": "John Doe", "school_id": school_response.json()["id"]}
+        )
+        student_id = student_response.json()["id"]
+        invoice_response = await authenticated_client.post(
+            "/invoices/",
+            json={"student_id": student_id, "amount_cents": 10000, "currency": "USD"}
+        )
+        invoice_id = invoice_response.json()["id"]
+
+        # Each imputation fits on its own, together they overpay the invoice
+        payment_response = await authenticated_client.post(
+            "/payments/",
+            json={
+                "student_id": student_id,
+                "amount_cents": 12000,
+                "currency": "USD",
+                "payment_method": "cash",
+                "imputations": [
+                    {"invoice_id": invoice_id, "amount_cents": 6000},
+                    {"invoice_id": invoice_id, "amount_cents": 6000}
+                ]
+            }
+        )
+        assert payment_response.status_code == HTTPStatus.BAD_REQUEST
+        assert "exceeds outstanding amount" in payment_response.json()["detail"]
+
+    async def test_import_payments_csv(self, authenticated_client: AsyncClient):
+        school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
+        student_response = await authenticated_client.post(
+            "/students/",
+            json={"name": "John Doe", "school_id": school_response.json()["id"]}
+        )
+        student_id = student_response.json()["id"]
+        invoice_ids = []
+        for amount in (10000, 5000):
+            invoice_response = await authenticated_client.post(
+                "/invoices/",
+                json={"student_id": student_id, "amount_cents": amount, "currency": "USD"}
+            )
+            invoice_ids.append(invoice_response.json()["id"])
+        # A JSON cell, quoted for CSV
+        split = json.dumps([
+            {"invoice_id": invoice_ids[0], "amount_cents": 2000},
+            {"invoice_id": invoice_ids[1], "amount_cents": 1000},
+        ]).replace('"', '""')
+        lines = [
+            "student_id,amount_cents,currency,payment_method,reference,payment_date,invoice_id,imputations",
+            f"{student_id},6000,USD,bank_transfer,TX-1,2026-09-01T10:00:00,{invoice_ids[0]},",
+            f'{student_id},3000,USD,bank_transfer,TX-2,,,"{split}"',
+            # Fits the invoice on its own, not after the first row of the same file
+            f"{student_id},4000,USD,bank_transfer,TX-3,,{invoice_ids[0]},",
+            f"{student_id},-5,USD,bank_transfer,TX-4,,{invoice_ids[1]},",
+        ]
+
+        response = await authenticated_client.post(
+            "/payments/import",
+            content="\n".join(lines) + "\n",
+            headers={"Content-Type": "text/csv"},
+        )
+        assert response.status_code == HTTPStatus.OK
+        result = response.json()
+        assert result["imported"] == 2
+        assert result["failed"] == 2
+        assert [error["line"] for error in result["errors"]] == [4, 5]
+        assert "exceeds outstanding amount" in result["errors"][0]["detail"]
+
+        payments = (await authenticated_client.get("/payments/", params={"student_id": student_id})).json()
+        assert sorted(payment["reference"] for payment in payments) == ["TX-1", "TX-2"]
+        assert "2026-09-01T10:00:00" in [payment["payment_date"] for payment in payments]
+        statement = (await authenticated_client.get(f"/account-statements/students/{student_id}")).json()
+        assert statement["total_paid"][0]["amount_cents"] == 9000
+        assert statement["total_outstanding"][0]["amount_cents"] == 6000
+
+    async def test_import_payments_ndjson_in_batches(self, authenticated_client: AsyncClient):
+        school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
+        student_response = await authenticated_client.post(
+            "/students/",
+            json={"name": "John Doe", "school_id": school_response.json()["id"]}
+        )
+        student_id = student_response.json()["id"]
+        invoice_response = await authenticated_client.post(
+            "/invoices/",
+            json={"student_id": student_id, "amount_cents": 10000, "currency": "USD"}
+        )
+        invoice_id = invoice_response.json()["id"]
+        rows = [
+            json.dumps({
+                "student_id": student_id,
+                "amount_cents": 2500,
+                "payment_method": "credit_card",
+                "imputations": [{"invoice_id": invoice_id, "amount_cents": 2500}],
+            })
+            for _ in range(5)
+        ]
+        rows.insert(2, "{not json")
+
+        response = await authenticated_client.post(
+            "/payments/import",
+            params={"batch_size": 2},
+            content="\n".join(rows),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == HTTPStatus.OK
+        result = response.json()
+        # The fifth payment overpays the invoice, already paid off by an earlier batch
+        assert result["imported"] == 4
+        assert [error["line"] for error in result["errors"]] == [3, 6]
+
+        statement = (await authenticated_client.get(f"/account-statements/students/{student_id}")).json()
+        assert statement["total_paid"][0]["amount_cents"] == 10000
+
+    async def test_import_payments_rejects_unknown_content_type(self, authenticated_client: AsyncClient):
+        response = await authenticated_client.post(
+            "/payments/import", content="[]", headers={"Content-Type": "application/json"}
+        )
+        assert response.status_code == HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+
+    async def test_fifo_allocation_pays_oldest_due_invoices_first(self, authenticated_client: AsyncClient):
+        school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
+        student_response = await authenticated_client.post(
+            "/students/",
+            json={"name": "John Doe", "school_id": school_response.json()["id"]}
+        )
+        student_id = student_response.json()["id"]
+        invoice_ids = {}
+        for name, due_date in (("later", "2026-03-01T00:00:00"), ("undated", None), ("earliest", "2026-01-01T00:00:00")):
+            invoice_response = await authenticated_client.post(
+                "/invoices/",
+                json={"student_id": student_id, "amount_cents": 10000, "currency": "USD", "due_date": due_date}
+            )
+            invoice_ids[name] = invoice_response.json()["id"]
+        await authenticated_client.post(
+            "/invoices/",
+            json={"student_id": student_id, "amount_cents": 10000, "currency": "EUR", "due_date": "2025-01-01T00:00:00"}
+        )
+        await authenticated_client.post(
+            "/payments/",
+            json={
+                "student_id": student_id,
+                "amount_cents": 4000,
+                "currency": "USD",
+                "payment_method": "cash",
+                "imputations": [{"invoice_id": invoice_ids["earliest"], "amount_cents": 4000}]
+            }
+        )
+
+        payment_response = await authenticated_client.post(
+            "/payments/",
+            json={
+                "student_id": student_id,
+                "amount_cents": 9000,
+                "currency": "USD",
+                "payment_method": "bank_transfer",
+                "allocation": "fifo"
+            }
+        )
+        assert payment_response.status_code == HTTPStatus.CREATED
+
+        statement = (await authenticated_client.get(f"/account-statements/students/{student_id}")).json()
+        outstanding = {inv["id"]: inv["outstanding_amount"]["amount_cents"] for inv in statement["invoices"]}
+        assert outstanding[invoice_ids["earliest"]] == 0
+        assert outstanding[invoice_ids["later"]] == 7000
+        assert outstanding[invoice_ids["undated"]] == 10000
+
+        # More than the student owes in the currency
+        payment_response = await authenticated_client.post(
+            "/payments/",
+            json={
+                "student_id": student_id,
+                "amount_cents": 17001,
+                "currency": "USD",
+                "payment_method": "cash",
+                "allocation": "fifo"
+            }
+        )
+        assert payment_response.status_code == HTTPStatus.BAD_REQUEST
+        assert "exceeds outstanding USD balance" in payment_response.json()["detail"]
+
+    async def test_fifo_allocation_rejects_explicit_imputations(self, authenticated_client: AsyncClient):
+        payment_response = await authenticated_client.post(
+            "/payments/",
+            json={
+                "student_id": "00000000-0000-0000-0000-000000000000",
+                "amount_cents": 1000,
+                "currency": "USD",
+                "payment_method": "cash",
+                "allocation": "fifo",
+                "imputations": [{"invoice_id": "00000000-0000-0000-0000-000000000000", "amount_cents": 1000}]
+            }
+        )
+        assert payment_response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+    async def test_concurrent_payments_do_not_overpay_an_invoice(self, authenticated_client: AsyncClient, test_sessionmaker):
+        school_response = await authenticated_client.post("/schools/", json={"name": "Test School"})
+        student_response = await authenticated_client.post(
+            "/students/",
+            json={"name": "John Doe", "school_id": school_response.json()["id"]}
+        )
+        student_id = student_response.json()["id"]
+        invoice_response = await authenticated_client.post(
+            "/invoices/",
+            json={"student_id": student_id, "amount_cents": 10000, "currency": "USD"}
+        )
+        invoice_id = invoice_response.json()["id"]
+        payment_data = PaymentCreate(
+            student_id=student_id,
+            amount_cents=3000,
+            payment_method="cash",
+            imputations=[{"invoice_id": invoice_id, "amount_cents": 3000}],
+        )
+
+        # Each payment in its own session and transaction, like separate requests
+        async def pay() -> bool:
+            async with test_sessionmaker() as session:
+                try:
+                    await PaymentService(session, MockCache()).create_payment(payment_data)
+                    return True
+                except ValueError:
+                    await session.rollback()
+                    return False
+
+        accepted = await asyncio.gather(*(pay() for _ in range(8)))
+        assert sum(accepted) == 3
+
+        statement = (await authenticated_client.get(f"/account-statements/students/{student_id}")).json()
+        assert statement["total_paid"][0]["amount_cents"] == 9000
+        assert statement["invoices"][0]["outstanding_amount"]["amount_cents"] == 1000
+
+    async def test_idempotency_key_replays_payment(self, authenticated_client_with_mock_cache: tuple[AsyncClient, MockCache]):
+        client, _ = authenticated_client_with_mock_cache
+        school_response = await client.post("/schools/", json={"name": "Test School"})
+        student_response = await client.post(
+            "/students/",
+            json={"name": "John Doe", "school_id": school_response.json()["id"]}
+        )
+        student_id = student_response.json()["id"]
+        invoice_response = await client.post(
+            "/invoices/",
+            json={"student_id": student_id, "amount_cents": 10000, "currency": "USD"}
+        )
+        payment = {
+            "student_id": student_id,
+            "amount_cents": 4000,
+            "currency": "USD",
+            "payment_method": "cash",
+            "imputations": [{"invoice_id": invoice_response.json()["id"], "amount_cents": 4000}]
+        }
+
+        responses = [
+            await client.post("/payments/", json=payment, headers={"Idempotency-Key": "retry-1"})
+            for _ in range(2)
+        ]
+        assert [response.status_code for response in responses] == [HTTPStatus.CREATED] * 2
+        assert responses[0].json() == responses[1].json()
+        payments = (await client.get("/payments/", params={"student_id": student_id})).json()
+        assert len(payments) == 1
+
+        # Same key, different payment
+        response = await client.post(
+            "/payments/", json={**payment, "amount_cents": 5000}, headers={"Idempotency-Key": "retry-1"}
+        )
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+        # A different key is a different payment
+        response = await client.post("/payments/", json=payment, headers={"Idempotency-Key": "retry-2"})
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json()["id"] != responses[0].json()["id"]
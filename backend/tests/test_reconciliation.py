@@ -0,0 +1,110 @@
+import pytest
+from datetime import datetime, timedelta
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services import ReconciliationService
+from tests.test_schemas import (
+    create_school_data,
+    create_student_data,
+    create_invoice_data,
+    create_payment_data,
+)
+
+
+pytestmark = pytest.mark.asyncio
+
+
+async def _lines(*lines: str):
+    for line in lines:
+        yield line
+
+
+class TestReconciliation:
+    async def test_statement_lines_are_matched_by_reference_amount_and_date(
+        self, authenticated_client: AsyncClient, db_session: AsyncSession
+    ):
+        school_response = await authenticated_client.post("/schools/", json=create_school_data("Test School"))
+        student_response = await authenticated_client.post(
+            "/students/", json=create_student_data("John Doe", school_response.json()["id"])
+        )
+        student_id = student_response.json()["id"]
+        invoice_response = await authenticated_client.post(
+            "/invoices/", json=create_invoice_data(student_id, 100000)
+        )
+        invoice_id = invoice_response.json()["id"]
+        payment_ids = {}
+        for reference, amount in (("TX-1", 1000), ("TX-2", 2000), ("TX-3", 500), ("TX-3", 500), ("TX-4", 700)):
+            payment_response = await authenticated_client.post(
+                "/payments/", json=create_payment_data(student_id, amount, invoice_id, reference=reference)
+            )
+            payment_ids.setdefault(reference, []).append(payment_response.json()["id"])
+        today = datetime.utcnow().date()
+        late = today + timedelta(days=10)
+
+        results = [
+            result
+            async for result in ReconciliationService(db_session).reconcile(
+                _lines(
+                    "reference,amount,currency,date",
+                    f"TX-1,10.00,USD,{today}",
+                    # Wrong amount, then out of the date window
+                    f"TX-2,20.01,USD,{today}",
+                    f"TX-2,20.00,USD,{late}",
+                    # Two payments fit
+                    f"TX-3,5.00,USD,{today}",
+                    # Two lines claim the same payment
+                    f"TX-4,7.00,USD,{today}",
+                    f"TX-4,7.00,USD,{today}",
+                    f"TX-5,1.00,USD,{today}",
+                    "TX-6,not a number,USD,2026-09-01",
+                ),
+                "csv",
+            )
+        ]
+
+        assert [(result.line, result.status) for result in results] == [
+            (2, "matched"),
+            (3, "unmatched"),
+            (4, "unmatched"),
+            (5, "ambiguous"),
+            (6, "ambiguous"),
+            (7, "ambiguous"),
+            (8, "unmatched"),
+            (9, "unmatched"),
+        ]
+        assert [str(payment_id) for payment_id in results[0].payment_ids] == payment_ids["TX-1"]
+        assert sorted(str(payment_id) for payment_id in results[3].payment_ids) == sorted(payment_ids["TX-3"])
+        assert results[7].detail is not None
+
+    async def test_claims_and_references_are_compared_across_batches(
+        self, authenticated_client: AsyncClient, db_session: AsyncSession
+    ):
+        school_response = await authenticated_client.post("/schools/", json=create_school_data("Test School"))
+        student_response = await authenticated_client.post(
+            "/students/", json=create_student_data("John Doe", school_response.json()["id"])
+        )
+        student_id = student_response.json()["id"]
+        invoice_response = await authenticated_client.post(
+            "/invoices/", json=create_invoice_data(student_id, 100000)
+        )
+        invoice_id = invoice_response.json()["id"]
+        payment_response = await authenticated_client.post(
+            "/payments/", json=create_payment_data(student_id, 1000, invoice_id, reference=" TX-1 ")
+        )
+        today = datetime.utcnow().date()
+
+        results = [
+            result
+            async for result in ReconciliationService(db_session).reconcile(
+                _lines(
+                    f'{{"reference": "TX-1", "amount_cents": 1000, "date": "{today}"}}',
+                    # The same payment, claimed again in the next batch
+                    f'{{"reference": "TX-1  ", "amount_cents": 1000, "date": "{today}"}}',
+                ),
+                "ndjson",
+                batch_size=1,
+            )
+        ]
+
+        assert [(result.line, result.status) for result in results] == [(1, "matched"), (2, "ambiguous")]
+        assert [str(payment_id) for payment_id in results[1].payment_ids] == [payment_response.json()["id"]]
@@ -0,0 +1,99 @@
+import asyncio
+import pytest
+from app.cache import lock_key
+from app.single_flight import SingleFlight
+from tests.mock_cache import MockCache
+
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestSingleFlight:
+    async def test_concurrent_misses_compute_once(self):
+        cache = MockCache()
+        single_flight = SingleFlight(cache)
+        computations = 0
+
+        async def compute():
+            nonlocal computations
+            computations += 1
+            await asyncio.sleep(0.01)
+            await cache.set("key", {"value": 42})
+            return {"value": 42}
+
+        async def load():
+            return await cache.get("key")
+
+        results = await asyncio.gather(*(single_flight.run("key", compute, load) for _ in range(10)))
+
+        assert computations == 1
+        assert results == [{"value": 42}] * 10
+        assert cache.acquire_lock_calls == [lock_key("key")]
+
+    async def test_waits_for_lock_held_by_another_worker(self):
+        cache = MockCache()
+        single_flight = SingleFlight(cache, poll_interval=0.001)
+        await cache.acquire_lock(lock_key("key"), "other-worker", 1000)
+
+        async def compute():
+            raise AssertionError("the lock holder computes the value")
+
+        async def load():
+            return await cache.get("key")
+
+        waiter = asyncio.create_task(single_flight.run("key", compute, load))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+
+        await cache.set("key", {"value": 42})
+        await cache.release_lock(lock_key("key"), "other-worker")
+        assert await waiter == {"value": 42}
+
+    async def test_value_stored_before_the_lock_is_taken_is_not_recomputed(self):
+        cache = MockCache()
+        single_flight = SingleFlight(cache)
+        # Stored, and the lock released, after the caller's miss but before its SET NX
+        await cache.set("key", {"value": 42})
+
+        async def compute():
+            raise AssertionError("the value is already cached")
+
+        async def load():
+            return await cache.get("key")
+
+        assert await single_flight.run("key", compute, load) == {"value": 42}
+        assert cache.acquire_lock_calls == [lock_key("key")]
+        # And the lock was released
+        assert await cache.acquire_lock(lock_key("key"), "other-worker", 1000)
+
+    async def test_computes_after_lock_wait_timeout(self):
+        cache = MockCache()
+        single_flight = SingleFlight(cache, wait_timeout=0.01, poll_interval=0.001)
+        await cache.acquire_lock(lock_key("key"), "stuck-worker", 1000)
+
+        async def compute():
+            return {"value": 42}
+
+        async def load():
+            return None
+
+        assert await single_flight.run("key", compute, load) == {"value": 42}
+
+    async def test_errors_reach_every_waiter(self):
+        cache = MockCache()
+        single_flight = SingleFlight(cache)
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise ValueError("School not found")
+
+        async def load():
+            return None
+
+        results = await asyncio.gather(
+            *(single_flight.run("key", compute, load) for _ in range(3)), return_exceptions=True
+        )
+
+        assert all(isinstance(result, ValueError) for result in results)
+        # The lock is released, so the next miss computes again
+        assert await cache.acquire_lock(lock_key("key"), "next", 1000)
@@ -0,0 +1,97 @@
+import pytest
+from uuid import UUID
+from httpx import AsyncClient
+from http import HTTPStatus
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Invoice, PaymentImputation, Student, StudentBalance
+from app.services import StudentBalanceService
+from tests.test_schemas import (
+    create_school_data,
+    create_student_data,
+    create_invoice_data,
+    create_payment_data,
+)
+
+
+pytestmark = pytest.mark.asyncio
+
+
+async def _including_revoked(db_session: AsyncSession, model, *criteria) -> list:
+    result = await db_session.execute(
+        select(model).where(*criteria).execution_options(include_revoked=True, populate_existing=True)
+    )
+    return list(result.scalars().all())
+
+
+class TestSoftDelete:
+    """Deletes set revoked_at, and revoked rows drop out of every query."""
+
+    async def test_deleted_invoice_is_revoked_with_its_imputations(
+        self, authenticated_client: AsyncClient, db_session: AsyncSession
+    ):
+        school_response = await authenticated_client.post("/schools/", json=create_school_data("Test School"))
+        student_response = await authenticated_client.post(
+            "/students/", json=create_student_data("John Doe", school_response.json()["id"])
+        )
+        student_id = student_response.json()["id"]
+        invoice_ids = []
+        for amount in (10000, 5000):
+            invoice_response = await authenticated_client.post(
+                "/invoices/", json=create_invoice_data(student_id, amount)
+            )
+            invoice_ids.append(invoice_response.json()["id"])
+        await authenticated_client.post("/payments/", json=create_payment_data(student_id, 4000, invoice_ids[0]))
+
+        response = await authenticated_client.delete(f"/invoices/{invoice_ids[0]}")
+        assert response.status_code == HTTPStatus.NO_CONTENT
+
+        response = await authenticated_client.get(f"/invoices/{invoice_ids[0]}")
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        response = await authenticated_client.get("/invoices/", params={"student_id": student_id})
+        assert [invoice["id"] for invoice in response.json()] == [invoice_ids[1]]
+        response = await authenticated_client.get(f"/account-statements/students/{student_id}")
+        assert response.json()["total_invoiced"][0]["amount_cents"] == 5000
+        assert response.json()["total_paid"][0]["amount_cents"] == 0
+
+        # The rows are still there, flagged
+        invoices = await _including_revoked(db_session, Invoice, Invoice.id == UUID(invoice_ids[0]))
+        assert invoices[0].revoked_at is not None
+        imputations = await _including_revoked(
+            db_session, PaymentImputation, PaymentImputation.invoice_id == UUID(invoice_ids[0])
+        )
+        assert [imputation.revoked_at for imputation in imputations] == [invoices[0].revoked_at]
+        # The rebuild ignores revoked rows, like the incremental projection
+        assert await StudentBalanceService(db_session).find_drift() == []
+
+    async def test_deleted_school_revokes_its_students(
+        self, authenticated_client: AsyncClient, db_session: AsyncSession
+    ):
+        school_response = await authenticated_client.post("/schools/", json=create_school_data("Test School"))
+        school_id = school_response.json()["id"]
+        student_response = await authenticated_client.post(
+            "/students/", json=create_student_data("John Doe", school_id)
+        )
+        student_id = student_response.json()["id"]
+        invoice_response = await authenticated_client.post(
+            "/invoices/", json=create_invoice_data(student_id, 10000)
+        )
+        await authenticated_client.post(
+            "/payments/", json=create_payment_data(student_id, 4000, invoice_response.json()["id"])
+        )
+
+        response = await authenticated_client.delete(f"/schools/{school_id}")
+        assert response.status_code == HTTPStatus.NO_CONTENT
+
+        response = await authenticated_client.get(f"/students/{student_id}")
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        response = await authenticated_client.get("/payments/", params={"student_id": student_id})
+        assert response.json() == []
+        response = await authenticated_client.get(f"/account-statements/schools/{school_id}")
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+        students = await _including_revoked(db_session, Student, Student.id == UUID(student_id))
+        assert students[0].revoked_at is not None
+        balances = await _including_revoked(db_session, StudentBalance, StudentBalance.student_id == UUID(student_id))
+        assert [(balance.invoiced_cents, balance.paid_cents) for balance in balances] == [(0, 0)]
+        assert await StudentBalanceService(db_session).find_drift() == []
@@ -0,0 +1,121 @@
+import pytest
+from uuid import UUID
+from httpx import AsyncClient
+from http import HTTPStatus
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import StudentBalance
+from app.services import StudentBalanceService
+from tests.test_schemas import (
+    create_school_data,
+    create_student_data,
+    create_invoice_data,
+    create_payment_data,
+)
+
+
+pytestmark = pytest.mark.asyncio
+
+
+async def _balance(db_session: AsyncSession, student_id: str, currency: str = "USD") -> StudentBalance:
+    result = await db_session.execute(
+        select(StudentBalance).where(
+            StudentBalance.student_id == UUID(student_id),
+            StudentBalance.currency == currency,
+        ).execution_options(populate_existing=True)
+    )
+    return result.scalar_one()
+
+
+async def _create_student(client: AsyncClient) -> str:
+    school_response = await client.post("/schools/", json=create_school_data("Test School"))
+    school_id = school_response.json()["id"]
+    student_response = await client.post("/students/", json=create_student_data("John Doe", school_id))
+    return student_response.json()["id"]
+
+
+class TestStudentBalanceProjection:
+    """The projection is updated in the same transaction as every ledger write."""
+
+    async def test_invoice_lifecycle_updates_balance(self, authenticated_client: AsyncClient, db_session: AsyncSession):
+        student_id = await _create_student(authenticated_client)
+
+        invoice_response = await authenticated_client.post(
+            "/invoices/", json=create_invoice_data(student_id, 10000)
+        )
+        invoice_id = invoice_response.json()["id"]
+        balance = await _balance(db_session, student_id)
+        assert (balance.invoice_count, balance.invoiced_cents, balance.outstanding_cents) == (1, 10000, 10000)
+        assert balance.version == 1
+
+        await authenticated_client.put(f"/invoices/{invoice_id}", json={"amount_cents": 12000})
+        balance = await _balance(db_session, student_id)
+        assert (balance.invoiced_cents, balance.outstanding_cents) == (12000, 12000)
+        assert balance.version == 2
+
+        response = await authenticated_client.delete(f"/invoices/{invoice_id}")
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        balance = await _balance(db_session, student_id)
+        assert (balance.invoice_count, balance.invoiced_cents, balance.outstanding_cents) == (0, 0, 0)
+        assert balance.version == 3
+
+    async def test_payment_lifecycle_updates_balance(self, authenticated_client: AsyncClient, db_session: AsyncSession):
+        student_id = await _create_student(authenticated_client)
+        invoice_response = await authenticated_client.post(
+            "/invoices/", json=create_invoice_data(student_id, 10000)
+        )
+        invoice_id = invoice_response.json()["id"]
+
+        payment_response = await authenticated_client.post(
+            "/payments/", json=create_payment_data(student_id, 4000, invoice_id)
+        )
+        payment_id = payment_response.json()["id"]
+        balance = await _balance(db_session, student_id)
+        assert (balance.invoiced_cents, balance.paid_cents, balance.outstanding_cents) == (10000, 4000, 6000)
+
+        await authenticated_client.delete(f"/payments/{payment_id}")
+        balance = await _balance(db_session, student_id)
+        assert (balance.paid_cents, balance.outstanding_cents) == (0, 10000)
+
+    async def test_invoice_currency_change_moves_paid_amount(self, authenticated_client: AsyncClient, db_session: AsyncSession):
+        student_id = await _create_student(authenticated_client)
+        invoice_response = await authenticated_client.post(
+            "/invoices/", json=create_invoice_data(student_id, 10000)
+        )
+        invoice_id = invoice_response.json()["id"]
+        await authenticated_client.post("/payments/", json=create_payment_data(student_id, 2500, invoice_id))
+
+        await authenticated_client.put(f"/invoices/{invoice_id}", json={"currency": "EUR"})
+
+        usd = await _balance(db_session, student_id, "USD")
+        eur = await _balance(db_session, student_id, "EUR")
+        assert (usd.invoice_count, usd.invoiced_cents, usd.paid_cents) == (0, 0, 0)
+        assert (eur.invoice_count, eur.invoiced_cents, eur.paid_cents) == (1, 10000, 2500)
+
+    async def test_rebuild_matches_incremental_projection(self, authenticated_client: AsyncClient, db_session: AsyncSession):
+        student_id = await _create_student(authenticated_client)
+        for amount in (10000, 5000):
+            invoice_response = await authenticated_client.post(
+                "/invoices/", json=create_invoice_data(student_id, amount)
+            )
+        await authenticated_client.post(
+            "/payments/", json=create_payment_data(student_id, 5000, invoice_response.json()["id"])
+        )
+
+        service = StudentBalanceService(db_session)
+        assert await service.find_drift() == []
+
+        balance = await _balance(db_session, student_id)
+        version = balance.version
+        balance.paid_cents = 0
+        await db_session.commit()
+        drift = await service.find_drift()
+        assert [row.student_id for row in drift] == [UUID(student_id)]
+
+        await service.rebuild()
+        await db_session.commit()
+        assert await service.find_drift() == []
+        balance = await _balance(db_session, student_id)
+        assert (balance.invoiced_cents, balance.paid_cents, balance.outstanding_cents) == (15000, 5000, 10000)
+        # Rebuilt rows move to a new version rather than starting over
+        assert balance.version == version + 1
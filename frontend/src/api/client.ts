@@ -70,9 +70,10 @@ export interface StudentAccountStatement {
   student_name: string
   school_id: string
   school_name: string
-  total_invoiced: MoneyAmount
-  total_paid: MoneyAmount
-  total_outstanding: MoneyAmount
+  // One entry per currency, ordered by currency code
+  total_invoiced: MoneyAmount[]
+  total_paid: MoneyAmount[]
+  total_outstanding: MoneyAmount[]
   invoices: InvoiceDetail[]
 }
 
@@ -85,9 +86,10 @@ export interface StudentSummary {
 export interface SchoolAccountStatement {
   school_id: string
   school_name: string
-  total_invoiced: MoneyAmount
-  total_paid: MoneyAmount
-  total_outstanding: MoneyAmount
+  // One entry per currency, ordered by currency code
+  total_invoiced: MoneyAmount[]
+  total_paid: MoneyAmount[]
+  total_outstanding: MoneyAmount[]
   number_of_students: number
   students: StudentSummary[]
 }
@@ -1,6 +1,6 @@
 import { useEffect, useState } from 'react'
 import { Link, useNavigate, useParams } from 'react-router-dom'
-import { accountStatementsApi, SchoolAccountStatement } from '../api/client'
+import { accountStatementsApi, MoneyAmount, SchoolAccountStatement } from '../api/client'
 
 export default function SchoolStatement() {
   const { schoolId } = useParams<{ schoolId: string }>()
@@ -25,6 +25,8 @@ export default function SchoolStatement() {
   }
 
   const formatMoney = (cents: number, currency: string) => `${currency} ${(cents / 100).toFixed(2)}`
+  const formatTotals = (amounts: MoneyAmount[]) =>
+    amounts.length ? amounts.map((a) => formatMoney(a.amount_cents, a.currency)).join(' · ') : formatMoney(0, 'USD')
 
   if (loading) return <div className="text-center py-8">Loading...</div>
   if (!data) return <div className="text-center py-8">Not found</div>
@@ -48,19 +50,19 @@ export default function SchoolStatement() {
           <div className="rounded-md bg-gray-50 p-4">
             <div className="text-sm text-gray-500">Total invoiced</div>
             <div className="text-lg font-semibold text-gray-900">
-              {formatMoney(data.total_invoiced.amount_cents, data.total_invoiced.currency)}
+              {formatTotals(data.total_invoiced)}
             </div>
           </div>
           <div className="rounded-md bg-gray-50 p-4">
             <div className="text-sm text-gray-500">Total paid</div>
             <div className="text-lg font-semibold text-gray-900">
-              {formatMoney(data.total_paid.amount_cents, data.total_paid.currency)}
+              {formatTotals(data.total_paid)}
             </div>
           </div>
           <div className="rounded-md bg-gray-50 p-4">
             <div className="text-sm text-gray-500">Outstanding</div>
             <div className="text-lg font-semibold text-gray-900">
-              {formatMoney(data.total_outstanding.amount_cents, data.total_outstanding.currency)}
+              {formatTotals(data.total_outstanding)}
             </div>
           </div>
         </div>
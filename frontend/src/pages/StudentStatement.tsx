@@ -1,6 +1,6 @@
 import { useEffect, useState } from 'react'
 import { Link, useParams } from 'react-router-dom'
-import { accountStatementsApi, StudentAccountStatement } from '../api/client'
+import { accountStatementsApi, MoneyAmount, StudentAccountStatement } from '../api/client'
 
 export default function StudentStatement() {
   const { studentId } = useParams<{ studentId: string }>()
@@ -24,6 +24,8 @@ export default function StudentStatement() {
   }
 
   const formatMoney = (cents: number, currency: string) => `${currency} ${(cents / 100).toFixed(2)}`
+  const formatTotals = (amounts: MoneyAmount[]) =>
+    amounts.length ? amounts.map((a) => formatMoney(a.amount_cents, a.currency)).join(' · ') : formatMoney(0, 'USD')
 
   if (loading) return <div className="text-center py-8">Loading...</div>
   if (!data) return <div className="text-center py-8">Not found</div>
@@ -47,19 +49,19 @@ export default function StudentStatement() {
           <div className="rounded-md bg-gray-50 p-4">
             <div className="text-sm text-gray-500">Total invoiced</div>
             <div className="text-lg font-semibold text-gray-900">
-              {formatMoney(data.total_invoiced.amount_cents, data.total_invoiced.currency)}
+              {formatTotals(data.total_invoiced)}
             </div>
           </div>
           <div className="rounded-md bg-gray-50 p-4">
             <div className="text-sm text-gray-500">Total paid</div>
             <div className="text-lg font-semibold text-gray-900">
-              {formatMoney(data.total_paid.amount_cents, data.total_paid.currency)}
+              {formatTotals(data.total_paid)}
             </div>
           </div>
           <div className="rounded-md bg-gray-50 p-4">
             <div className="text-sm text-gray-500">Outstanding</div>
             <div className="text-lg font-semibold text-gray-900">
-              {formatMoney(data.total_outstanding.amount_cents, data.total_outstanding.currency)}
+              {formatTotals(data.total_outstanding)}
             </div>
           </div>
         </div>